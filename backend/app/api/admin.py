@@ -1,60 +1,128 @@
-from fastapi import APIRouter
-import subprocess
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
 import os
 import json
 from pipeline.config import ARTIFACTS_DIR
+from pipeline import results_store
+from backend.app.services.log_tail import tail_lines, tail_with_offset, follow_lines
+from backend.app.services.jobs import job_manager
 
 router = APIRouter()
 
 @router.post("/trigger-pipeline")
 def trigger_pipeline():
     """
-    Manually trigger the data pipeline.
+    Manually trigger the data pipeline (single-flight, tracked in /jobs).
     """
-    # In real app, consider using checking running status
-    # subprocess.Popen(["python", "pipeline/collect_data.py"])
-    return {"status": "Pipeline triggered"}
-
-import sys
-import datetime
+    try:
+        job, created = job_manager.start("pipeline")
+        if not created:
+            return {"status": "Pipeline already running", "pid": job["pid"], "job": job}
+        if job["state"] == "failed":
+            return {"status": "Error", "message": job["message"], "job": job}
+        return {"status": "Pipeline triggered", "pid": job["pid"], "job": job}
+    except Exception as e:
+        return {"status": "Error", "message": str(e)}
 
 @router.post("/retrain-model")
 def retrain_model():
     """
-    Manually trigger model retraining.
+    Manually trigger model retraining (single-flight, tracked in /jobs).
     """
     try:
-        # Redirect output to log file
-        log_path = os.path.join(ARTIFACTS_DIR, "pipeline.log")
-        
-        # Add a debug line to confirm we are writing to the file
-        with open(log_path, "a") as f:
-            f.write(f"\n[{datetime.datetime.now().strftime('%H:%M:%S')}] Triggering retraining via {sys.executable}...\n")
-
-        with open(log_path, "a") as log_file:
-            # We don't wait for completion here, just start it
-            process = subprocess.Popen(
-                [sys.executable, "-u", "-m", "pipeline.train_pipeline"], 
-                stdout=log_file, 
-                stderr=log_file
-            )
-        return {"status": "Retraining triggered", "pid": process.pid}
+        job, created = job_manager.start("retrain")
+        if not created:
+            return {"status": "Retraining already running", "pid": job["pid"], "job": job}
+        if job["state"] == "failed":
+            return {"status": "Error", "message": job["message"], "job": job}
+        return {"status": "Retraining triggered", "pid": job["pid"], "job": job}
     except Exception as e:
         return {"status": "Error", "message": str(e)}
 
+@router.get("/jobs")
+def list_jobs(kind: Optional[str] = None, limit: int = Query(20, ge=1, le=200)):
+    """
+    Recent pipeline/retrain jobs, newest first.
+    """
+    return {"status": "Success", "data": job_manager.list_jobs(kind=kind, limit=limit)}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: int):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "Success", "data": job}
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: int):
+    """
+    Stop a running job (SIGTERM to its process group).
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "Success", "data": job}
+
 @router.get("/training-results")
-def get_training_results():
+def get_training_results(
+    model: Optional[str] = None,
+    symbol: Optional[str] = None,
+    fold: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    max_points: Optional[int] = Query(None, ge=1),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(5000, ge=1, le=50000),
+):
     """
-    Get the latest training comparison data (True vs Pred).
+    Get walk-forward out-of-fold predictions (True vs Pred), filtered
+    server-side. symbol=ALL averages across symbols per date; fold picks
+    one test year; max_points downsamples the series; page/page_size
+    paginate the result.
     """
-    results_path = os.path.join(ARTIFACTS_DIR, "comparison_data.json")
-    if not os.path.exists(results_path):
+    if not results_store.exists():
         return {"status": "No results found", "data": []}
     
     try:
-        with open(results_path, "r") as f:
-            data = json.load(f)
-        return {"status": "Success", "data": data}
+        data, total = results_store.query_results(
+            model=model, symbol=symbol, fold=fold, start=start, end=end,
+            max_points=max_points, page=page, page_size=page_size
+        )
+        return {
+            "status": "Success",
+            "data": data,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            **results_store.facets()
+        }
+    except Exception as e:
+        return {"status": "Error", "message": str(e)}
+
+@router.get("/training-calibration")
+def get_training_calibration(
+    model: str = "return",
+    symbol: Optional[str] = None,
+    fold: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    bins: int = Query(10, ge=2, le=100),
+):
+    """
+    Calibration of one model's out-of-fold predictions per equal-count
+    bucket: mean prediction vs mean realized value for regressors, mean
+    predicted-class probability vs hit rate for classifiers.
+    """
+    if not results_store.exists():
+        return {"status": "No results found", "data": []}
+
+    try:
+        data = results_store.calibration(
+            model, symbol=symbol, fold=fold, start=start, end=end, bins=bins
+        )
+        return {"status": "Success", "model": model, "data": data}
     except Exception as e:
         return {"status": "Error", "message": str(e)}
 
@@ -84,11 +152,51 @@ def get_logs(lines: int = 50):
         return {"logs": ["Log file not found."]}
     
     try:
-        with open(log_path, "r") as f:
-            # Read all lines and take the last N
-            all_lines = f.readlines()
-            # Clean newlines
-            logs = [line.strip() for line in all_lines[-lines:]]
-        return {"logs": logs}
+        # Seek backwards from the end instead of reading the whole file
+        return {"logs": tail_lines(log_path, lines)}
     except Exception as e:
         return {"logs": [f"Error reading log: {str(e)}"]}
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data}\n\n"
+
+@router.get("/logs/stream")
+async def stream_logs(request: Request, lines: int = 50):
+    """
+    Server-Sent Events: the last N log lines, then new lines as they are written.
+    A comment is sent every 15s of silence to keep proxies from closing the stream.
+    """
+    log_path = os.path.join(ARTIFACTS_DIR, "pipeline.log")
+
+    async def events():
+        # Follow from where the tail ended, so lines written in between aren't lost
+        start = 0
+        if os.path.exists(log_path):
+            tail, start = tail_with_offset(log_path, lines)
+            for line in tail:
+                yield _sse(line)
+
+        follower = follow_lines(log_path, start=start).__aiter__()
+        next_line = None
+        try:
+            while not await request.is_disconnected():
+                if next_line is None:
+                    next_line = asyncio.ensure_future(follower.__anext__())
+                done, _ = await asyncio.wait({next_line}, timeout=15)
+                if not done:
+                    yield ": keep-alive\n\n"
+                    continue
+                line, next_line = next_line.result(), None
+                yield _sse(line)
+        finally:
+            if next_line is not None:
+                next_line.cancel()
+                await asyncio.gather(next_line, return_exceptions=True)
+            await follower.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
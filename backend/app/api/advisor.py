@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Body
-import os
+from fastapi import APIRouter, HTTPException, Body, Depends
 from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-# from groq import Groq # Uncomment when installed
+from backend.app.services.llm import LLMService, get_llm_service
+from backend.app.services.rationale_cache import rationale_store, rationale_key
 
 router = APIRouter()
 
-from typing import Optional
+from typing import List, Optional
 
 class AdvisorRequest(BaseModel):
     symbol: str
@@ -18,17 +19,88 @@ class AdvisorResponse(BaseModel):
     rationale: str
     confidence: float
     signals: dict
+    model_version: Optional[str] = None
 
-from pipeline.inference import run_inference
+class BatchAdvisorRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # None or empty -> all symbols
+
+class BatchAdvisorItem(BaseModel):
+    symbol: str
+    date: str
+    recommendation: str
+    confidence: float
+    signals: dict
+    model_version: Optional[str] = None
+
+class BatchAdvisorResponse(BaseModel):
+    count: int
+    results: List[BatchAdvisorItem]
+
+from pipeline.inference import run_inference, run_batch_inference
+
+@router.post("/consult-batch", response_model=BatchAdvisorResponse)
+def consult_advisor_batch(request: BatchAdvisorRequest = Body(default=BatchAdvisorRequest())):
+    """
+    Score a watchlist (or every symbol) in one inference pass.
+    Returns model signals and rule-based recommendations, without LLM rationale.
+    """
+    try:
+        results = run_batch_inference(request.symbols)
+    except Exception as e:
+        print(f"Batch inference failed: {e}")
+        results = None
+
+    results = results or []
+    return jsonable_encoder({"count": len(results), "results": results})
+
+def _signal_confidence(signals):
+    # 'pred_direction_prob' is P(Up): if Up, conf = prob; if Down, conf = 1 - prob.
+    raw_prob = signals.get("pred_direction_prob", 0.5)
+    direction = signals.get("direction", "Unknown")
+
+    if direction == "Up":
+        return raw_prob
+    elif direction == "Down":
+        return 1.0 - raw_prob
+    return 0.5 # Neutral/Unknown
+
+def _template_rationale(inference_result, confidence):
+    signals = inference_result.get("signals", {})
+    rec = inference_result.get("recommendation", "HOLD")
+    return (
+        f"Dựa trên dữ liệu mới nhất (Ngày: {inference_result.get('date')}), hệ thống ghi nhận các tín hiệu sau:\n"
+        f"- Lợi nhuận dự báo (21 ngày): {signals.get('predicted_return_21d', 0):.2%}\n"
+        f"- Rủi ro biến động: {signals.get('predicted_volatility_21d', 0):.2%}\n"
+        f"- Chế độ thị trường: {signals.get('regime')}\n"
+        f"- Xu hướng giá: {signals.get('direction')} (Độ tin cậy: {confidence:.0%})\n\n"
+        f"Kết luận: Hệ thống khuyến nghị {rec}."
+    )
+
+def _llm_prompt(symbol, inference_result, confidence):
+    signals = inference_result.get("signals", {})
+    rec = inference_result.get("recommendation", "HOLD")
+    return (
+        f"Đóng vai trò là một chuyên gia tư vấn tài chính chuyên nghiệp. Hãy phân tích cổ phiếu {symbol} dựa trên các tín hiệu sau (Ngày: {inference_result.get('date')}):\n"
+        f"1. Dự báo Lợi nhuận (21 ngày): {signals.get('predicted_return_21d', 0):.2%}\n"
+        f"2. Rủi ro biến động (Volatility): {signals.get('predicted_volatility_21d', 0):.2%}\n"
+        f"3. Chế độ thị trường (Regime): {signals.get('regime')}\n"
+        f"4. Xu hướng giá (Direction): {signals.get('direction')} (Độ tin cậy mô hình: {confidence:.0%})\n"
+        f"Hệ thống gợi ý hành động: {rec}.\n\n"
+        f"Hãy viết một đoạn nhận định đầu tư ngắn gọn (khoảng 3-4 câu) bằng Tiếng Việt. "
+        f"Giải thích logic đằng sau khuyến nghị này. Tại sao độ tin cậy lại quan trọng ở đây? "
+        f"Văn phong chuyên nghiệp, bình tĩnh."
+    )
 
 @router.post("/consult", response_model=AdvisorResponse)
-def consult_advisor(request: AdvisorRequest = Body(...)):
+async def consult_advisor(request: AdvisorRequest = Body(...), llm: LLMService = Depends(get_llm_service)):
     """
     Get investment advice based on real-time model inference.
+    Inference runs in the thread pool; the LLM call is awaited with a
+    concurrency cap and timeout, falling back to the template rationale.
     """
-    # 1. Run Inference to get latest signals
+    # 1. Run Inference to get latest signals (CPU-bound, keep it off the event loop)
     try:
-        inference_result = run_inference(request.symbol)
+        inference_result = await run_in_threadpool(run_inference, request.symbol)
     except Exception as e:
         print(f"Inference failed: {e}")
         inference_result = None
@@ -44,69 +116,34 @@ def consult_advisor(request: AdvisorRequest = Body(...)):
     
     signals = inference_result.get("signals", {})
     rec = inference_result.get("recommendation", "HOLD")
+    confidence = _signal_confidence(signals)
     
-    # Extract confidence (using direction probability as proxy)
-    # signals['predicted_direction_prob'] comes from inference.py
-    # If direction is "Up", prob is prob(1). If "Down", prob is prob(0) = 1 - prob(1)?
-    # actually inference.py returns 'pred_direction_prob' (prob of class 1).
-    # If pred=1 (Up), conf = prob. If pred=0 (Down), conf = 1 - prob.
-    
-    raw_prob = signals.get("pred_direction_prob", 0.5)
-    direction = signals.get("direction", "Unknown")
-    
-    if direction == "Up":
-        confidence = raw_prob
-    elif direction == "Down":
-        confidence = 1.0 - raw_prob
-    else:
-        confidence = 0.5 # Neutral/Unknown
-        
-    # Scale to 0-100 for easy UI if needed, but float 0-1 is standard
-    # Let's keep 0-1 float
-    
-    # 2. Generate Rationale (Mock or Groq) in Vietnamese
-    # Construct a descriptive string
-    rationale = (
-        f"Dựa trên dữ liệu mới nhất (Ngày: {inference_result.get('date')}), hệ thống ghi nhận các tín hiệu sau:\n"
-        f"- Lợi nhuận dự báo (21 ngày): {signals.get('predicted_return_21d', 0):.2%}\n"
-        f"- Rủi ro biến động: {signals.get('predicted_volatility_21d', 0):.2%}\n"
-        f"- Chế độ thị trường: {signals.get('regime')}\n"
-        f"- Xu hướng giá: {signals.get('direction')} (Độ tin cậy: {confidence:.0%})\n\n"
-        f"Kết luận: Hệ thống khuyến nghị {rec}."
-    )
-    
-    # Optional: Enhance with Groq if API Key exists
-    api_key = os.getenv("GROQ_API_KEY")
-    if api_key:
+    # 2. Generate Rationale in Vietnamese: cached, else LLM if available and fast enough, else template
+    date = inference_result.get("date")
+    cache_key = rationale_key(request.symbol, date, signals, rec)
+    rationale = rationale_store.peek(cache_key)
+    if rationale is None:
+        # The cache is an optimisation: a failing store means an uncached consult
         try:
-             from groq import Groq
-             client = Groq(api_key=api_key)
-             
-             prompt = (
-                 f"Đóng vai trò là một chuyên gia tư vấn tài chính chuyên nghiệp. Hãy phân tích cổ phiếu {request.symbol} dựa trên các tín hiệu sau (Ngày: {inference_result.get('date')}):\n"
-                 f"1. Dự báo Lợi nhuận (21 ngày): {signals.get('predicted_return_21d', 0):.2%}\n"
-                 f"2. Rủi ro biến động (Volatility): {signals.get('predicted_volatility_21d', 0):.2%}\n"
-                 f"3. Chế độ thị trường (Regime): {signals.get('regime')}\n"
-                 f"4. Xu hướng giá (Direction): {signals.get('direction')} (Độ tin cậy mô hình: {confidence:.0%})\n"
-                 f"Hệ thống gợi ý hành động: {rec}.\n\n"
-                 f"Hãy viết một đoạn nhận định đầu tư ngắn gọn (khoảng 3-4 câu) bằng Tiếng Việt. "
-                 f"Giải thích logic đằng sau khuyến nghị này. Tại sao độ tin cậy lại quan trọng ở đây? "
-                 f"Văn phong chuyên nghiệp, bình tĩnh."
-             )
-             
-             completion = client.chat.completions.create(
-                 messages=[{"role": "user", "content": prompt}],
-                 model="llama-3.3-70b-versatile"
-             )
-             rationale = completion.choices[0].message.content
+            rationale = await run_in_threadpool(rationale_store.get, cache_key)
         except Exception as e:
-            print(f"Groq Error: {e}")
-            rationale += f"\n(Lỗi kết nối Groq: {e})"
+            print(f"Rationale cache read failed: {e}")
+    if rationale is None:
+        rationale = await llm.complete(_llm_prompt(request.symbol, inference_result, confidence))
+        if rationale:
+            # Only LLM output is cached; the template is free to rebuild
+            try:
+                await run_in_threadpool(rationale_store.put, cache_key, request.symbol, date, rationale)
+            except Exception as e:
+                print(f"Rationale cache write failed: {e}")
+        else:
+            rationale = _template_rationale(inference_result, confidence)
 
     return jsonable_encoder({
         "symbol": request.symbol,
         "recommendation": rec,
         "rationale": rationale,
         "confidence": round(confidence, 2),
-        "signals": signals
+        "signals": signals,
+        "model_version": inference_result.get("model_version")
     })
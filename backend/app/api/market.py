@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from ..database import get_db
 from ..models.models import StockPrice, Signal
 import pandas as pd
 from typing import List, Optional
+from datetime import date
 from pydantic import BaseModel
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from bisect import bisect_left, bisect_right
 
 router = APIRouter()
 
@@ -22,15 +26,17 @@ class BankHistory(BaseModel):
     rsi: Optional[float] = None
     macd: Optional[float] = None
 
-from pipeline.data_loader import load_market_data, load_fundamental_data
+from pipeline.market_store import (
+    get_market_data, get_sector_history, get_fundamental_data, get_sector_fundamentals, SECTOR_SYMBOL
+)
 
 @router.get("/summary", response_model=MarketSummary)
 def get_market_summary(db: Session = Depends(get_db)):
     """
     Get the latest market summary (Dashboard).
     """
-    # Use real data from pipeline loader
-    df = load_market_data()
+    # Use real data from the shared market store
+    df = get_market_data()
     if df.empty:
          return {
             "date": "N/A",
@@ -68,7 +74,7 @@ def get_symbols():
     """
     Get list of available bank symbols.
     """
-    df = load_market_data()
+    df = get_market_data()
     if df.empty:
         return []
     
@@ -77,70 +83,95 @@ def get_symbols():
         return jsonable_encoder(symbols)
     return jsonable_encoder([])
 
+HISTORY_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+def _history_from_db(db: Session, symbol: str, start, end, limit):
+    """
+    Bars of one symbol from stock_prices, oldest first. The (symbol, date)
+    index serves the range and the ORDER BY, so only returned rows are read.
+    """
+    query = select(*(getattr(StockPrice, c) for c in HISTORY_COLUMNS)).where(StockPrice.symbol == symbol)
+    if start is not None:
+        query = query.where(StockPrice.date >= start)
+    if end is not None:
+        query = query.where(StockPrice.date <= end)
+    # Newest first so LIMIT keeps the most recent bars, then flip
+    rows = db.execute(query.order_by(StockPrice.date.desc()).limit(limit)).all()
+    return [
+        {"date": str(row.date), "open": row.open, "high": row.high, "low": row.low,
+         "close": row.close, "volume": row.volume, "symbol": symbol}
+        for row in reversed(rows)
+    ]
+
+def _sector_history(start, end, limit):
+    """Slice of the materialized sector records, found by binary search on the date."""
+    dates, records = get_sector_history()
+    lo = bisect_left(dates, start.isoformat()) if start is not None else 0
+    hi = bisect_right(dates, end.isoformat()) if end is not None else len(records)
+    if limit is not None:
+        lo = max(lo, hi - limit)
+    return records[lo:hi]
+
+def _history_from_store(symbol: str, start, end, limit):
+    """History of a symbol that was never ingested, from the in-memory market frame."""
+    df = get_market_data()
+    if df.empty:
+        return []
+
+    out_df = df[df["symbol"] == symbol]
+    if start is not None:
+        out_df = out_df[out_df["date"] >= pd.Timestamp(start)]
+    if end is not None:
+        out_df = out_df[out_df["date"] <= pd.Timestamp(end)]
+    if limit is not None:
+        out_df = out_df.tail(limit)
+    out_df = out_df.assign(date=out_df["date"].astype(str))
+    # Replace NaN with None
+    out_df = out_df.astype(object).where(pd.notnull(out_df), None)
+    return out_df.to_dict(orient="records")
+
 @router.get("/history/{symbol}")
-def get_bank_history(symbol: str):
+def get_bank_history(
+    symbol: str,
+    start: Optional[date] = Query(None, description="First date (inclusive)"),
+    end: Optional[date] = Query(None, description="Last date (inclusive)"),
+    limit: Optional[int] = Query(None, ge=1, description="Keep only the most recent N bars"),
+    db: Session = Depends(get_db)
+):
     """
     Get historical data for a specific bank or ALL Industry (Explorer).
+    Single symbols are read from stock_prices (loaded by the pipeline);
+    ALL is the sector series materialized by the market store.
     """
-    df = load_market_data()
-    if df.empty:
+    if symbol == SECTOR_SYMBOL:
+        # Plain JSON values already: skip the response encoder
+        return JSONResponse(content=_sector_history(start, end, limit))
+
+    data = _history_from_db(db, symbol, start, end, limit)
+    if data:
+        return data
+    # Nothing in range: fall back only if the symbol was never ingested
+    exists = db.execute(select(StockPrice.id).where(StockPrice.symbol == symbol).limit(1)).first()
+    if exists is not None:
         return []
-    
-    df["date"] = df["date"].astype(str)
-    
-    if symbol == "ALL":
-        # Aggregate logic: Average Close, Sum Volume per Day
-        # We need numerical columns only
-        numeric_cols = ["open", "high", "low", "close", "volume"] 
-        # Ensure cols exist
-        valid_cols = [c for c in numeric_cols if c in df.columns]
-        
-        agg_df = df.groupby("date")[valid_cols].mean().reset_index()
-        # For volume, sum makes more sense for "Industry Total", but mean is "Average Bank"
-        # User asked for "Toàn ngành" (Whole Industry), so usually Sum Volume, Avg Price index.
-        # Let's use MEAN for price and SUM for volume to represent the sector activity.
-        if "volume" in df.columns:
-             vol_sum = df.groupby("date")["volume"].sum().reset_index()
-             agg_df["volume"] = vol_sum["volume"]
-             
-        # Add a dummy symbol
-        agg_df["symbol"] = "ALL"
-        
-        # Replace NaN with None
-        agg_df = agg_df.where(pd.notnull(agg_df), None)
-        data = agg_df.to_dict(orient="records")
-    else:
-        bank_df = df[df["symbol"] == symbol].copy()
-        # Replace NaN with None
-        bank_df = bank_df.where(pd.notnull(bank_df), None)
-        data = bank_df.to_dict(orient="records")
-        
-    return jsonable_encoder(data)
+    return jsonable_encoder(_history_from_store(symbol, start, end, limit))
 
 @router.get("/financials/{symbol}")
 def get_bank_financials(symbol: str):
     """
     Get quarterly financial data for a bank or ALL Industry avg.
     """
-    df = load_fundamental_data()
-    if df.empty:
-        return []
-
-    # Convert quarter_date to string
-    if "quarter_date" in df.columns:
-        df["quarter_date"] = df["quarter_date"].astype(str)
-    
-    if symbol == "ALL":
-        # Average key metrics across all banks per quarter
-        numeric_cols = ["ROE", "ROA", "P_B", "GDP", "Inflation", "CreditGrowth"] # Add others as needed
-        valid_cols = [c for c in numeric_cols if c in df.columns]
-        
-        agg_df = df.groupby("quarter_date")[valid_cols].mean().reset_index()
+    if symbol == SECTOR_SYMBOL:
+        # Averages across all banks per quarter, precomputed by the store
+        agg_df = get_sector_fundamentals()
         # Replace NaN with None
-        agg_df = agg_df.where(pd.notnull(agg_df), None)
+        agg_df = agg_df.astype(object).where(pd.notnull(agg_df), None)
         return jsonable_encoder(agg_df.to_dict(orient="records"))
-    else:
-        bank_df = df[df["symbol"] == symbol].copy()
-        # Replace NaN with None
-        bank_df = bank_df.where(pd.notnull(bank_df), None)
-        return jsonable_encoder(bank_df.to_dict(orient="records"))
+
+    df = get_fundamental_data()
+    if df.empty:
+        return []
+    bank_df = df[df["symbol"] == symbol]
+    # Replace NaN with None
+    bank_df = bank_df.astype(object).where(pd.notnull(bank_df), None)
+    return jsonable_encoder(bank_df.to_dict(orient="records"))
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, Body
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+import numpy as np
+
+from pipeline.market_store import get_market_data
+from pipeline.portfolio import PortfolioOptimizer, OBJECTIVES
+from pipeline.covariance import ESTIMATORS
+
+router = APIRouter()
+
+class OptimizeRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # None or empty -> all symbols
+    objective: str = "max_sharpe"        # min_variance | max_sharpe | target_return
+    target_return: Optional[float] = None
+    risk_free_rate: float = 0.03
+    max_weight: float = Field(1.0, gt=0, le=1)
+    cov_method: Optional[str] = None     # sample | ledoit_wolf | ewma | single_factor (default: config)
+    window: Optional[int] = Field(None, ge=2)  # trailing days up to end_date; None -> whole range
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    frontier_points: int = Field(50, ge=0, le=500)  # 0 -> no frontier
+
+def _optimize(request: OptimizeRequest):
+    df = get_market_data()
+    if request.symbols:
+        df = df[df["symbol"].isin(request.symbols)]
+    if df.empty:
+        raise ValueError("No market data for the requested symbols.")
+
+    opt = PortfolioOptimizer(
+        start_date=request.start_date, end_date=request.end_date,
+        cov_method=request.cov_method, window=request.window
+    )
+    opt.load_data(df)
+    opt.calculate_metrics()
+    result = opt.optimize(
+        target_return=request.target_return,
+        risk_free_rate=request.risk_free_rate,
+        objective=request.objective,
+        max_weight=request.max_weight
+    )
+
+    frontier = []
+    if request.frontier_points:
+        _, _, ret, vol, sharpe = opt.efficient_frontier(
+            request.frontier_points, request.max_weight, request.risk_free_rate
+        )
+        frontier = [
+            {"expected_return": r, "expected_volatility": v, "sharpe_ratio": None if np.isnan(s) else s}
+            for r, v, s in zip(ret.tolist(), vol.tolist(), sharpe.tolist())
+        ]
+
+    return {
+        "status": "success",
+        "objective": request.objective,
+        "cov_method": opt.cov_method,
+        "symbols": opt.symbols,
+        "n_observations": min(len(opt.daily_returns), request.window or len(opt.daily_returns)),
+        **result,
+        "frontier": frontier
+    }
+
+@router.post("/optimize")
+async def optimize_portfolio(request: OptimizeRequest = Body(default=OptimizeRequest())):
+    """
+    Long-only mean-variance portfolio (min-variance, max-Sharpe or target
+    return, with a per-name cap) plus the efficient frontier.
+    """
+    if request.objective not in OBJECTIVES:
+        raise HTTPException(status_code=400, detail=f"objective must be one of {', '.join(OBJECTIVES)}")
+    if request.cov_method and request.cov_method not in ESTIMATORS:
+        raise HTTPException(status_code=400, detail=f"cov_method must be one of {', '.join(ESTIMATORS)}")
+    try:
+        result = await run_in_threadpool(_optimize, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return jsonable_encoder(result)
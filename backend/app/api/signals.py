@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
 from backend.app.database import get_db
-from backend.app.models.models import Signal, StockPrice
+from backend.app.models.models import Signal, StockPrice, LatestSignal
 from pydantic import BaseModel
 from datetime import date
 
@@ -30,6 +30,7 @@ def get_signals(
 ):
     query = db.query(Signal)
     if symbol:
+        # Served by ix_signals_symbol_date_desc: index range scan, no sort
         query = query.filter(Signal.symbol == symbol)
     
     # Get latest signals first
@@ -38,6 +39,12 @@ def get_signals(
 @router.get("/signals/latest", response_model=List[SignalSchema])
 def get_latest_signals(db: Session = Depends(get_db)):
     """Get the most recent signal for each stock"""
+    # Maintained by the pipeline at write time: one row per symbol
+    latest = db.query(LatestSignal).order_by(LatestSignal.symbol).all()
+    if latest:
+        return latest
+
+    # Database written before latest_signal existed
     subquery = db.query(
         Signal.symbol, 
         func.max(Signal.date).label('max_date')
@@ -1,12 +1,56 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 SQLAPLCHEMY_DATABASE_URL = "sqlite:///./data/vnbank.db"
 
+# --- SQLite storage profile (env) ---
+# WAL lets dashboard reads proceed while the pipeline writes
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")         # safe with WAL
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))       # negative = KiB (64 MiB)
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))     # seconds to wait on a lock
+
+# --- Connection pool (env) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
 engine = create_engine(
-    SQLAPLCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLAPLCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+    poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=False,  # local file: connections don't go stale
 )
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    finally:
+        cursor.close()
+
+def pool_status(bind=engine):
+    """Connection pool counters for /health."""
+    pool = bind.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -17,3 +61,60 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def ensure_columns(bind=engine):
+    """
+    create_all() does not alter existing tables either: adds nullable
+    columns that were added to the models later (existing rows get NULL).
+    """
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+
+def _drop_duplicates(bind, table, index):
+    """Deletes rows duplicating `index`'s columns, keeping the newest (highest id) of each."""
+    cols = ", ".join(c.name for c in index.columns)
+    with bind.begin() as conn:
+        removed = conn.execute(text(
+            f"DELETE FROM {table.name} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {table.name} GROUP BY {cols})"
+        )).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate rows from {table.name} to create {index.name}")
+
+def ensure_indexes(bind=engine, dedupe=False):
+    """
+    create_all() skips tables that already exist, so indexes added to the
+    models later are never created on an existing database. Creates the
+    missing ones. A unique index that existing rows violate is skipped
+    with a warning; with dedupe=True (the pipeline, not server startup)
+    duplicate rows are deleted first, keeping the newest. Partial unique
+    indexes (jobs) only cover some rows and are never deduplicated.
+    """
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            partial = index.dialect_options["sqlite"]["where"] is not None
+            if dedupe and index.unique and "id" in table.c and not partial:
+                _drop_duplicates(bind, table, index)
+            try:
+                index.create(bind=bind)
+            except IntegrityError as e:
+                if partial or dedupe:
+                    print(f"Warning: index {index.name} not created, existing rows violate it: {e.orig}")
+                else:
+                    print(f"Warning: index {index.name} not created, {table.name} has duplicate rows; "
+                          f"run the pipeline (python -m pipeline.run_pipeline) to remove them.")
@@ -1,17 +1,23 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import os
 
 load_dotenv() # Load variables from .env
 
-from .database import engine, Base, get_db
+from .database import engine, Base, get_db, ensure_columns, ensure_indexes, pool_status
 from backend.app.models import models
-from backend.app.api import signals, market, advisor, admin
+from backend.app.api import signals, market, advisor, admin, portfolio
+from backend.app.services.llm import close_llm_service
+from pipeline.model_registry import model_registry
 
-# Create tables
+# Create tables (and columns/indexes added to existing ones)
 Base.metadata.create_all(bind=engine)
+ensure_columns()
+ensure_indexes()
 
 app = FastAPI(title="VN Bank Advisor API")
 
@@ -19,6 +25,17 @@ app.include_router(signals.router, prefix="/api/v1", tags=["signals"])
 app.include_router(market.router, prefix="/api/v1/market", tags=["market"])
 app.include_router(advisor.router, prefix="/api/v1/advisor", tags=["advisor"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+app.include_router(portfolio.router, prefix="/api/v1/portfolio", tags=["portfolio"])
+
+@app.on_event("startup")
+def load_models_on_startup():
+    # Deserialize the model bundle once; requests share it via the registry
+    model_registry.load()
+
+@app.on_event("shutdown")
+async def close_llm_on_shutdown():
+    # Release the pooled LLM client's connections
+    await close_llm_service()
 
 # Configure CORS
 app.add_middleware(
@@ -35,4 +52,13 @@ def read_root():
 
 @app.get("/health")
 def health_check(db: Session = Depends(get_db)):
-    return {"status": "ok", "db": "connected"}
+    """Runs a real query and reports the storage profile and pool counters."""
+    try:
+        db.execute(text("SELECT 1"))
+        journal_mode = db.execute(text("PRAGMA journal_mode")).scalar()
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "db": "unavailable", "message": str(e), "pool": pool_status()}
+        )
+    return {"status": "ok", "db": "connected", "journal_mode": journal_mode, "pool": pool_status()}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from backend.app.database import Base
 from datetime import datetime
@@ -13,6 +13,10 @@ class User(Base):
 
 class StockPrice(Base):
     __tablename__ = "stock_prices"
+    __table_args__ = (
+        # One bar per symbol and day; conflict target for bulk upserts
+        Index("uq_stock_prices_symbol_date", "symbol", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
@@ -25,6 +29,9 @@ class StockPrice(Base):
 
 class Signal(Base):
     __tablename__ = "signals"
+    __table_args__ = (
+        Index("uq_signals_symbol_date", "symbol", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
@@ -41,3 +48,57 @@ class Signal(Base):
     confidence = Column(Float)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+# Per-symbol history lookups (WHERE symbol = ? ORDER BY date DESC LIMIT n)
+Index("ix_stock_prices_symbol_date_desc", StockPrice.symbol, StockPrice.date.desc())
+Index("ix_signals_symbol_date_desc", Signal.symbol, Signal.date.desc())
+
+class LatestSignal(Base):
+    """Most recent signal per symbol, maintained whenever signals are written."""
+    __tablename__ = "latest_signal"
+
+    symbol = Column(String, primary_key=True)
+    signal_id = Column(Integer)
+    date = Column(Date)
+
+    signal_1 = Column(Float)
+    signal_2 = Column(Float)
+    signal_3 = Column(Float)
+    signal_4 = Column(Float)
+
+    prediction = Column(String)
+    confidence = Column(Float)
+
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RationaleCache(Base):
+    __tablename__ = "rationale_cache"
+
+    # sha256 of (symbol, date, signals, recommendation)
+    key = Column(String, primary_key=True)
+    symbol = Column(String, index=True)
+    date = Column(String)
+    rationale = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # At most one running job per kind, also across server processes
+        Index("uq_jobs_running_kind", "kind", unique=True, sqlite_where=text("state = 'running'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True)   # retrain | pipeline
+    state = Column(String, index=True)  # running | succeeded | failed | cancelled
+    pid = Column(Integer)
+    pgid = Column(Integer)              # process group signalled on cancel
+    process_start = Column(String)      # OS start time of pid, to detect pid reuse
+    exit_code = Column(Integer)
+    message = Column(String)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -0,0 +1,262 @@
+import os
+import sys
+import signal
+import threading
+import subprocess
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.app.database import SessionLocal
+from backend.app.models.models import Job
+from pipeline.config import ROOT_DIR, ARTIFACTS_DIR
+
+LOG_PATH = os.path.join(ARTIFACTS_DIR, "pipeline.log")
+
+# Pipeline kinds and the command each one runs (from the project root)
+JOB_COMMANDS = {
+    "retrain": [sys.executable, "-u", "-m", "pipeline.train_pipeline"],
+    "pipeline": [sys.executable, "-u", "-m", "pipeline.run_pipeline"],
+}
+
+ACTIVE_STATES = ("running",)
+
+
+def job_to_dict(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "state": job.state,
+        "pid": job.pid,
+        "pgid": job.pgid,
+        "exit_code": job.exit_code,
+        "message": job.message,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid):
+    """Start time of a process (Linux /proc, clock ticks since boot), or None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Field 22; the command name (field 2) may contain spaces, so split after it
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def _is_job_process(job):
+    """
+    True if job.pid is still the process the job started: same process
+    group and, where the OS reports it, the same start time. Guards against
+    signalling an unrelated process that reused the pid after a restart.
+    """
+    if not job.pgid or not _pid_alive(job.pid):
+        return False
+    try:
+        if os.getpgid(job.pid) != job.pgid:
+            return False
+    except (ProcessLookupError, PermissionError):
+        return False
+    return job.process_start is None or _process_start(job.pid) == job.process_start
+
+
+class JobManager:
+    """
+    Runs pipeline kinds as tracked subprocesses, one at a time per kind
+    (a partial unique index on jobs enforces it across server processes).
+
+    Every job is a row in the `jobs` table (state, PID, timestamps, exit
+    code). A watcher thread per job records the exit. Jobs left `running`
+    by a previous server process are reconciled by PID: still alive means
+    the kind stays busy, otherwise the job is marked failed.
+    """
+    def __init__(self, session_factory=SessionLocal, commands=None, log_path=LOG_PATH):
+        self.session_factory = session_factory
+        self.commands = commands or JOB_COMMANDS
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._processes = {}   # job id -> Popen, for jobs started by this process
+        self._cancelled = set()
+
+    def _log(self, text):
+        with open(self.log_path, "a") as f:
+            f.write(f"\n[{datetime.now().strftime('%H:%M:%S')}] {text}\n")
+
+    def _alive(self, job):
+        # Rows written before pgid was recorded can only be checked by pid
+        return _pid_alive(job.pid) if job.pgid is None else _is_job_process(job)
+
+    def _reconcile(self, db, job):
+        """Marks a running job failed if its process is gone and we can't wait on it."""
+        if job.state in ACTIVE_STATES and job.id not in self._processes and not self._alive(job):
+            job.state = "failed"
+            job.message = "Process lost (server restarted?)"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        return job
+
+    def active_job(self, db, kind):
+        jobs = db.query(Job).filter(Job.kind == kind, Job.state.in_(ACTIVE_STATES)).all()
+        active = [j for j in (self._reconcile(db, j) for j in jobs) if j.state in ACTIVE_STATES]
+        return active[0] if active else None
+
+    def start(self, kind):
+        """
+        Starts a job of `kind` unless one is already running.
+        Returns (job dict, created) where created is False for the existing job.
+        """
+        if kind not in self.commands:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        with self._lock:
+            db = self.session_factory()
+            try:
+                existing = self.active_job(db, kind)
+                if existing is not None:
+                    return job_to_dict(existing), False
+
+                job = Job(kind=kind, state="running", started_at=datetime.utcnow())
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # uq_jobs_running_kind: another server process started one since the check
+                    db.rollback()
+                    existing = self.active_job(db, kind)
+                    if existing is None:
+                        raise
+                    return job_to_dict(existing), False
+
+                self._log(f"Starting {kind} job #{job.id} via {sys.executable}...")
+                try:
+                    with open(self.log_path, "a") as log_file:
+                        process = subprocess.Popen(
+                            self.commands[kind],
+                            cwd=ROOT_DIR,
+                            stdout=log_file,
+                            stderr=log_file,
+                            # Own process group, so cancel also stops worker processes
+                            start_new_session=True
+                        )
+                except Exception as e:
+                    job.state = "failed"
+                    job.message = str(e)
+                    job.finished_at = datetime.utcnow()
+                    db.commit()
+                    return job_to_dict(job), True
+
+                job.pid = process.pid
+                job.pgid = process.pid  # start_new_session: the child leads its group
+                job.process_start = _process_start(process.pid)
+                db.commit()
+                self._processes[job.id] = process
+                result = job_to_dict(job)
+            finally:
+                db.close()
+
+        threading.Thread(target=self._watch, args=(result["id"], process), daemon=True).start()
+        return result, True
+
+    def _watch(self, job_id, process):
+        exit_code = process.wait()
+        with self._lock:
+            self._processes.pop(job_id, None)
+            cancelled = job_id in self._cancelled
+            self._cancelled.discard(job_id)
+
+        db = self.session_factory()
+        try:
+            job = db.get(Job, job_id)
+            job.exit_code = exit_code
+            job.finished_at = datetime.utcnow()
+            if cancelled:
+                job.state = "cancelled"
+            else:
+                job.state = "succeeded" if exit_code == 0 else "failed"
+            db.commit()
+            kind, state = job.kind, job.state
+        finally:
+            db.close()
+        self._log(f"{kind} job #{job_id} {state} (exit code {exit_code})")
+
+    def cancel(self, job_id):
+        """
+        Sends SIGTERM to a running job's process group. Returns the job dict,
+        or None if unknown. A job from another server process is only
+        signalled if its pid still has the recorded process group and start time.
+        """
+        db = self.session_factory()
+        try:
+            job = db.get(Job, job_id)
+            if job is None:
+                return None
+            job = self._reconcile(db, job)
+            if job.state not in ACTIVE_STATES:
+                return job_to_dict(job)
+
+            with self._lock:
+                tracked = job_id in self._processes
+                if tracked:
+                    self._cancelled.add(job_id)
+
+            if tracked or _is_job_process(job):
+                try:
+                    os.killpg(job.pgid or job.pid, signal.SIGTERM)
+                except (ProcessLookupError, PermissionError) as e:
+                    job.message = f"Could not signal process group: {e}"
+                signalled = True
+            else:
+                # The pid can't be shown to still be the job's: never signal it
+                signalled = False
+
+            if not tracked:
+                # Started by another server process: no watcher will record the exit
+                job.state = "cancelled"
+                job.finished_at = datetime.utcnow()
+                if not signalled:
+                    job.message = "Process not verified (server restarted?); not signalled"
+                db.commit()
+            else:
+                job.message = job.message or "Cancellation requested"
+                db.commit()
+            return job_to_dict(job)
+        finally:
+            db.close()
+
+    def get(self, job_id):
+        db = self.session_factory()
+        try:
+            job = db.get(Job, job_id)
+            return job_to_dict(self._reconcile(db, job)) if job else None
+        finally:
+            db.close()
+
+    def list_jobs(self, kind=None, limit=20):
+        db = self.session_factory()
+        try:
+            query = db.query(Job)
+            if kind:
+                query = query.filter(Job.kind == kind)
+            jobs = query.order_by(Job.id.desc()).limit(limit).all()
+            return [job_to_dict(self._reconcile(db, j)) for j in jobs]
+        finally:
+            db.close()
+
+
+job_manager = JobManager()
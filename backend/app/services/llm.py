@@ -0,0 +1,126 @@
+import os
+import asyncio
+
+# --- Config (env) ---
+LLM_PROVIDER = os.getenv("ADVISOR_LLM_PROVIDER", "groq")          # groq | stub | none
+LLM_MODEL = os.getenv("ADVISOR_LLM_MODEL", "llama-3.3-70b-versatile")
+LLM_CONCURRENCY = int(os.getenv("ADVISOR_LLM_CONCURRENCY", "4"))   # in-flight LLM calls
+LLM_TIMEOUT = float(os.getenv("ADVISOR_LLM_TIMEOUT", "8"))         # seconds, incl. queueing
+
+
+class LLMProvider:
+    """Interface for rationale generators."""
+
+    async def complete(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class GroqProvider(LLMProvider):
+    """Groq chat completions over one pooled async client."""
+
+    def __init__(self, api_key, model=LLM_MODEL):
+        self.api_key = api_key
+        self.model = model
+        self._client = None
+
+    def _get_client(self):
+        # Created on first use and reused, so HTTP connections are pooled
+        if self._client is None:
+            from groq import AsyncGroq
+            self._client = AsyncGroq(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    async def complete(self, prompt: str) -> str:
+        completion = await self._get_client().chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=self.model
+        )
+        return completion.choices[0].message.content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class StubLLMProvider(LLMProvider):
+    """Local provider for tests and offline use: returns a fixed reply, optionally after a delay."""
+
+    def __init__(self, reply="Nhận định mẫu (stub).", delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.reply
+
+
+class LLMService:
+    """
+    Bounded, time-limited access to an LLM provider.
+    complete() returns None when no provider is configured, the call
+    times out (waiting for a slot counts too), or the provider fails; the
+    caller then falls back to its template text.
+    """
+
+    def __init__(self, provider=None, concurrency=LLM_CONCURRENCY, timeout=LLM_TIMEOUT):
+        self.provider = provider
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _call(self, prompt):
+        async with self._semaphore:
+            return await self.provider.complete(prompt)
+
+    async def complete(self, prompt: str):
+        if self.provider is None:
+            return None
+        try:
+            return await asyncio.wait_for(self._call(prompt), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            print(f"LLM timeout after {self.timeout}s, using template rationale.")
+        except Exception as e:
+            print(f"LLM Error: {e}")
+        return None
+
+    async def aclose(self):
+        if self.provider is not None:
+            await self.provider.aclose()
+
+
+def _provider_from_env():
+    if LLM_PROVIDER == "stub":
+        return StubLLMProvider()
+    if LLM_PROVIDER == "groq":
+        api_key = os.getenv("GROQ_API_KEY")
+        return GroqProvider(api_key) if api_key else None
+    return None
+
+
+_llm_service = None
+
+
+def get_llm_service() -> LLMService:
+    """FastAPI dependency; override it (or call set_llm_provider) to swap providers."""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService(_provider_from_env())
+    return _llm_service
+
+
+def set_llm_provider(provider, concurrency=LLM_CONCURRENCY, timeout=LLM_TIMEOUT):
+    """Replaces the shared service, e.g. with a StubLLMProvider in tests."""
+    global _llm_service
+    _llm_service = LLMService(provider, concurrency=concurrency, timeout=timeout)
+    return _llm_service
+
+
+async def close_llm_service():
+    if _llm_service is not None:
+        await _llm_service.aclose()
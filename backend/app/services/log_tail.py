@@ -0,0 +1,78 @@
+import os
+import asyncio
+
+BLOCK_SIZE = 8192
+
+
+def tail_lines(path, n=50, block_size=BLOCK_SIZE):
+    """
+    Last `n` lines of a text file, read by seeking backwards from the end
+    in fixed-size blocks; cost depends on n and line length, not file size.
+    """
+    return tail_with_offset(path, n, block_size)[0]
+
+
+def tail_with_offset(path, n=50, block_size=BLOCK_SIZE):
+    """
+    (last `n` lines, end offset): the offset is the file size the tail was
+    read up to, for follow_lines to continue from without a gap.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        if n <= 0:
+            return [], end
+        data = b""
+        # n lines need n+1 newlines unless we reach the start of the file
+        while pos > 0 and data.count(b"\n") <= n:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            data = f.read(read_size) + data
+
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return [line.strip() for line in lines[-n:]], end
+
+
+async def follow_lines(path, start=None, poll_interval=0.5):
+    """
+    Yields lines appended to `path` from byte offset `start` (default: its
+    size at the call), like `tail -f`. Starts over from the beginning if
+    the file is truncated or replaced, and waits if it doesn't exist yet.
+    """
+    if start is not None:
+        pos = start
+    else:
+        try:
+            pos = os.path.getsize(path)  # only lines written after this call
+        except FileNotFoundError:
+            pos = 0
+    f, inode, pending = None, None, b""
+    try:
+        while True:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None
+
+            if st is not None and (f is None or st.st_ino != inode or st.st_size < pos):
+                if f is not None:
+                    f.close()
+                if f is not None or st.st_size < pos:
+                    pos, pending = 0, b""  # rotated/truncated: read the new content
+                f = open(path, "rb")
+                inode = st.st_ino
+                f.seek(pos)
+
+            chunk = f.read() if f is not None else b""
+            if chunk:
+                pos += len(chunk)
+                data = pending + chunk
+                *complete, pending = data.split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8", errors="replace").strip()
+            else:
+                await asyncio.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
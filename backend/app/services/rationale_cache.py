@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from backend.app.database import SessionLocal
+from backend.app.models.models import RationaleCache
+
+# --- Config (env) ---
+CACHE_TTL_SECONDS = int(os.getenv("ADVISOR_RATIONALE_TTL", str(24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("ADVISOR_RATIONALE_CACHE_SIZE", "1000"))
+
+# Inputs the rationale depends on; anything else in signals is ignored
+KEY_SIGNALS = ["predicted_return_21d", "predicted_volatility_21d", "regime", "direction"]
+
+
+def rationale_key(symbol, date, signals, recommendation):
+    """Stable hash of everything the LLM prompt is built from."""
+    payload = {
+        "symbol": symbol,
+        "date": str(date),
+        "signals": {k: signals.get(k) for k in KEY_SIGNALS},
+        "recommendation": recommendation,
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RationaleStore:
+    """
+    Two-level rationale cache: an in-process LRU dict in front of the
+    `rationale_cache` table in vnbank.db.
+
+    peek() only touches memory and is safe to call on the event loop;
+    get()/put() hit SQLite and should run in the thread pool. Entries
+    expire after `ttl` seconds; beyond `max_entries` the least recently
+    used rows are evicted from both levels. Memory hits don't refresh
+    last_used_at in the table, so the table's LRU order is approximate.
+    """
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, session_factory=SessionLocal):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_entries = max_entries
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        # key -> (created_at, rationale), most recently used last
+        self._memory = OrderedDict()
+
+    def _expired(self, created_at, now=None):
+        return (now or datetime.utcnow()) - created_at > self.ttl
+
+    def _remember(self, key, created_at, rationale):
+        with self._lock:
+            self._memory[key] = (created_at, rationale)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def peek(self, key):
+        """Memory-only lookup."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0]):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry[1]
+
+    def get(self, key):
+        """Memory, then SQLite. Returns None on miss or expiry."""
+        rationale = self.peek(key)
+        if rationale is not None:
+            return rationale
+
+        db = self.session_factory()
+        try:
+            row = db.get(RationaleCache, key)
+            if row is None:
+                return None
+            now = datetime.utcnow()
+            if self._expired(row.created_at, now):
+                db.delete(row)
+                db.commit()
+                return None
+            row.last_used_at = now
+            db.commit()
+            self._remember(key, row.created_at, row.rationale)
+            return row.rationale
+        finally:
+            db.close()
+
+    def put(self, key, symbol, date, rationale):
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            db.merge(RationaleCache(
+                key=key, symbol=symbol, date=str(date), rationale=rationale,
+                created_at=now, last_used_at=now
+            ))
+            db.flush()
+            self._evict(db, now)
+            db.commit()
+        finally:
+            db.close()
+        self._remember(key, now, rationale)
+
+    def _evict(self, db, now):
+        # Expired rows first, then least recently used beyond max_entries
+        db.query(RationaleCache).filter(RationaleCache.created_at < now - self.ttl).delete(synchronize_session=False)
+        overflow = db.query(RationaleCache).count() - self.max_entries
+        if overflow > 0:
+            stale = (db.query(RationaleCache.key)
+                     .order_by(RationaleCache.last_used_at.asc())
+                     .limit(overflow)
+                     .subquery())
+            db.query(RationaleCache).filter(RationaleCache.key.in_(stale.select())).delete(synchronize_session=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        db = self.session_factory()
+        try:
+            db.query(RationaleCache).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+rationale_store = RationaleStore()
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getLogs, triggerPipeline, retrainModel, getTrainingResults, getTrainingMetrics } from '../services/api';
+import { getLogs, streamLogs, triggerPipeline, retrainModel, getTrainingResults, getTrainingCalibration, getTrainingMetrics } from '../services/api';
 import { Terminal, Play, RefreshCw, Activity, Server, ShieldCheck, BarChart2, TrendingUp, CheckCircle2 } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Brush } from 'recharts';
 
@@ -7,9 +7,14 @@ const Admin = () => {
     const [logs, setLogs] = useState([]);
     const [status, setStatus] = useState('');
     const [trainingData, setTrainingData] = useState([]);
+    const [resultModels, setResultModels] = useState([]);
+    const [resultSymbols, setResultSymbols] = useState([]);
+    const [resultFolds, setResultFolds] = useState([]);
+    const [calibration, setCalibration] = useState([]);
     const [metrics, setMetrics] = useState([]);
     const [selectedModel, setSelectedModel] = useState('return');
     const [viewSymbol, setViewSymbol] = useState('');
+    const [selectedFold, setSelectedFold] = useState(''); // '' = all walk-forward test years
     const [isTraining, setIsTraining] = useState(false);
 
     const fetchLogs = async () => {
@@ -21,25 +26,52 @@ const Admin = () => {
         }
     };
 
+    // Chart series is filtered, averaged (ALL) and downsampled server-side
+    const MAX_CHART_POINTS = 1500;
+
     const fetchTrainingResults = async () => {
         try {
-            const res = await getTrainingResults();
+            // Until a symbol is picked, only fetch the selector options
+            const fold = selectedFold ? { fold: selectedFold } : {};
+            const params = viewSymbol
+                ? { model: selectedModel, symbol: viewSymbol, max_points: MAX_CHART_POINTS, ...fold }
+                : { model: selectedModel, page_size: 1 };
+            const res = await getTrainingResults(params);
             if (res.data.status === "Success") {
+                setResultModels(res.data.models || []);
+                setResultSymbols(res.data.symbols || []);
+                setResultFolds(res.data.folds || []);
+                if (!viewSymbol) {
+                    if (res.data.symbols && res.data.symbols.length > 0) {
+                        setViewSymbol(res.data.symbols[0]);
+                    }
+                    return;
+                }
                 const normalized = (res.data.data || []).map(d => ({
                     ...d,
                     // Backend returns `time`; normalize to `date` for the chart
                     date: d.date || d.time,
                 }));
                 setTrainingData(normalized);
-                if (normalized.length > 0 && !viewSymbol) {
-                    setViewSymbol(normalized[0].symbol);
-                }
             }
         } catch (err) {
             console.error(err);
         }
     };
 
+    // Mean prediction vs realized value per prediction bucket
+    // (classifiers: predicted-class probability vs hit rate)
+    const fetchCalibration = async () => {
+        if (!viewSymbol) return;
+        try {
+            const params = { model: selectedModel, ...(viewSymbol !== 'ALL' && { symbol: viewSymbol }), ...(selectedFold && { fold: selectedFold }) };
+            const res = await getTrainingCalibration(params);
+            setCalibration(res.data.status === "Success" ? res.data.data : []);
+        } catch (err) {
+            console.error(err);
+        }
+    };
+
     const fetchMetrics = async () => {
         try {
             const res = await getTrainingMetrics();
@@ -54,8 +86,10 @@ const Admin = () => {
     const handleTrigger = async () => {
         setStatus('Triggering pipeline...');
         try {
-            await triggerPipeline();
-            setStatus('Pipeline triggered. Logs will update shortly.');
+            const res = await triggerPipeline();
+            setStatus(res.data.status === 'Pipeline already running'
+                ? `Pipeline already running (job #${res.data.job.id}).`
+                : 'Pipeline triggered. Logs will update shortly.');
             setIsTraining(true);
         } catch (err) {
             setStatus('Error triggering pipeline.');
@@ -65,8 +99,14 @@ const Admin = () => {
     const handleRetrain = async () => {
         setStatus('Triggering model retraining...');
         try {
-            await retrainModel();
-            setStatus('Retraining started (PID). Check logs for progress.');
+            const res = await retrainModel();
+            if (res.data.status === 'Error') {
+                setStatus(`Error triggering retraining: ${res.data.message}`);
+                return;
+            }
+            setStatus(res.data.status === 'Retraining already running'
+                ? `Retraining already running (job #${res.data.job.id}, PID ${res.data.pid}).`
+                : `Retraining started (job #${res.data.job.id}, PID ${res.data.pid}). Check logs for progress.`);
             setIsTraining(true);
         } catch (err) {
             setStatus('Error triggering retraining.');
@@ -75,50 +115,32 @@ const Admin = () => {
 
     useEffect(() => {
         fetchLogs();
-        fetchTrainingResults();
         fetchMetrics();
     }, []);
 
-    // Controlled polling: Only poll when training
     useEffect(() => {
-        let interval;
-        if (isTraining) {
-            interval = setInterval(() => {
-                fetchLogs();
-            }, 2000);
-        }
-        return () => clearInterval(interval);
+        fetchTrainingResults();
+        fetchCalibration();
+    }, [selectedModel, viewSymbol, selectedFold]);
+
+    // Stream new log lines while training instead of polling
+    const MAX_LOG_LINES = 500;
+    useEffect(() => {
+        if (!isTraining) return;
+        fetchLogs();
+        const source = streamLogs();
+        source.onmessage = (e) => {
+            setLogs(prev => [...prev, e.data].slice(-MAX_LOG_LINES));
+        };
+        return () => source.close();
     }, [isTraining]);
 
-    // Filter data for chart
-    let chartData;
-    if (viewSymbol === 'ALL') {
-        const modelData = trainingData.filter(d => d.model === selectedModel);
-        // Group by date and average
-        const grouped = {};
-        modelData.forEach(d => {
-            const dateKey = d.date || d.time;
-            if (!dateKey) return;
-            if (!grouped[dateKey]) grouped[dateKey] = { date: dateKey, trueSum: 0, predSum: 0, count: 0 };
-            grouped[dateKey].trueSum += d.true;
-            grouped[dateKey].predSum += d.pred;
-            grouped[dateKey].count += 1;
-        });
-        chartData = Object.values(grouped).map(g => ({
-            date: g.date,
-            true: g.trueSum / g.count,
-            pred: g.predSum / g.count
-        })).sort((a, b) => new Date(a.date) - new Date(b.date));
-    } else {
-        chartData = trainingData
-            .filter(d => d.model === selectedModel && d.symbol === viewSymbol)
-            .map(d => ({ ...d, date: d.date || d.time }))
-            .sort((a, b) => new Date(a.date) - new Date(b.date));
-    }
+    // Server returns the selected model/symbol series, sorted by date
+    const chartData = trainingData;
 
-    // Unique symbols and models for selectors
-    const symbols = ['ALL', ...new Set(trainingData.map(d => d.symbol))];
-    const models = [...new Set(trainingData.map(d => d.model))];
+    // Symbols and models for selectors
+    const symbols = ['ALL', ...resultSymbols];
+    const models = resultModels;
 
     // Filter metrics for display
     const currentModelMetrics = metrics.find(m => m.model === selectedModel);
@@ -136,10 +158,11 @@ const Admin = () => {
         // Check for completion
         if (logs.length > 0) {
             const lastLog = logs[logs.length - 1];
-            if (lastLog.includes("Training Complete")) {
+            if (lastLog.includes("Training Complete") || lastLog.includes("Training Pipeline Completed")) {
                 if (isTraining) {
                     setStatus("Training Complete. Validation data updated.");
                     fetchTrainingResults();
+                    fetchCalibration();
                     fetchMetrics();
                     setIsTraining(false); // Stop polling and scrolling
                 }
@@ -211,10 +234,10 @@ const Admin = () => {
             <div className="bg-gray-900 border border-gray-800 rounded-xl p-6">
                 <h2 className="text-lg font-bold mb-6 flex items-center gap-2">
                     <BarChart2 size={18} className="text-purple-500" />
-                    Model Performance Validation (True vs Pred)
+                    Model Performance Validation (Out-of-fold True vs Pred)
                 </h2>
 
-                {trainingData.length > 0 ? (
+                {resultModels.length > 0 ? (
                     <div>
                         <div className="flex flex-col md:flex-row gap-6 mb-6">
                             <div className="flex-1 space-y-4">
@@ -234,6 +257,15 @@ const Admin = () => {
                                     >
                                         {symbols.map(s => <option key={s} value={s}>{s === 'ALL' ? 'ALL SYMBOLS (AVG)' : s}</option>)}
                                     </select>
+
+                                    <select
+                                        value={selectedFold}
+                                        onChange={e => setSelectedFold(e.target.value)}
+                                        className="bg-gray-950 border border-gray-700 text-white rounded px-3 py-2 text-sm flex-1"
+                                    >
+                                        <option value="">ALL TEST YEARS</option>
+                                        {resultFolds.map(f => <option key={f} value={f}>{f}</option>)}
+                                    </select>
                                 </div>
 
                                 {currentModelMetrics && (
@@ -292,6 +324,30 @@ const Admin = () => {
                                 </LineChart>
                             </ResponsiveContainer>
                         </div>
+
+                        {calibration.length > 0 && (
+                            <div className="mt-6">
+                                <p className="text-gray-400 text-xs uppercase font-bold tracking-wider mb-2">
+                                    Calibration ({currentModelMetrics && currentModelMetrics.accuracy !== undefined ? 'class probability vs hit rate' : 'mean predicted vs realized'}, by prediction bucket)
+                                </p>
+                                <div className="h-56 w-full bg-white rounded border border-gray-200 p-4">
+                                    <ResponsiveContainer width="100%" height="100%">
+                                        <LineChart data={calibration}>
+                                            <CartesianGrid strokeDasharray="3 3" stroke="#e5e7eb" vertical={false} />
+                                            <XAxis dataKey="bucket" stroke="#374151" tick={{ fill: '#374151', fontSize: 10 }} />
+                                            <YAxis stroke="#374151" tick={{ fill: '#374151', fontSize: 10 }} />
+                                            <Tooltip
+                                                contentStyle={{ backgroundColor: '#ffffff', borderColor: '#e5e7eb', color: '#111827' }}
+                                                itemStyle={{ color: '#111827' }}
+                                            />
+                                            <Legend wrapperStyle={{ color: '#374151' }} />
+                                            <Line type="monotone" dataKey="pred" stroke="#f59e0b" name="Predicted" strokeWidth={2} />
+                                            <Line type="monotone" dataKey="true" stroke="#10b981" name="Realized" strokeWidth={2} />
+                                        </LineChart>
+                                    </ResponsiveContainer>
+                                </div>
+                            </div>
+                        )}
                     </div>
                 ) : (
                     <div className="text-gray-500 italic text-center py-10">
@@ -1,7 +1,9 @@
 import axios from 'axios';
 
+export const API_BASE_URL = 'http://localhost:8000/api/v1'; // Adjust if backend runs on different port
+
 const api = axios.create({
-    baseURL: 'http://localhost:8000/api/v1', // Adjust if backend runs on different port
+    baseURL: API_BASE_URL,
 });
 
 export const getMarketSummary = () => api.get('/market/summary');
@@ -9,10 +11,18 @@ export const getBankHistory = (symbol) => api.get(`/market/history/${symbol}`);
 export const getSymbols = () => api.get('/market/symbols');
 export const getBankFinancials = (symbol) => api.get(`/market/financials/${symbol}`);
 export const consultAdvisor = (data) => api.post('/advisor/consult', data);
+export const consultAdvisorBatch = (symbols) => api.post('/advisor/consult-batch', { symbols });
 export const getLogs = () => api.get('/admin/logs');
+// Server-Sent Events: last `lines` log lines, then new lines as they are written
+export const streamLogs = (lines = 0) => new EventSource(`${API_BASE_URL}/admin/logs/stream?lines=${lines}`);
 export const triggerPipeline = () => api.post('/admin/trigger-pipeline');
 export const retrainModel = () => api.post('/admin/retrain-model');
-export const getTrainingResults = () => api.get('/admin/training-results');
+export const getJobs = (kind) => api.get('/admin/jobs', { params: { kind } });
+export const cancelJob = (jobId) => api.post(`/admin/jobs/${jobId}/cancel`);
+// params: { model, symbol ('ALL' = average), fold, start, end, max_points, page, page_size }
+export const getTrainingResults = (params = {}) => api.get('/admin/training-results', { params });
+// params: { model, symbol, fold, start, end, bins }
+export const getTrainingCalibration = (params = {}) => api.get('/admin/training-calibration', { params });
 export const getTrainingMetrics = () => api.get('/admin/training-metrics');
 
 export default api;
@@ -0,0 +1,321 @@
+"""
+Vectorized backtest of the advisor's BUY/HOLD/SELL rules.
+
+Walk-forward out-of-fold predictions (results_store) for every
+(date, symbol) are turned into recommendations with inference.recommend
+and replayed as date x symbol arrays, long-only (the Vietnamese market
+has no retail short selling):
+
+    BUY   hold the name from that close
+    SELL  flat from that close
+    HOLD  keep the previous position
+
+Each name gets an equal slice of capital. Trades pay BACKTEST_FEE_RATE
+per side plus BACKTEST_SELL_TAX on sales. With T+2 settlement, shares
+bought at the close of day t can only be sold from day t + SETTLEMENT_DAYS,
+so a SELL inside that window is deferred. Everything is array arithmetic
+over the whole panel; there is no per-day loop.
+
+Without a results store (walk-forward disabled), the feature history is
+scored with the current model bundle instead; those predictions are
+in-sample before the training cutoff.
+
+    python -m pipeline.backtest [--start 2020-01-01] [--end ...] [--sweep] [--workers N]
+"""
+import os
+import json
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from . import config
+from .inference import recommend, score_latest, build_feature_history
+from .feature_store import is_fresh, read_range
+from .market_store import get_market_data
+from . import results_store
+
+TRADING_DAYS = 252
+
+# Per-worker panel, set by _init_worker
+_PANEL = {}
+
+
+def load_feature_history(start=None, end=None):
+    """Feature rows in [start, end], from the feature store when it is fresh."""
+    if is_fresh():
+        try:
+            return read_range(start, end)
+        except Exception as e:
+            print(f"Warning: Feature store unreadable, rebuilding: {e}")
+
+    df = build_feature_history()
+    if df.empty:
+        return df
+    if start is not None:
+        df = df[df["time"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["time"] <= pd.Timestamp(end)]
+    return df
+
+
+def load_out_of_fold(start=None, end=None):
+    """
+    Out-of-fold return and direction predictions from the results store:
+    symbol, time, predicted_return_21d, direction_up (empty if none stored).
+    """
+    columns = ["symbol", "time", "predicted_return_21d", "direction_up"]
+    if not results_store.exists():
+        return pd.DataFrame(columns=columns)
+    df = results_store.read_predictions(("return", "direction"), start, end)
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    wide = df.pivot_table(index=["symbol", "time"], columns="model", values="pred", aggfunc="last")
+    wide = wide.reindex(columns=["return", "direction"]).reset_index()
+    return wide.rename(columns={"return": "predicted_return_21d", "direction": "direction_up"})[columns]
+
+
+def score_history(df, models):
+    """
+    One vectorized predict per model over the whole feature history.
+    Returns symbol, time, predicted_return_21d, direction_up.
+    """
+    scored = score_latest(df, models)
+    return pd.DataFrame({
+        "symbol": df["symbol"].to_numpy(),
+        "time": pd.to_datetime(df["time"]).to_numpy(),
+        "predicted_return_21d": scored["predicted_return_21d"].to_numpy(),
+        "direction_up": scored["direction_up"].to_numpy(dtype=float),
+    })
+
+
+def to_panel(predictions, prices):
+    """
+    Date x symbol arrays on the trading calendar of `prices` (market store
+    frame) over the predictions' date range:
+    {"dates", "symbols", "close", "p_return", "direction_up"} (NaN where missing).
+    """
+    preds = predictions.drop_duplicates(["time", "symbol"], keep="last")
+    first, last = preds["time"].min(), preds["time"].max()
+    prices = prices[(prices["date"] >= first) & (prices["date"] <= last)]
+    prices = prices[prices["symbol"].isin(preds["symbol"].unique())]
+
+    close = prices.pivot_table(index="date", columns="symbol", values="close", aggfunc="last")
+    wide = preds.pivot(index="time", columns="symbol").reindex(index=close.index)
+    return {
+        "dates": close.index,
+        "symbols": close.columns.tolist(),
+        "close": close.to_numpy(dtype=float),
+        "p_return": wide["predicted_return_21d"].reindex(columns=close.columns).to_numpy(dtype=float),
+        "direction_up": wide["direction_up"].reindex(columns=close.columns).to_numpy(dtype=float),
+    }
+
+
+def _ffill(values, valid):
+    """Forward-fills rows of a 2D array where `valid` is False (NaN before the first valid row)."""
+    rows = np.where(valid, np.arange(len(values))[:, None], -1)
+    last = np.maximum.accumulate(rows, axis=0)
+    filled = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    return np.where(last >= 0, filled, np.nan)
+
+
+def positions(p_return, direction_up, threshold=0.02, min_hold=None):
+    """
+    0/1 position held from each close, per (date, symbol).
+    Days without a prediction count as HOLD. A name bought at the close of
+    day t is kept through day t + min_hold - 1 (T+2: sellable from t + 2);
+    the deferral is measured from the first BUY of each run of positions.
+    """
+    min_hold = config.SETTLEMENT_DAYS if min_hold is None else min_hold
+    valid = ~np.isnan(p_return) & ~np.isnan(direction_up)
+    rec = recommend(np.nan_to_num(p_return), np.nan_to_num(direction_up) == 1, threshold).reshape(p_return.shape)
+
+    target = np.where(rec == "BUY", 1.0, np.where(rec == "SELL", 0.0, np.nan))
+    target = np.where(valid, target, np.nan)
+    desired = np.nan_to_num(_ffill(target, ~np.isnan(target)), nan=0.0)
+
+    prev = np.vstack([np.zeros((1, desired.shape[1])), desired[:-1]])
+    entries = (desired == 1.0) & (prev == 0.0)
+    locked = np.zeros_like(entries)
+    for lag in range(1, max(min_hold, 1)):
+        locked[lag:] |= entries[:-lag]
+    return np.maximum(desired, locked.astype(float))
+
+
+def simulate(close, p_return, direction_up, threshold=0.02, fee_rate=None, sell_tax=None, min_hold=None):
+    """
+    Runs the rules over (date x symbol) arrays.
+    Returns (daily net portfolio return, positions, benchmark return, trade stats).
+    """
+    fee_rate = config.BACKTEST_FEE_RATE if fee_rate is None else fee_rate
+    sell_tax = config.BACKTEST_SELL_TAX if sell_tax is None else sell_tax
+
+    pos = positions(p_return, direction_up, threshold, min_hold)
+    # Names can't trade on days without a price: keep yesterday's position
+    has_price = ~np.isnan(close)
+    pos = np.nan_to_num(_ffill(np.where(has_price, pos, np.nan), has_price), nan=0.0)
+
+    # Close-to-close return of each name, 0 on days without a price
+    last_close = _ffill(close, has_price)
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), last_close[:-1]])
+    ret = np.where(has_price & (prev_close > 0), close / prev_close - 1.0, 0.0)
+    ret = np.nan_to_num(ret)
+
+    prev_pos = np.vstack([np.zeros((1, pos.shape[1])), pos[:-1]])
+    bought = np.clip(pos - prev_pos, 0.0, None)
+    sold = np.clip(prev_pos - pos, 0.0, None)
+    cost = bought * fee_rate + sold * (fee_rate + sell_tax)
+
+    # Equal capital per name: the portfolio return is the average sleeve return
+    sleeve = prev_pos * ret - cost
+    n_names = close.shape[1]
+    daily = sleeve.sum(axis=1) / n_names
+    listed = has_price.sum(axis=1)
+    benchmark = np.where(listed > 0, (ret * has_price).sum(axis=1) / np.maximum(listed, 1), 0.0)
+
+    # Round trips: group held days by (symbol, trade number)
+    trade_no = np.cumsum(bought > 0, axis=0)
+    held = prev_pos > 0
+    held_trade = np.vstack([np.zeros((1, n_names), dtype=int), trade_no[:-1]])
+    keys = (held_trade * n_names + np.arange(n_names))[held]
+    log_ret = np.log1p(ret[held])
+    trips = np.unique(keys)
+    trip_log = np.bincount(np.searchsorted(trips, keys), weights=log_ret, minlength=len(trips))
+    round_trip_cost = np.log1p(-fee_rate) + np.log1p(-(fee_rate + sell_tax))
+    trip_returns = np.expm1(trip_log + round_trip_cost)
+
+    stats = {
+        "n_trades": int(bought.sum()),
+        "turnover": float((bought + sold).sum() / n_names),
+        "exposure": float(pos.mean()),
+        "hit_rate": float((trip_returns > 0).mean()) if len(trip_returns) else None,
+        "avg_trade_return": float(trip_returns.mean()) if len(trip_returns) else None,
+    }
+    return daily, pos, benchmark, stats
+
+
+def summarize(daily, benchmark, stats):
+    """Equity-curve metrics from daily portfolio returns."""
+    equity = np.cumprod(1.0 + daily)
+    years = max(len(daily) / TRADING_DAYS, 1e-9)
+    vol = float(daily.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(daily) > 1 else 0.0
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "cagr": float(equity[-1] ** (1.0 / years) - 1.0) if equity[-1] > 0 else -1.0,
+        "annual_volatility": vol,
+        "sharpe_ratio": float(daily.mean() * TRADING_DAYS / vol) if vol > 0 else None,
+        "max_drawdown": float(drawdown.min()),
+        "benchmark_return": float(np.prod(1.0 + benchmark) - 1.0),
+        **stats,
+        "annual_turnover": stats["turnover"] / years,
+    }
+
+
+def run_backtest(panel, threshold=0.02, fee_rate=None, sell_tax=None, min_hold=None, curve=True):
+    """Backtest of one parameter set on a panel from to_panel()."""
+    daily, _, benchmark, stats = simulate(
+        panel["close"], panel["p_return"], panel["direction_up"],
+        threshold, fee_rate, sell_tax, min_hold
+    )
+    result = {
+        "params": {
+            "threshold": threshold,
+            "fee_rate": config.BACKTEST_FEE_RATE if fee_rate is None else fee_rate,
+            "sell_tax": config.BACKTEST_SELL_TAX if sell_tax is None else sell_tax,
+            "min_hold": config.SETTLEMENT_DAYS if min_hold is None else min_hold,
+        },
+        "start": str(panel["dates"][0].date()),
+        "end": str(panel["dates"][-1].date()),
+        "n_symbols": len(panel["symbols"]),
+        "source": panel.get("source"),
+        "metrics": summarize(daily, benchmark, stats),
+    }
+    if curve:
+        result["equity_curve"] = {
+            "dates": [str(d.date()) for d in panel["dates"]],
+            "equity": np.cumprod(1.0 + daily).round(6).tolist(),
+            "benchmark": np.cumprod(1.0 + benchmark).round(6).tolist(),
+        }
+    return result
+
+
+def _init_worker(panel):
+    _PANEL.update(panel)
+
+
+def _run_case(params):
+    return run_backtest(_PANEL, curve=False, **params)
+
+
+def sweep(panel, grid, workers=None):
+    """
+    Backtests every combination of `grid` ({param: [values]}) in a process
+    pool; the panel is sent once per worker. Returns results in grid order.
+    """
+    names = list(grid)
+    cases = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    n_workers = max(1, min(workers or config.BACKTEST_WORKERS or os.cpu_count() or 1, len(cases)))
+    print(f"Backtest sweep: {len(cases)} case(s), {n_workers} worker(s)")
+
+    if n_workers == 1:
+        _init_worker(panel)
+        return [_run_case(case) for case in cases]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(panel,)) as pool:
+        return list(pool.map(_run_case, cases))
+
+
+def build_panel(start=None, end=None, models=None):
+    """
+    Panel of stored out-of-fold predictions; when there are none, or
+    `models` is given, the feature history is scored with that bundle
+    (default: the current one). The panel's "source" says which.
+    """
+    if models is None:
+        predictions = load_out_of_fold(start, end)
+        if not predictions.empty:
+            print(f"Using {len(predictions)} out-of-fold predictions from the results store.")
+            return {**to_panel(predictions, get_market_data()), "source": "out_of_fold"}
+
+        print("No out-of-fold predictions stored; scoring with the current models (in-sample before the training cutoff).")
+        from .model_registry import model_registry
+        models = model_registry.get()
+    if not models:
+        raise RuntimeError("No trained models available.")
+
+    df = load_feature_history(start, end)
+    if df.empty:
+        raise RuntimeError("No feature history available.")
+    print(f"Scoring {len(df)} rows with model version {models.get('version')}...")
+    return {**to_panel(score_history(df, models), get_market_data()), "source": "models"}
+
+
+def main(start=None, end=None, run_sweep=False, workers=None):
+    start = start or config.BACKTEST_START_DATE
+    panel = build_panel(start, end)
+    result = run_backtest(panel)
+    if run_sweep:
+        result["sweep"] = sweep(panel, config.BACKTEST_SWEEP_GRID, workers)
+
+    for key, value in result["metrics"].items():
+        print(f"  {key:18s} {value}")
+    path = os.path.join(config.ARTIFACTS_DIR, "backtest.json")
+    with open(path, "w") as f:
+        json.dump(result, f)
+    print(f"Backtest written to {path}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--sweep", action="store_true", help="also run BACKTEST_SWEEP_GRID in a process pool")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.start, args.end, args.sweep, args.workers)
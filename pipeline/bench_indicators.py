@@ -0,0 +1,110 @@
+"""
+Benchmark: vectorized indicator engine vs the previous per-group lambda
+implementation, on the full VN30 market file.
+
+    python -m pipeline.bench_indicators [--repeat N]
+
+Both implementations are run on the same input, their outputs are
+checked for exact equality, and the best wall time of N runs is reported.
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from .data_loader import load_market_data
+from .feature_engineering import (
+    build_market_features,
+    build_technical_features,
+    compute_rsi,
+    compute_atr_pct,
+    compute_bb_width,
+)
+from .feature_eng import (
+    compute_technical_indicators,
+    calculate_rsi,
+    calculate_atr,
+    calculate_bb_width,
+    calculate_rolling_volatility,
+    safe_log_return,
+    safe_log_return_1d,
+)
+
+
+# --- Reference implementations (per-group lambdas / groupby.apply) ---
+
+def legacy_build_technical_features(df):
+    df = df.copy()
+    df["RSI_14"] = df.groupby("symbol")["close"].transform(lambda x: compute_rsi(x, 14))
+
+    def _calc_atr(g):
+        return compute_atr_pct(g["high"], g["low"], g["close"], 14)
+
+    df["ATR_14_pct"] = df.groupby("symbol", group_keys=False).apply(_calc_atr)
+    df["BB_width"] = df.groupby("symbol")["close"].transform(lambda x: compute_bb_width(x, 20, 2))
+    return df
+
+
+def legacy_compute_technical_indicators(df):
+    df = df.copy()
+    df = df.sort_values(['symbol', 'date'])
+    grouped = df.groupby('symbol')
+
+    df['RSI_14'] = grouped['close'].transform(lambda x: calculate_rsi(x, 14))
+    df['ATR_14'] = grouped.apply(lambda x: calculate_atr(x['high'], x['low'], x['close'], 14)).reset_index(level=0, drop=True)
+    df['ATR_14_pct'] = df['ATR_14'] / df['close']
+    df['BB_width'] = grouped['close'].transform(lambda x: calculate_bb_width(x, 20, 2))
+    df['ret_1d'] = grouped['close'].transform(lambda x: safe_log_return_1d(x))
+    df['ret_5d'] = grouped['close'].transform(lambda x: safe_log_return(x, 5))
+    df['ret_1d_lag'] = grouped['close'].transform(lambda x: np.log(x / x.shift(1)))
+    df['ret_5d_lag'] = grouped['close'].transform(lambda x: np.log(x / x.shift(5)))
+    df['ret_21d_lag'] = grouped['close'].transform(lambda x: np.log(x / x.shift(21)))
+    df['vol_5d'] = grouped['close'].transform(lambda x: calculate_rolling_volatility(x, 5))
+    df['vol_21d'] = grouped['close'].transform(lambda x: calculate_rolling_volatility(x, 21))
+    df['high_low_range'] = (df['high'] - df['low']) / df['close']
+    df['ma21'] = grouped['close'].transform(lambda x: x.rolling(21).mean())
+    df['ma63'] = grouped['close'].transform(lambda x: x.rolling(63).mean())
+    df['close_vs_ma21'] = df['close'] / df['ma21'] - 1
+    df['close_vs_ma63'] = df['close'] / df['ma63'] - 1
+    return df
+
+
+def _best_time(func, df, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(repeat=5):
+    market_df = load_market_data()
+    market_feat = build_market_features(market_df)
+    print(f"Input: {len(market_df)} rows, {market_df['symbol'].nunique()} symbols, best of {repeat}\n")
+
+    cases = [
+        ("build_technical_features", legacy_build_technical_features, build_technical_features, market_feat),
+        ("compute_technical_indicators", legacy_compute_technical_indicators, compute_technical_indicators, market_df),
+    ]
+    results = []
+    for name, legacy, vectorized, df in cases:
+        with warnings.catch_warnings():
+            # Zero closes in the source produce inf log-returns in both versions
+            warnings.simplefilter("ignore", RuntimeWarning)
+            t_old, out_old = _best_time(legacy, df, repeat)
+            t_new, out_new = _best_time(vectorized, df, repeat)
+        pd.testing.assert_frame_equal(out_old, out_new, check_exact=True)
+        results.append({"function": name, "legacy_s": t_old, "vectorized_s": t_new, "speedup": t_old / t_new})
+        print(f"{name:30s} legacy {t_old*1000:8.1f} ms | vectorized {t_new*1000:8.1f} ms | "
+              f"x{t_old / t_new:5.1f} | outputs identical")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.repeat)
@@ -4,6 +4,7 @@ import os
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(ROOT_DIR, "data")
 ARTIFACTS_DIR = os.path.join(ROOT_DIR, "artifacts")
+CACHE_DIR = os.path.join(ARTIFACTS_DIR, "cache")  # Parquet copies of cleaned sources
 
 # --- Data Paths ---
 MARKET_DATA_PATH = os.path.join(DATA_DIR, "vn30_2015_2025.csv")
@@ -13,6 +14,19 @@ FUNDAMENTAL_DATA_PATH = os.path.join(DATA_DIR, "data_with_metadata.xlsx")
 SENTIMENT_DATA_PATH = os.path.join(DATA_DIR, "VN30_Daily_Features.csv")
 FX_DATA_PATH = os.path.join(DATA_DIR, "usd_vnd_full_2015_raw.csv")
 
+# Sources the feature matrix depends on (feature store invalidation)
+FEATURE_SOURCE_PATHS = [
+    MARKET_DATA_PATH, BANK_RATIO_DATA_PATH, MACRO_DATA_PATH,
+    FUNDAMENTAL_DATA_PATH, SENTIMENT_DATA_PATH, FX_DATA_PATH
+]
+FEATURE_STORE_DIR = os.path.join(ARTIFACTS_DIR, "feature_store")
+FEATURE_LOGIC_VERSION = 2  # bump when feature construction changes (2: point-in-time quarterly joins)
+FEATURE_STATE_PATH = os.path.join(ARTIFACTS_DIR, "feature_state.joblib")  # incremental rolling state
+MODELS_DIR = os.path.join(ARTIFACTS_DIR, "models")  # versioned model bundles + CURRENT pointer
+MODEL_RETENTION = 5  # published versions kept on disk
+MODEL_RELOAD_RETRY_SECONDS = 300  # an unreadable published version is retried after this long
+RESULTS_DB_PATH = os.path.join(ARTIFACTS_DIR, "training_results.db")  # true vs pred per model/symbol/date
+
 # --- Column Mappings (Inferred/Default) ---
 BANK_RATIO_COL_MAPPING = {
     # Add mappings if source columns differ from target
@@ -101,3 +115,33 @@ XGB_PARAMS_DIRECTION["objective"] = "binary:logistic"
 START_TRAIN_DATE = "2015-01-01"
 FIRST_TEST_YEAR = 2020
 MIN_TEST_ROWS = 200
+
+# --- Walk-forward Evaluation ---
+WALK_FORWARD_ENABLED = True
+WALK_FORWARD_EMBARGO_DAYS = PREDICTION_HORIZON  # drop train rows whose target overlaps the test year
+WALK_FORWARD_WORKERS = None                     # process pool size; None = one per CPU
+
+# --- Portfolio ---
+PORTFOLIO_COV_METHOD = "ledoit_wolf"  # sample | ledoit_wolf | ewma | single_factor
+EWMA_LAMBDA = 0.94                    # RiskMetrics daily decay
+COV_MIN_OBSERVATIONS = 60             # names with fewer daily returns are left out
+COV_CACHE_SIZE = 256                  # rolling moment states kept per (window, end_date)
+
+# --- Backtest ---
+BACKTEST_START_DATE = f"{FIRST_TEST_YEAR}-01-01"  # earlier predictions are in-sample
+BACKTEST_FEE_RATE = 0.0015                        # brokerage fee per side
+BACKTEST_SELL_TAX = 0.001                         # personal income tax on sale value
+SETTLEMENT_DAYS = 2                               # T+2: shares bought on t are sellable from t+2
+BACKTEST_WORKERS = None                           # sweep process pool size; None = one per CPU
+BACKTEST_SWEEP_GRID = {
+    "threshold": [0.0, 0.01, 0.02, 0.03, 0.05],
+    "min_hold": [2, 5, 10, 21],
+}
+
+# --- Point-in-time Joins ---
+# Days after quarter end before a source's quarterly figures are public
+PUBLICATION_LAG_DAYS = {
+    "fundamental": 45,  # bank financial statements (consolidated reports: 45 days)
+    "macro": 10,        # GSO quarterly GDP / CPI / credit releases
+}
+PIT_MAX_AGE_DAYS = 183  # a published quarter is carried forward at most this long (None = no limit)
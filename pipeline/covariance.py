@@ -0,0 +1,280 @@
+"""
+Covariance estimators for the portfolio optimizer.
+
+All estimators work on a (date x symbol) frame of daily returns with
+gaps (late listings, suspensions): every pair of names uses the days on
+which both have a return ("pairwise-complete"), instead of only the days
+on which every name trades.
+
+    sample          pairwise sample covariance
+    ledoit_wolf     shrinkage towards a scaled identity (Ledoit & Wolf, 2004)
+    ewma            exponentially weighted, RiskMetrics-style (lambda = EWMA_LAMBDA)
+    single_factor   beta * beta' * var(sector) + diag(residual variance),
+                    with the equal-weighted sector return as the factor
+
+Estimates come from sums (counts, first, second and fourth moments) that
+RollingMoments keeps per (window, end_date) and updates one day at a
+time, so re-estimating on the next date costs O(n^2), not a full pass.
+"""
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from . import config
+
+ESTIMATORS = ("sample", "ledoit_wolf", "ewma", "single_factor")
+FACTOR = "__sector__"
+
+
+def with_sector_factor(returns):
+    """Adds the equal-weighted sector return (mean of available names) as a column."""
+    return returns.assign(**{FACTOR: returns.mean(axis=1)})
+
+
+def nearest_psd(cov, floor=1e-12):
+    """
+    Symmetric matrix with negative eigenvalues clipped. Pairwise estimates
+    mix different samples and need not be positive semi-definite.
+    """
+    cov = 0.5 * (cov + cov.T)
+    values, vectors = np.linalg.eigh(cov)
+    if values[0] >= floor:
+        return cov
+    return (vectors * np.maximum(values, floor)) @ vectors.T
+
+
+class Moments:
+    """
+    Pairwise sums over a set of days, for n names:
+        N[i, j]    days on which both i and j have a return
+        Sx[i, j]   sum of x_i over those days
+        Sx2[i, j]  sum of x_i^2 over those days
+        Sxx[i, j]  sum of x_i * x_j
+        Q[i, j]    sum of x_i^2 * x_j^2       (Ledoit-Wolf)
+        EN, Exx    the same counts and cross products, weighted by lam^age (EWMA)
+    """
+    FIELDS = ("N", "Sx", "Sx2", "Sxx", "Q", "EN", "Exx")
+
+    def __init__(self, n, lam):
+        self.lam = lam
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros((n, n)))
+
+    def subset(self, idx=None):
+        """Copy, restricted to the names at positions idx (all if None)."""
+        other = Moments.__new__(Moments)
+        other.lam = self.lam
+        for name in self.FIELDS:
+            values = getattr(self, name)
+            setattr(other, name, values.copy() if idx is None else values[np.ix_(idx, idx)])
+        return other
+
+    def add(self, X, sign=1.0, ew_age=None):
+        """
+        Adds (sign=+1) or removes (sign=-1) the days in X. ew_age gives each
+        row's age in days for the EWMA sums (0 = newest); None leaves them.
+        """
+        finite = np.isfinite(X)
+        M = finite.astype(float)
+        Z = np.where(finite, X, 0.0)
+        Z2 = Z * Z
+        self.N += sign * (M.T @ M)
+        self.Sx += sign * (Z.T @ M)
+        self.Sx2 += sign * (Z2.T @ M)
+        self.Sxx += sign * (Z.T @ Z)
+        self.Q += sign * (Z2.T @ Z2)
+        if ew_age is not None:
+            w = self.lam ** np.asarray(ew_age, dtype=float)
+            self.EN += sign * ((M * w[:, None]).T @ M)
+            self.Exx += sign * ((Z * w[:, None]).T @ Z)
+
+    def age(self, days=1):
+        """Ages the EWMA sums by `days` (before adding newer days)."""
+        decay = self.lam ** days
+        self.EN *= decay
+        self.Exx *= decay
+
+    # --- estimates ---
+
+    def mean(self):
+        """Per-name mean return over its own days."""
+        n = np.diag(self.N)
+        return np.where(n > 0, np.diag(self.Sx) / np.where(n > 0, n, 1.0), np.nan)
+
+    def _pairwise(self, ddof=1):
+        """Pairwise covariance (pair means) and pairwise variance of each name on the pair's days."""
+        N = self.N
+        safe = np.where(N > ddof, N, np.nan)
+        cov = (self.Sxx - self.Sx * self.Sx.T / np.where(N > 0, N, 1.0)) / (safe - ddof)
+        var_on_pair = (self.Sx2 - self.Sx ** 2 / np.where(N > 0, N, 1.0)) / (safe - ddof)
+        return np.nan_to_num(cov), np.nan_to_num(var_on_pair)
+
+    def sample(self):
+        return nearest_psd(self._pairwise()[0])
+
+    def ledoit_wolf(self):
+        """
+        Shrinks towards mu * I (mu = average variance) with the intensity
+        that minimizes the expected Frobenius loss. The sampling variance
+        of each s_ij is estimated from the fourth moments of its own days;
+        daily means are tiny next to their spread, so those are taken
+        about zero.
+        """
+        N = np.where(self.N > 0, self.N, 1.0)
+        S = self._pairwise(ddof=0)[0]
+        n = len(S)
+        mu = np.trace(S) / n
+        target = mu * np.eye(n)
+        var_s = np.clip(self.Q / N - (self.Sxx / N) ** 2, 0.0, None) / N
+        dispersion = ((S - target) ** 2).sum()
+        shrinkage = 1.0 if dispersion <= 0 else min(1.0, var_s.sum() / dispersion)
+        return nearest_psd((1.0 - shrinkage) * S + shrinkage * target)
+
+    def ewma(self):
+        """Zero-mean exponentially weighted covariance, normalized per pair."""
+        EN = self.EN
+        cov = np.where(EN > 0, self.Exx / np.where(EN > 0, EN, 1.0), 0.0)
+        return nearest_psd(cov)
+
+    def single_factor(self):
+        """
+        Expects the sector factor as the last name. Each beta is estimated
+        on the days the name trades; the factor model is PSD by construction.
+        """
+        cov, var_on_pair = self._pairwise()
+        f = len(cov) - 1
+        var_f = var_on_pair[f, :f]            # factor variance on each name's days
+        beta = np.where(var_f > 0, cov[:f, f] / np.where(var_f > 0, var_f, 1.0), 0.0)
+        resid = np.maximum(np.diag(cov)[:f] - beta ** 2 * var_f, 0.0)
+        return np.outer(beta, beta) * cov[f, f] + np.diag(resid)
+
+    def covariance(self, method):
+        if method not in ESTIMATORS:
+            raise ValueError(f"Unknown covariance method: {method} (expected one of {', '.join(ESTIMATORS)})")
+        return getattr(self, method)()
+
+
+def moments_of(returns, lam=None):
+    """Moments over all rows of a returns frame (newest row last)."""
+    lam = config.EWMA_LAMBDA if lam is None else lam
+    X = returns.to_numpy(dtype=float)
+    moments = Moments(X.shape[1], lam)
+    moments.add(X, ew_age=np.arange(len(X))[::-1])
+    return moments
+
+
+def estimate_covariance(returns, method="sample", lam=None):
+    """
+    Covariance of daily returns with the given estimator, as a DataFrame
+    over returns.columns.
+    """
+    if method == "single_factor":
+        cov = moments_of(with_sector_factor(returns), lam).covariance(method)
+    else:
+        cov = moments_of(returns, lam).covariance(method)
+    return pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+
+
+class RollingMoments:
+    """
+    Moments of the trailing `window` days of a returns frame, cached by
+    (window, end_date). A request for a new end date starts from the
+    nearest cached state of the same window and rolls it forward or back
+    day by day (add the entering day, remove the leaving one); states
+    further than a window away are rebuilt from scratch.
+
+    The sector factor column is always included, so every estimator can
+    be served from the same state.
+    """
+    def __init__(self, returns, lam=None, max_entries=None):
+        self.returns = with_sector_factor(returns)
+        self.symbols = list(returns.columns)
+        self.dates = self.returns.index
+        self.lam = config.EWMA_LAMBDA if lam is None else lam
+        self.max_entries = max_entries or config.COV_CACHE_SIZE
+        self._X = self.returns.to_numpy(dtype=float)
+        self._cache = OrderedDict()  # (window, end position) -> Moments
+
+    def _position(self, end_date):
+        """Index of the last row on or before end_date (None = last row)."""
+        if end_date is None:
+            return len(self.dates) - 1
+        pos = self.dates.searchsorted(pd.Timestamp(end_date), side="right") - 1
+        if pos < 0:
+            raise ValueError(f"No returns on or before {end_date}")
+        return int(pos)
+
+    def _build(self, window, end):
+        start = max(0, end - window + 1)
+        moments = Moments(self._X.shape[1], self.lam)
+        moments.add(self._X[start:end + 1], ew_age=np.arange(end - start, -1, -1))
+        return moments
+
+    def _roll(self, moments, window, frm, to):
+        """Moves a window ending at row `frm` to end at row `to` (|to - frm| < window)."""
+        moments = moments.subset()
+        X = self._X
+        if to > frm:
+            for end in range(frm + 1, to + 1):
+                moments.age(1)
+                moments.add(X[end:end + 1], ew_age=[0])
+                leaving = end - window
+                if leaving >= 0:
+                    moments.add(X[leaving:leaving + 1], sign=-1.0, ew_age=[window])
+        else:
+            for end in range(frm, to, -1):
+                moments.add(X[end:end + 1], sign=-1.0, ew_age=[0])
+                entering = end - window
+                if entering >= 0:
+                    moments.add(X[entering:entering + 1], ew_age=[window])
+                moments.age(-1)
+        return moments
+
+    def at(self, window, end_date=None):
+        """Moments of the `window` days ending at end_date (cached)."""
+        end = self._position(end_date)
+        key = (window, end)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        nearest = min(
+            (k for k in self._cache if k[0] == window and abs(k[1] - end) < window),
+            key=lambda k: abs(k[1] - end), default=None
+        )
+        if nearest is None:
+            moments = self._build(window, end)
+        else:
+            moments = self._roll(self._cache[nearest], window, nearest[1], end)
+
+        self._cache[key] = moments
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return moments
+
+    def end_date(self, end_date=None):
+        return self.dates[self._position(end_date)]
+
+    def estimate(self, window, end_date=None, method="sample", min_observations=None):
+        """
+        (mean, cov) as Series/DataFrame over the names with at least
+        `min_observations` returns in the window (capped at the window
+        length, so short windows keep the names with complete history).
+        Raises ValueError if no name qualifies.
+        """
+        min_observations = config.COV_MIN_OBSERVATIONS if min_observations is None else min_observations
+        min_observations = min(min_observations, window)
+        moments = self.at(window, end_date)
+        n = len(self.symbols)
+        keep = np.flatnonzero(np.diag(moments.N)[:n] >= min_observations)
+        if len(keep) == 0:
+            raise ValueError(f"No symbols with {min_observations}+ returns in the {window}-day window.")
+        symbols = [self.symbols[i] for i in keep]
+
+        if method == "single_factor":
+            idx = np.append(keep, n)    # factor stays last
+        else:
+            idx = keep
+        sub = moments.subset(idx)
+        cov = sub.covariance(method)
+        mean = sub.mean()[:len(keep)]
+        return pd.Series(mean, index=symbols), pd.DataFrame(cov, index=symbols, columns=symbols)
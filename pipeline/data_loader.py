@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import os
 from . import config
+from .source_cache import cached_source
 
 def fix_columns(df):
     """Sets the first row as column names and resets index."""
@@ -52,12 +53,17 @@ def make_quarter_date(df):
             
     return df
 
-def load_market_data():
+def load_market_data(path=None):
     """Loads and standardizes market data."""
-    if not os.path.exists(config.MARKET_DATA_PATH):
-        raise FileNotFoundError(f"Market data not found at {config.MARKET_DATA_PATH}")
+    path = path or config.MARKET_DATA_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Market data not found at {path}")
     
-    df = pd.read_csv(config.MARKET_DATA_PATH)
+    name = "market" if path == config.MARKET_DATA_PATH else "market_" + os.path.splitext(os.path.basename(path))[0]
+    return cached_source(name, [path], lambda: _read_market_csv(path))
+
+def _read_market_csv(path):
+    df = pd.read_csv(path)
     
     # Standardize column names
     df.columns = df.columns.str.lower().str.replace(' ', '_')
@@ -80,6 +86,9 @@ def load_bank_ratio():
         print(f"Warning: Bank ratio data not found at {config.BANK_RATIO_DATA_PATH}")
         return pd.DataFrame()
 
+    return cached_source("bank_ratio", [config.BANK_RATIO_DATA_PATH], _read_bank_ratio)
+
+def _read_bank_ratio():
     try:
         df = pd.read_excel(config.BANK_RATIO_DATA_PATH, sheet_name="ratio")
         df = fix_columns(df)
@@ -106,6 +115,9 @@ def load_macro_data():
         print(f"Warning: Macro data not found at {config.MACRO_DATA_PATH}")
         return pd.DataFrame()
 
+    return cached_source("macro", [config.MACRO_DATA_PATH], _read_macro)
+
+def _read_macro():
     try:
         df = pd.read_excel(config.MACRO_DATA_PATH)
         
@@ -130,6 +142,10 @@ def load_fundamental_data():
         print(f"Warning: Fundamental data not found at {config.FUNDAMENTAL_DATA_PATH}")
         return pd.DataFrame()
 
+    sources = [config.FUNDAMENTAL_DATA_PATH, config.BANK_RATIO_DATA_PATH, config.MACRO_DATA_PATH]
+    return cached_source("fundamental", sources, _read_fundamental)
+
+def _read_fundamental():
     try:
         # Load 'real' fundamental data
         df = pd.read_excel(config.FUNDAMENTAL_DATA_PATH, sheet_name="data")
@@ -168,6 +184,37 @@ def load_fundamental_data():
         print(f"Error loading fundamental data: {e}")
         return pd.DataFrame()
 
+def load_sentiment_data():
+    """Loads the daily news sentiment features (None if unavailable)."""
+    if not os.path.exists(config.SENTIMENT_DATA_PATH):
+        return None
+    try:
+        return cached_source("sentiment", [config.SENTIMENT_DATA_PATH],
+                             lambda: pd.read_csv(config.SENTIMENT_DATA_PATH))
+    except Exception:
+        return None
+
+def load_fx_data():
+    """Loads USD/VND daily rates with standardized columns (None if unavailable)."""
+    if not os.path.exists(config.FX_DATA_PATH):
+        return None
+    try:
+        return cached_source("fx", [config.FX_DATA_PATH], _read_fx)
+    except Exception as e:
+        print(f"Warning: Failed to load FX data: {e}")
+        return None
+
+def _read_fx():
+    fx_df = pd.read_csv(config.FX_DATA_PATH)
+    # Ensure standard columns
+    fx_df.columns = fx_df.columns.str.lower().str.replace(' ', '_')
+    if 'date' in fx_df.columns:
+        fx_df['date'] = pd.to_datetime(fx_df['date'])
+    # Price -> close
+    if 'price' in fx_df.columns:
+        fx_df = fx_df.rename(columns={'price': 'close'})
+    return fx_df
+
 def gather_data():
     """
     Orchestrates the loading of all data sources.
@@ -182,10 +229,7 @@ def gather_data():
     sentiment_df = None
     if os.path.exists(config.SENTIMENT_DATA_PATH):
         print("Loading Sentiment Data...")
-        try:
-            sentiment_df = pd.read_csv(config.SENTIMENT_DATA_PATH)
-        except Exception:
-            pass
+        sentiment_df = load_sentiment_data()
     
     return {
         "market": market_df,
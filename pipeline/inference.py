@@ -4,18 +4,28 @@ import os
 import joblib
 import json
 from . import config
-from .data_loader import gather_data
-from .feature_engineering import (
-    build_market_features,
-    build_technical_features,
-    build_sentiment_features,
-    build_macro_features,
-    build_bank_features,
-    make_quarter_date
-)
-
-def load_models():
-    """Load all 4 models and feature list."""
+from .data_loader import gather_data, load_fx_data
+from .feature_engineering import build_feature_frame
+from .feature_store import is_fresh, read_latest, write_feature_store, store_lock
+from .model_artifacts import current_version, load_version, LEGACY_VERSION
+
+def load_models(version=None):
+    """
+    Load all 4 models and feature list as one bundle.
+    Uses the given published version, else the current one, else the
+    legacy flat files in artifacts/.
+    """
+    version = version or current_version()
+    if version is not None:
+        try:
+            models = load_version(version)
+            print(f"Models loaded successfully (version {version}).")
+            return models
+        except Exception as e:
+            # Missing, truncated or half-written bundle: callers keep what they have
+            print(f"Error loading models (version {version}): {e!r}")
+            return None
+
     models = {}
     try:
         models["return"] = joblib.load(os.path.join(config.ARTIFACTS_DIR, "return_model.joblib"))
@@ -25,17 +35,55 @@ def load_models():
         
         with open(os.path.join(config.ARTIFACTS_DIR, "feature_cols.json"), "r") as f:
             models["features"] = json.load(f)
+        models["version"] = LEGACY_VERSION
             
         print("Models loaded successfully.")
         return models
-    except FileNotFoundError as e:
-        print(f"Error loading models: {e}")
+    except Exception as e:
+        print(f"Error loading models: {e!r}")
         return None
 
 def prepare_latest_data(symbol=None):
     """
-    Load data and generate features for the latest available date.
-    Returns a DataFrame with 1 row per symbol (latest date).
+    Latest feature row per symbol (`symbol` may be one symbol, a list, or None/"ALL").
+    Served from the feature store when it matches the current sources;
+    otherwise the full feature frame is rebuilt and materialized first.
+    Concurrent callers share one rebuild: whoever waited for the lock
+    re-checks the store and reads what the first caller wrote.
+    """
+    df = _read_fresh_latest(symbol)
+    if df is not None:
+        return df
+
+    with store_lock:
+        df = _read_fresh_latest(symbol)
+        if df is not None:
+            return df
+        df = build_latest_features()
+    if df.empty:
+        return df
+
+    # Filter by symbol(s) if provided
+    if isinstance(symbol, (list, tuple, set)):
+        df = df[df["symbol"].isin(list(symbol))]
+    elif symbol and symbol != "ALL":
+        df = df[df["symbol"] == symbol]
+    return df
+
+def _read_fresh_latest(symbol):
+    """read_latest(symbol) if the store matches the current sources, else None."""
+    if not is_fresh():
+        return None
+    try:
+        return read_latest(symbol)
+    except Exception as e:
+        print(f"Warning: Feature store unreadable, rebuilding: {e}")
+        return None
+
+def build_feature_history():
+    """
+    Load data and generate features for the full history, and refresh the
+    feature store. Returns the whole feature frame (empty if no market data).
     """
     # 1. Gather Data (Re-using loader logic)
     print("Loading raw data...")
@@ -45,186 +93,156 @@ def prepare_latest_data(symbol=None):
     sentiment_df = data_dict.get("sentiment")
     
     # Load FX
-    fx_df = None
-    if os.path.exists(config.FX_DATA_PATH):
-        try:
-           fx_df = pd.read_csv(config.FX_DATA_PATH)
-           fx_df.columns = fx_df.columns.str.lower().str.replace(' ', '_')
-           if 'date' in fx_df.columns:
-               fx_df['date'] = pd.to_datetime(fx_df['date'])
-           if 'price' in fx_df.columns:
-               fx_df = fx_df.rename(columns={'price': 'close'})
-        except Exception:
-            pass
+    fx_df = load_fx_data()
 
     if market_df is None or market_df.empty:
         return pd.DataFrame()
 
-    # 2. Build Features
+    # 2. Build & Merge Features
     print("Building features...")
-    # Group A & B
-    market_feat = build_market_features(market_df)
-    market_feat = build_technical_features(market_feat)
-    
-    # Group C
-    sentiment_feat = None
-    if sentiment_df is not None:
-        sentiment_feat = build_sentiment_features(sentiment_df)
-        
-    # Group D
-    macro_quarterly = None
-    fx_daily = None
-    if micro_df is not None:
-        if fx_df is None:
-             fx_df = pd.DataFrame({"close": [0]*len(market_df), "date": market_df["date"]})
-        macro_quarterly, fx_daily = build_macro_features(micro_df, fx_df)
-        
-    # Group E
-    bank_quarterly = None
-    if micro_df is not None:
-        bank_quarterly = build_bank_features(micro_df)
-        
-    # 3. Merge
-    print("Merging data...")
-    df = market_feat.copy()
-    if "date" in df.columns:
-        df = df.rename(columns={"date": "time"})
-    df["time"] = pd.to_datetime(df["time"])
-    df = df.sort_values(["symbol", "time"])
-    
-    # Merge Sentiment
-    if sentiment_feat is not None:
-        if "date" in sentiment_feat.columns:
-            sentiment_feat = sentiment_feat.rename(columns={"date": "time"})
-        sentiment_feat["time"] = pd.to_datetime(sentiment_feat["time"])
-        df = df.merge(sentiment_feat, on=["symbol", "time"], how="left")
-        
-    # Merge FX
-    if fx_daily is not None:
-        if "date" in fx_daily.columns:
-            fx_daily = fx_daily.rename(columns={"date": "time"})
-        fx_daily["time"] = pd.to_datetime(fx_daily["time"])
-        df = df.merge(fx_daily, on="time", how="left")
-        
-    # Merge Quarterly
-    if bank_quarterly is not None:
-        df["quarter_date"] = make_quarter_date(df["time"])
-        q_data = bank_quarterly.copy()
-        if macro_quarterly is not None:
-             for c in macro_quarterly.columns:
-                 if c not in q_data.columns:
-                     q_data[c] = macro_quarterly[c]
-        
-        df = df.merge(q_data, on=["symbol", "quarter_date"], how="left")
-        
-    # 4. Filter Latest
-    # If symbol is provided, filter first
-    if symbol and symbol != "ALL":
-        df = df[df["symbol"] == symbol]
-        
-    # Drop rows without features (na)
-    # Actually, we might want to fillNA or tolerate some missing
-    # But models need exact columns.
-    
-    # Get latest date per symbol
-    latest_df = df.sort_values("time").groupby("symbol").tail(1)
-    
-    return latest_df
+    df = build_feature_frame(market_df, micro_df, sentiment_df, fx_df)
 
-def run_inference(symbol=None):
+    try:
+        write_feature_store(df, market_df=market_df)
+    except Exception as e:
+        print(f"Warning: Could not write feature store: {e}")
+    return df
+
+def build_latest_features():
     """
-    Run inference for a specific symbol or all.
-    Returns dict or list of dicts with signals.
+    Builds the full feature history (refreshing the feature store) and
+    returns a DataFrame with 1 row per symbol (latest date).
+    """
+    df = build_feature_history()
+    if df.empty:
+        return df
+
+    # 3. Get latest date per symbol
+    return df.sort_values("time").groupby("symbol").tail(1)
+
+def recommend(p_return, p_direction, threshold=0.02):
+    """
+    Rule-based recommendation from model outputs (vectorized).
+    Score: +1 if return > 2%, -1 if return < -2%, +1/-1 for Up/Down direction.
+    BUY if score >= 1, SELL if score <= -1, else HOLD.
+    `threshold` is the return cut-off (2% by default; backtest sweeps vary it).
+    """
+    # Regime is not used: its label encoding (Bull/Bear) is not fixed yet.
+    p_return = np.asarray(p_return, dtype=float)
+    score = (
+        (p_return > threshold).astype(int)
+        - (p_return < -threshold).astype(int)
+        + np.where(np.asarray(p_direction) == 1, 1, -1)
+    )
+    return np.select([score >= 1, score <= -1], ["BUY", "SELL"], default="HOLD")
+
+def direction_confidence(direction_up, prob_up):
+    """Model confidence in the predicted direction: P(Up) if Up, else 1 - P(Up)."""
+    prob_up = np.asarray(prob_up, dtype=float)
+    return np.where(np.asarray(direction_up, dtype=bool), prob_up, 1.0 - prob_up)
+
+def score_latest(df_latest, models):
+    """
+    Runs one vectorized predict per model over the feature matrix.
+    Returns a DataFrame with one row of signals per input row.
     """
-    models = load_models()
-    if not models:
-        return None
-        
-    df_latest = prepare_latest_data(symbol)
-    if df_latest.empty:
-        return None
-        
     feature_cols = models["features"]
     
     # Ensure all columns exist
     missing_cols = [c for c in feature_cols if c not in df_latest.columns]
     if missing_cols:
         print(f"Warning: Missing columns: {missing_cols}")
-        # Add them as NaN or 0? 0 is safer for XGBoost than fail
-        for c in missing_cols:
-            df_latest[c] = np.nan
+        # NaN is handled natively by XGBoost
+        df_latest = df_latest.assign(**{c: np.nan for c in missing_cols})
             
     X = df_latest[feature_cols]
     
-    # Predict
-    results = []
-    
-    # Batch predict
-    try:
-        p_return = models["return"].predict(X)
-        p_risk = models["risk"].predict(X)
-        p_regime = models["regime"].predict(X) # 0,1,2
-        p_direction = models["direction"].predict(X) # 0 or 1
-        
-        # Get probabilities for Direction
-        if hasattr(models["direction"], "predict_proba"):
-            p_direction_prob = models["direction"].predict_proba(X)[:, 1] # Prob of class 1 (Up)
-        else:
-            p_direction_prob = p_direction.astype(float) # Fallback
+    p_direction = models["direction"].predict(X) # 0 or 1
+    # Get probabilities for Direction
+    if hasattr(models["direction"], "predict_proba"):
+        p_direction_prob = models["direction"].predict_proba(X)[:, 1] # Prob of class 1 (Up)
+    else:
+        p_direction_prob = p_direction.astype(float) # Fallback
 
-        
-        # Determine Recommendation Logic (Rule-based)
-        # Buy: High Return (> 2%), Low Risk (< 1%), Bull Regime, Up Direction
-        # Sell: Negative Return (< -2%), Bear Regime
-        
-        for i, (idx, row) in enumerate(df_latest.iterrows()):
-            ret = float(p_return[i])
-            risk = float(p_risk[i])
-            regime = int(p_regime[i])
-            direction = int(p_direction[i])
-            prob = float(p_direction_prob[i])
-            
-            # Simple heuristic
-            rec = "HOLD"
-            score = 0
-            
-            if ret > 0.02: score += 1
-            if ret < -0.02: score -= 1
-            if direction == 1: score += 1
-            else: score -= 1
-            
-            # Regime: assume 1 is Bull? We need to know label encoding.
-            # Assuming 1 is high volatility (Bear?) or just Direction?
-            # Let's assume Regime 1 = Bull/Positive for MVP or just ignore if unsure.
-            
-            if score >= 1:
-                rec = "BUY"
-            elif score <= -1:
-                rec = "SELL"
-                
-            # Sanitize NaNs for JSON
-            def sanitize(v, precision=4):
-                if pd.isna(v) or np.isnan(v):
-                    return None
-                return round(float(v), precision)
-
-            res = {
-                "symbol": row["symbol"],
-                "date": str(row["time"].date()),
-                "signals": {
-                    "predicted_return_21d": sanitize(ret),
-                    "predicted_volatility_21d": sanitize(risk),
-                    "regime": regime, 
-                    "direction": "Up" if direction == 1 else "Down",
-                    "pred_direction_prob": sanitize(prob) or 0.5 # Default to 0.5 if NaN
-                },
-                "recommendation": rec
-            }
-            results.append(res)
-            
+    return pd.DataFrame({
+        "symbol": df_latest["symbol"].to_numpy(),
+        "date": pd.to_datetime(df_latest["time"]).dt.strftime("%Y-%m-%d").to_numpy(),
+        "predicted_return_21d": models["return"].predict(X).astype(float),
+        "predicted_volatility_21d": models["risk"].predict(X).astype(float),
+        "regime": models["regime"].predict(X).astype(int), # 0,1,2
+        "direction_up": p_direction.astype(int) == 1,
+        "pred_direction_prob": p_direction_prob.astype(float),
+    })
+
+def signals_to_records(scored):
+    """Applies the recommendation rules and formats rows for JSON (column-wise)."""
+    recommendation = recommend(scored["predicted_return_21d"], scored["direction_up"]).tolist()
+
+    # Round and turn NaN into None for JSON
+    def sanitize(col, precision=4):
+        return [None if pd.isna(v) else v for v in col.round(precision).tolist()]
+
+    ret = sanitize(scored["predicted_return_21d"])
+    risk = sanitize(scored["predicted_volatility_21d"])
+    prob = scored["pred_direction_prob"].fillna(0.5).round(4) # Default to 0.5 if NaN
+    confidence = direction_confidence(scored["direction_up"], prob).round(2).tolist()
+    prob = prob.tolist()
+    direction = np.where(scored["direction_up"], "Up", "Down").tolist()
+
+    return [
+        {
+            "symbol": sym,
+            "date": date,
+            "signals": {
+                "predicted_return_21d": r,
+                "predicted_volatility_21d": v,
+                "regime": reg,
+                "direction": d,
+                "pred_direction_prob": p,
+            },
+            "recommendation": rec,
+            "confidence": conf,
+        }
+        for sym, date, r, v, reg, d, p, rec, conf in zip(
+            scored["symbol"].tolist(), scored["date"].tolist(), ret, risk, scored["regime"].tolist(),
+            direction, prob, recommendation, confidence
+        )
+    ]
+
+def run_batch_inference(symbols=None, models=None):
+    """
+    Scores many symbols (all if None) in one pass, with one pinned model version.
+    Returns a list of dicts with signals, or None if unavailable.
+    """
+    if models is None:
+        from .model_registry import model_registry
+        models = model_registry.get()
+    if not models:
+        return None
+
+    df_latest = prepare_latest_data(symbols or None)
+    if df_latest.empty:
+        return None
+
+    try:
+        scored = score_latest(df_latest, models)
     except Exception as e:
         print(f"Inference Error: {e}")
         return None
+    records = signals_to_records(scored.sort_values("symbol"))
+    # Every record of a request comes from the one bundle fetched above
+    for record in records:
+        record["model_version"] = models.get("version")
+    return records
+
+def run_inference(symbol=None, models=None):
+    """
+    Run inference for a specific symbol or all.
+    Returns dict or list of dicts with signals.
+    """
+    results = run_batch_inference(symbol, models)
+    if results is None:
+        return None
         
     if symbol and symbol != "ALL" and len(results) == 1:
         return results[0]
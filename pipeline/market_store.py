@@ -0,0 +1,218 @@
+import os
+import threading
+import pandas as pd
+from . import config
+from .data_loader import load_market_data, load_fundamental_data
+
+SECTOR_SYMBOL = "ALL"
+SECTOR_PRICE_COLUMNS = ["open", "high", "low", "close"]
+SECTOR_FUNDAMENTAL_COLUMNS = ["ROE", "ROA", "P_B", "GDP", "Inflation", "CreditGrowth"]
+
+
+def sector_daily(df):
+    """
+    Sector series from market rows: mean price columns and summed volume
+    per date, sorted by date. Every column is aggregated on the same
+    date key, so values always line up with their day.
+    """
+    aggs = {c: "mean" for c in SECTOR_PRICE_COLUMNS if c in df.columns}
+    if "volume" in df.columns:
+        aggs["volume"] = "sum"
+    if df.empty or not aggs:
+        return pd.DataFrame(columns=["date", *aggs])
+    return df.groupby("date", sort=True).agg(aggs).reset_index()
+
+
+def sector_quarterly(df):
+    """Cross-bank average of the key fundamentals per quarter_date."""
+    cols = [c for c in SECTOR_FUNDAMENTAL_COLUMNS if c in df.columns]
+    if df.empty or "quarter_date" not in df.columns:
+        return pd.DataFrame(columns=["quarter_date", *cols])
+    return df.groupby("quarter_date", sort=True)[cols].mean().reset_index()
+
+
+def sector_records(sector):
+    """JSON-ready rows of the sector series (ISO date strings, NaN as None)."""
+    out = sector.assign(date=sector["date"].dt.strftime("%Y-%m-%d"), symbol=SECTOR_SYMBOL)
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict(orient="records")
+
+
+def _prefix_key(df, before):
+    """
+    Row count and content hash of rows dated before `before`, over every
+    column the sector series aggregates (any edit to those rows changes it).
+    """
+    cols = [c for c in ["date", "symbol", *SECTOR_PRICE_COLUMNS, "volume"] if c in df.columns]
+    part = df.loc[df["date"] < before, cols]
+    return len(part), int(pd.util.hash_pandas_object(part, index=False).sum())
+
+
+class MarketDataStore:
+    """
+    Process-wide in-memory cache for the market OHLCV frame.
+
+    The frame is parsed once per (path, mtime) and shared by every caller;
+    it is only reloaded when the file on disk changes.
+    """
+    def __init__(self, path=None):
+        self.path = path or config.MARKET_DATA_PATH
+        self._lock = threading.Lock()
+        self._key = None
+        self._df = None
+        self._sector = None
+        self._sector_records = None
+
+    def _file_key(self):
+        stat = os.stat(self.path)
+        return (os.path.abspath(self.path), stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        """Returns the cached frame, reloading it if the file changed."""
+        key = self._file_key()
+        if self._key == key and self._df is not None:
+            return self._df
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._key == key and self._df is not None:
+                return self._df
+
+            print(f"Loading market data into store: {self.path}")
+            df = load_market_data(self.path)
+            self._sector = self._refresh_sector(self._df, df)
+            records = sector_records(self._sector)
+            self._sector_records = ([r["date"] for r in records], records)
+            self._df = df
+            self._key = key
+            return df
+
+    def _refresh_sector(self, old_df, df):
+        """
+        Materializes the sector series for a newly loaded frame.
+
+        When the file only gained rows on or after the last aggregated
+        date, just that tail is re-aggregated and appended; any other
+        change rebuilds the whole series.
+        """
+        sector = self._sector
+        if old_df is not None and sector is not None and not sector.empty:
+            last = sector["date"].iloc[-1]
+            if _prefix_key(old_df, last) == _prefix_key(df, last):
+                tail = sector_daily(df[df["date"] >= last])
+                print(f"Refreshing sector series from {last.date()} ({len(tail)} days)")
+                return pd.concat([sector[sector["date"] < last], tail], ignore_index=True)
+        return sector_daily(df)
+
+    def get(self):
+        """
+        Returns a shallow view of the cached market frame.
+
+        The view shares memory with the cache. Isolation relies on pandas
+        Copy-on-Write (the default from pandas 3): assigning columns or
+        values through pandas only affects the view, and .to_numpy()/.values
+        hand out read-only arrays. Callers must not write into the
+        underlying arrays by any other route (e.g. re-enabling the
+        writeable flag); copy first if they need to mutate data.
+        """
+        return self._load().copy(deep=False)
+
+    def get_sector(self):
+        """Shallow view of the materialized sector series (date, open..close, volume); same rules as get()."""
+        self._load()
+        return self._sector.copy(deep=False)
+
+    def get_sector_records(self):
+        """
+        (dates, records): the sector series as JSON-ready dicts, oldest
+        first, with their ISO dates for bisecting. Shared by all callers:
+        slice them, don't modify them.
+        """
+        self._load()
+        return self._sector_records
+
+    def invalidate(self):
+        """Drops the cached frame; the next get() reloads from disk."""
+        with self._lock:
+            self._key = None
+            self._df = None
+            self._sector = None
+            self._sector_records = None
+
+
+class FundamentalStore:
+    """
+    In-memory fundamentals frame and its quarterly sector averages,
+    rebuilt only when one of the source workbooks changes.
+    """
+    def __init__(self, paths=None):
+        self.paths = paths or [config.FUNDAMENTAL_DATA_PATH, config.BANK_RATIO_DATA_PATH, config.MACRO_DATA_PATH]
+        self._lock = threading.Lock()
+        self._key = None
+        self._df = None
+        self._sector = None
+
+    def _files_key(self):
+        key = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                key.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                key.append((os.path.abspath(path), None, None))
+        return tuple(key)
+
+    def _load(self):
+        key = self._files_key()
+        if self._key == key and self._df is not None:
+            return self._df, self._sector
+
+        with self._lock:
+            if self._key == key and self._df is not None:
+                return self._df, self._sector
+
+            df = load_fundamental_data()
+            if "quarter_date" in df.columns:
+                df["quarter_date"] = df["quarter_date"].astype(str)
+            self._df = df
+            self._sector = sector_quarterly(df)
+            self._key = key
+            return self._df, self._sector
+
+    def get(self):
+        """Read-only view of the fundamentals frame (quarter_date as str)."""
+        return self._load()[0].copy(deep=False)
+
+    def get_sector(self):
+        """Read-only view of the quarterly cross-bank averages."""
+        return self._load()[1].copy(deep=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
+            self._df = None
+            self._sector = None
+
+
+market_store = MarketDataStore()
+fundamental_store = FundamentalStore()
+
+
+def get_market_data():
+    """Shortcut for the shared store's read-only market frame."""
+    return market_store.get()
+
+
+def get_sector_history():
+    """Shortcut for the shared store's sector series as (dates, JSON-ready records)."""
+    return market_store.get_sector_records()
+
+
+def get_fundamental_data():
+    """Shortcut for the shared fundamentals frame."""
+    return fundamental_store.get()
+
+
+def get_sector_fundamentals():
+    """Shortcut for the quarterly cross-bank fundamental averages."""
+    return fundamental_store.get_sector()
@@ -0,0 +1,140 @@
+"""
+Versioned model artifacts.
+
+Each training run publishes a complete bundle into its own directory:
+
+    artifacts/models/<version>/
+        return_model.joblib, risk_model.joblib,
+        regime_model.joblib, direction_model.joblib
+        manifest.json   version, created_at, feature_cols, data_hash, metrics, files
+    artifacts/models/CURRENT   name of the live version
+
+The bundle is written to a temporary directory and renamed into place,
+then CURRENT is replaced atomically, so readers see either the old or
+the new version, never a mix. Old versions beyond MODEL_RETENTION are
+removed. Without CURRENT, the flat files in artifacts/ are used.
+"""
+import os
+import json
+import shutil
+from datetime import datetime
+import joblib
+from . import config
+
+MODEL_NAMES = ["return", "risk", "regime", "direction"]
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+LEGACY_VERSION = "legacy"
+
+
+def _version_dir(version):
+    return os.path.join(config.MODELS_DIR, version)
+
+
+def current_version():
+    """Name of the published version, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(config.MODELS_DIR, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions():
+    """Published version names, oldest first (names sort by time)."""
+    if not os.path.isdir(config.MODELS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(config.MODELS_DIR)
+        if not name.startswith(".") and os.path.exists(os.path.join(_version_dir(name), MANIFEST_FILE))
+    )
+
+
+def read_manifest(version=None):
+    version = version or current_version()
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(_version_dir(version), MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _new_version_name():
+    # Timestamp to the microsecond: unique and sorts chronologically
+    return datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def _set_current(version):
+    path = os.path.join(config.MODELS_DIR, CURRENT_FILE)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+
+
+def publish(models, feature_cols, metrics=None, data_hash=None, retention=None):
+    """
+    Writes a new version from {name: fitted model} and makes it current.
+    Returns the manifest.
+    """
+    os.makedirs(config.MODELS_DIR, exist_ok=True)
+    version = _new_version_name()
+    tmp_dir = os.path.join(config.MODELS_DIR, f".tmp-{version}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    try:
+        files = {}
+        for name, model in models.items():
+            files[name] = f"{name}_model.joblib"
+            joblib.dump(model, os.path.join(tmp_dir, files[name]))
+
+        manifest = {
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "feature_cols": list(feature_cols),
+            "data_hash": data_hash,
+            "metrics": metrics or [],
+            "files": files,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(tmp_dir, _version_dir(version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _set_current(version)
+    print(f"Published model version {version}")
+    apply_retention(retention)
+    return manifest
+
+
+def apply_retention(keep=None):
+    """Deletes all but the newest `keep` versions; the current one is always kept."""
+    keep = config.MODEL_RETENTION if keep is None else keep
+    current = current_version()
+    versions = list_versions()
+    stale = [v for v in versions[:max(0, len(versions) - keep)] if v != current]
+    for version in stale:
+        shutil.rmtree(_version_dir(version), ignore_errors=True)
+    if stale:
+        print(f"Removed {len(stale)} old model version(s): {', '.join(stale)}")
+    return stale
+
+
+def load_version(version):
+    """Bundle {model name: model, "features": [...], "version": ...} for one version."""
+    manifest = read_manifest(version)
+    if manifest is None:
+        raise FileNotFoundError(f"Model version not found: {version}")
+    bundle = {
+        name: joblib.load(os.path.join(_version_dir(version), filename))
+        for name, filename in manifest["files"].items()
+    }
+    bundle["features"] = manifest["feature_cols"]
+    bundle["version"] = version
+    return bundle
@@ -21,3 +21,11 @@ def create_regime_model():
 def create_direction_model():
     """Create XGBoost Classifier for Direction prediction"""
     return XGBClassifier(**XGB_PARAMS_DIRECTION)
+
+MODEL_SPECS = [
+    # (name, factory, target column, is_classifier)
+    ("return", create_return_model, "target_return", False),
+    ("risk", create_risk_model, "target_risk", False),
+    ("direction", create_direction_model, "target_direction", True),
+    ("regime", create_regime_model, "target_regime", True)
+]
@@ -0,0 +1,72 @@
+import time
+import threading
+from . import config
+from .model_artifacts import current_version, LEGACY_VERSION
+
+
+class ModelRegistry:
+    """
+    In-process cache of the trained model bundle (4 models + feature list).
+
+    The bundle is deserialized once and shared across requests. Training
+    publishes a complete versioned bundle and then switches the CURRENT
+    pointer; when it changes, the next get() loads that version and swaps
+    it in as a whole, so callers never see a mix of old and new models.
+    A version that fails to load is not retried on every request: the
+    previous bundle is served until CURRENT changes again or
+    MODEL_RELOAD_RETRY_SECONDS have passed.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (version, bundle), replaced as one reference
+        self._current = (None, None)
+        # (version, time.monotonic() of the failed load)
+        self._failed = (None, 0.0)
+
+    def _current_version(self):
+        # Flat files predating versioned publishing: load once, never reload
+        return current_version() or LEGACY_VERSION
+
+    def _recently_failed(self, version):
+        failed, at = self._failed
+        return version == failed and time.monotonic() - at < config.MODEL_RELOAD_RETRY_SECONDS
+
+    def load(self):
+        """(Re)loads the bundle from disk and swaps it in atomically."""
+        return self._reload(force=True)
+
+    def get(self):
+        """Returns the current bundle, reloading if a new one was published."""
+        version, bundle = self._current
+        published = self._current_version()
+        if bundle is not None and version == published:
+            return bundle
+        if self._recently_failed(published):
+            return bundle
+        return self._reload(force=False)
+
+    def _reload(self, force):
+        from .inference import load_models
+
+        with self._lock:
+            version = self._current_version()
+            # Another request may have reloaded while we waited for the lock
+            if not force and self._current[1] is not None and self._current[0] == version:
+                return self._current[1]
+            if not force and self._recently_failed(version):
+                return self._current[1]
+            bundle = load_models(None if version == LEGACY_VERSION else version)
+            if bundle is None:
+                # Keep serving the previous bundle if the new one is unreadable
+                self._failed = (version, time.monotonic())
+                return self._current[1]
+            self._failed = (None, 0.0)
+            self._current = (version, bundle)
+            return bundle
+
+    @property
+    def version(self):
+        return self._current[0]
+
+
+model_registry = ModelRegistry()
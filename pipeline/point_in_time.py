@@ -0,0 +1,57 @@
+"""
+Point-in-time joins of quarterly sources onto daily rows.
+
+A quarter's figures are not known on the quarter's first day: they are
+published some time after it ends. A source row for quarter q becomes
+visible on
+
+    quarter_end(q) + PUBLICATION_LAG_DAYS[source]
+
+and each daily row gets the latest row visible on its date (carried
+forward over missing quarters, up to PIT_MAX_AGE_DAYS). The join is one
+sorted merge_asof per source, O(n log n) over the sorted arrays.
+"""
+import numpy as np
+import pandas as pd
+from . import config
+
+
+def available_from(quarter_date, lag_days):
+    """First day a quarter's figures are public (quarter_date = quarter start)."""
+    quarter_date = pd.to_datetime(quarter_date)
+    return quarter_date + pd.offsets.QuarterEnd(0) + pd.Timedelta(days=lag_days)
+
+
+def asof_join(df, source, columns, lag_days, by=None, time_col="time", max_age_days=None):
+    """
+    Adds `columns` of a quarterly `source` (with a quarter_date column, and
+    `by` if given) to `df` in place: each row gets the values of the latest
+    quarter published on or before its `time_col`, NaN if none was or it
+    is older than max_age_days (default PIT_MAX_AGE_DAYS). Returns df.
+    """
+    max_age_days = config.PIT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    keys = [by] if by else []
+
+    right = source[keys + ["quarter_date"] + columns].dropna(subset=["quarter_date"])
+    right = pd.DataFrame({
+        **{k: right[k].to_numpy() for k in keys},
+        "_available": available_from(right["quarter_date"], lag_days).to_numpy(),
+        **{c: right[c].to_numpy() for c in columns},
+    }).sort_values("_available", kind="stable")
+
+    # merge_asof needs both sides sorted on the join key; _row restores df's order
+    left = pd.DataFrame({
+        **{k: df[k].to_numpy() for k in keys},
+        "_time": pd.to_datetime(df[time_col]).to_numpy(),
+        "_row": np.arange(len(df)),
+    }).sort_values("_time", kind="stable")
+
+    joined = pd.merge_asof(
+        left, right, left_on="_time", right_on="_available", by=by,
+        direction="backward",
+        tolerance=pd.Timedelta(days=max_age_days) if max_age_days else None
+    )
+    order = np.argsort(joined["_row"].to_numpy(), kind="stable")
+    for c in columns:
+        df[c] = joined[c].to_numpy()[order]
+    return df
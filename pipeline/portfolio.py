@@ -2,19 +2,144 @@ import pandas as pd
 import numpy as np
 import os
 from . import config
+from .covariance import ESTIMATORS, RollingMoments, estimate_covariance
+
+TRADING_DAYS = 252
+OBJECTIVES = ("min_variance", "max_sharpe", "target_return")
+
+
+def project_capped_simplex(V, cap=1.0):
+    """
+    Euclidean projection of every column of V onto
+    {w : sum(w) = 1, 0 <= w <= cap}.
+
+    The result is clip(v - tau, 0, cap) where the sum is 1. That sum is
+    piecewise linear in tau with breakpoints at v_i and v_i - cap, so it
+    is evaluated at every breakpoint (all columns at once) and tau is
+    interpolated exactly on the segment that crosses 1.
+    """
+    n, k = V.shape
+    B = np.sort(np.concatenate([V - cap, V]), axis=0)                     # 2n x K
+    F = np.clip(V[None, :, :] - B[:, None, :], 0.0, cap).sum(axis=1)      # 2n x K, non-increasing
+    j = np.argmax(F <= 1.0, axis=0)                                        # first breakpoint at or below 1
+    cols = np.arange(k)
+    b_hi, f_hi = B[j, cols], F[j, cols]
+    jm = np.maximum(j - 1, 0)
+    b_lo, f_lo = B[jm, cols], F[jm, cols]
+    slope = np.where(f_lo > f_hi, (b_hi - b_lo) / np.where(f_lo > f_hi, f_lo - f_hi, 1.0), 0.0)
+    tau = np.where(j > 0, b_lo + (f_lo - 1.0) * slope, b_hi)
+    return np.clip(V - tau, 0.0, cap)
+
+
+def _polish_column(cov, mu_t, w, cap, tol=1e-10):
+    """
+    Exact solution on the active set of an approximate solution `w`
+    (names at 0 or at the cap stay there; the rest solve the KKT system).
+    Returns the weights if they satisfy the optimality conditions, else None.
+    """
+    lower, upper = w <= 0.0, w >= cap
+    free = ~(lower | upper)
+    n_free = int(free.sum())
+    if n_free:
+        # [Σ_FF 1; 1' 0] [w_F; ν] = [t mu_F - Σ_FU cap; 1 - cap |U|]
+        kkt = np.zeros((n_free + 1, n_free + 1))
+        kkt[:n_free, :n_free] = cov[np.ix_(free, free)]
+        kkt[:n_free, n_free] = kkt[n_free, :n_free] = 1.0
+        rhs = np.append(mu_t[free] - cov[np.ix_(free, upper)].sum(axis=1) * cap, 1.0 - cap * upper.sum())
+        try:
+            sol = np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            return None
+        w = np.where(upper, cap, 0.0)
+        w[free] = sol[:n_free]
+        if (w[free] < -tol).any() or (w[free] > cap + tol).any():
+            return None
+        nu = sol[n_free]
+    else:
+        nu = None
+
+    # Multipliers of the bounds must have the right sign
+    grad = cov @ w - mu_t
+    if nu is None:
+        lo = -grad[lower].min() if lower.any() else -np.inf
+        hi = -grad[upper].max() if upper.any() else np.inf
+        return w if lo <= hi + tol else None
+    if (grad[lower] + nu < -tol).any() or (grad[upper] + nu > tol).any():
+        return None
+    return np.clip(w, 0.0, cap)
+
+
+def solve_frontier_batch(cov, mu, t, cap=1.0, lipschitz=None, W0=None, max_iter=5000, check_every=25):
+    """
+    Solves min_w 1/2 w'Σw - t_k mu'w over the capped simplex for every
+    t_k at once (one column per t_k).
+
+    t = 0 is the minimum-variance portfolio; larger t trades variance for
+    return along the efficient frontier. All columns share one step size
+    1/L (L = largest eigenvalue of Σ), so each accelerated projected
+    gradient iteration is a single Σ @ W product plus one batched
+    projection. Every `check_every` iterations each column's active set
+    is tried in an exact KKT solve; columns that pass are final.
+    """
+    t = np.asarray(t, dtype=float)
+    n = len(mu)
+    if lipschitz is None:
+        lipschitz = np.linalg.eigvalsh(cov)[-1]
+    step = 1.0 / max(lipschitz, 1e-12)
+
+    W = project_capped_simplex(np.full((n, len(t)), 1.0 / n) if W0 is None else W0, cap)
+    result = W.copy()
+    todo = np.arange(len(t))          # columns still iterating
+    linear = np.outer(mu, t)          # n x K
+    Y, momentum = W, 1.0
+    for it in range(1, max_iter + 1):
+        W_next = project_capped_simplex(Y - step * (cov @ Y - linear[:, todo]), cap)
+        momentum_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * momentum * momentum))
+        Y = W_next + ((momentum - 1.0) / momentum_next) * (W_next - W)
+        W, momentum = W_next, momentum_next
+        if it % check_every and it != max_iter:
+            continue
+
+        keep = []
+        for j, k in enumerate(todo):
+            exact = _polish_column(cov, linear[:, k], W[:, j], cap)
+            if exact is None:
+                keep.append(j)
+            result[:, k] = W[:, j] if exact is None else exact
+        if not keep:
+            break
+        todo, W, Y = todo[keep], W[:, keep], Y[:, keep]
+    return result
+
 
 class PortfolioOptimizer:
     """
     Markowitz Mean-Variance Portfolio Optimization.
+
+    Long-only with an optional per-name cap (max_weight). The efficient
+    frontier is traced by one batched solve over a grid of return
+    tradeoffs; min-variance, max-Sharpe and target-return portfolios are
+    read off (and refined on) that frontier.
+
+    cov_method picks the covariance estimator (see pipeline.covariance).
+    With a window, metrics come from the trailing `window` days and
+    calculate_metrics(end_date) can be called per rebalance date; the
+    rolling moments are cached and updated day by day.
     """
-    def __init__(self, start_date=None, end_date=None):
+    def __init__(self, start_date=None, end_date=None, cov_method=None, window=None):
         self.start_date = start_date
         self.end_date = end_date
+        self.cov_method = cov_method or config.PORTFOLIO_COV_METHOD
+        if self.cov_method not in ESTIMATORS:
+            raise ValueError(f"Unknown covariance method: {self.cov_method}")
+        self.window = window
         self.symbols = []
         self.daily_returns = None
         self.mean_returns = None
         self.cov_matrix = None
-        
+        self._lipschitz = None
+        self._rolling = None
+
     def load_data(self, df_market):
         """
         Load market data and calculate daily returns for optimization.
@@ -23,49 +148,192 @@ class PortfolioOptimizer:
         # Pivot to Date x Symbol matrix
         if 'time' in df_market.columns:
             df_market = df_market.rename(columns={'time': 'date'})
-            
+
         pivot_df = df_market.pivot(index='date', columns='symbol', values='close')
-        
+
         # Filter dates
         if self.start_date:
             pivot_df = pivot_df[pivot_df.index >= self.start_date]
         if self.end_date:
             pivot_df = pivot_df[pivot_df.index <= self.end_date]
-            
-        self.daily_returns = pivot_df.pct_change().dropna()
+
+        # Keep every day with any return: estimators use pairwise-complete data
+        returns = pivot_df.pct_change(fill_method=None).replace([np.inf, -np.inf], np.nan).dropna(how="all")
+        enough = returns.count() >= config.COV_MIN_OBSERVATIONS
+        self.daily_returns = returns.loc[:, enough]
         self.symbols = self.daily_returns.columns.tolist()
-        
-    def calculate_metrics(self):
-        """Calculate Annualized Mean Returns and Covariance Matrix."""
+        self._rolling = None
+
+    def calculate_metrics(self, end_date=None):
+        """
+        Calculate Annualized Mean Returns and Covariance Matrix, over the
+        whole loaded range or (with a window) the window ending at end_date.
+        """
         if self.daily_returns is None:
             raise ValueError("Data not loaded.")
-            
+        if self.daily_returns.shape[1] == 0:
+            raise ValueError("No symbols with return history in the selected range.")
+
+        if self.window is None and end_date is None:
+            mean = self.daily_returns.mean()
+            cov = estimate_covariance(self.daily_returns, self.cov_method)
+        else:
+            if self._rolling is None:
+                self._rolling = RollingMoments(self.daily_returns)
+            window = self.window or len(self.daily_returns)
+            mean, cov = self._rolling.estimate(window, end_date, self.cov_method)
+            self.symbols = mean.index.tolist()
+
         # Annualized values (assuming 252 trading days)
-        self.mean_returns = self.daily_returns.mean() * 252
-        self.cov_matrix = self.daily_returns.cov() * 252
-        
-    def optimize(self, target_return=None, risk_free_rate=0.03):
+        self.mean_returns = mean * TRADING_DAYS
+        self.cov_matrix = cov * TRADING_DAYS
+        # Step size for every solve on this covariance
+        self._lipschitz = np.linalg.eigvalsh(self.cov_matrix.to_numpy())[-1]
+
+    def _arrays(self, max_weight):
+        if self.cov_matrix is None:
+            self.calculate_metrics()
+        n = len(self.symbols)
+        if n == 0:
+            raise ValueError("No symbols with return history in the selected range.")
+        if max_weight * n < 1.0 - 1e-12:
+            raise ValueError(f"max_weight={max_weight} is infeasible for {n} symbols (need >= {1.0 / n:.4f}).")
+        return self.cov_matrix.to_numpy(), self.mean_returns.to_numpy()
+
+    def _solve(self, t, max_weight, W0=None):
+        cov, mu = self._arrays(max_weight)
+        return solve_frontier_batch(cov, mu, t, cap=min(max_weight, 1.0), lipschitz=self._lipschitz, W0=W0)
+
+    def portfolio_stats(self, W, risk_free_rate=0.03):
+        """Annualized return, volatility and Sharpe ratio of each column of W."""
+        cov, mu = self.cov_matrix.to_numpy(), self.mean_returns.to_numpy()
+        ret = mu @ W
+        vol = np.sqrt(np.maximum(np.einsum("ik,ij,jk->k", W, cov, W), 0.0))
+        sharpe = np.where(vol > 0, (ret - risk_free_rate) / np.where(vol > 0, vol, 1.0), np.nan)
+        return ret, vol, sharpe
+
+    def _max_return_weights(self, max_weight):
+        """Highest-return portfolio: fill the best names up to the cap."""
+        _, mu = self._arrays(max_weight)
+        cap = min(max_weight, 1.0)
+        order = np.argsort(-mu, kind="stable")
+        w = np.zeros(len(mu))
+        w[order] = np.minimum(cap, np.maximum(0.0, 1.0 - cap * np.arange(len(mu))))
+        return w
+
+    def max_return(self, max_weight=1.0):
+        return float(self.mean_returns.to_numpy() @ self._max_return_weights(max_weight))
+
+    def _saturation(self, max_weight):
+        """
+        Smallest tradeoff t at which the max-return portfolio is optimal,
+        i.e. where the frontier ends. With g = Σw* - t mu, optimality needs
+        g_i >= g_j for every name i below its cap and j above zero; each
+        pair gives a linear bound on t.
+        """
+        cov, mu = self._arrays(max_weight)
+        cap = min(max_weight, 1.0)
+        w = self._max_return_weights(max_weight)
+        c = cov @ w
+        below, above = w < cap, w > 0.0
+        dc = c[above][None, :] - c[below][:, None]     # c_j - c_i
+        dmu = mu[above][None, :] - mu[below][:, None]  # mu_j - mu_i
+        # Pairs with equal mean return (including i == j) don't bound t
+        bounds = np.where(dmu > 0, dc / np.where(dmu > 0, dmu, 1.0), 0.0)
+        return float(max(bounds.max(initial=0.0), 0.0))
+
+    def efficient_frontier(self, n_points=50, max_weight=1.0, risk_free_rate=0.03):
+        """
+        Frontier from the minimum-variance to the maximum-return portfolio.
+        Returns (t, W, ret, vol, sharpe) with one column of W per point.
+        """
+        t = np.linspace(0.0, self._saturation(max_weight), max(n_points, 2))
+        W = self._solve(t, max_weight)
+        return (t, W, *self.portfolio_stats(W, risk_free_rate))
+
+    def _refine(self, t, W, pick, max_weight, rounds=4, n_points=8):
+        """
+        Re-solves on a finer t grid around the point chosen by `pick`
+        (index into the current grid), warm-started from the coarse weights.
+        Returns the last (t, W, index).
+        """
+        k = pick(W)
+        for _ in range(rounds):
+            lo, hi = max(k - 1, 0), min(k + 1, len(t) - 1)
+            # Nothing to refine on a single point or a zero-width interval
+            # (degenerate frontier, e.g. one eligible symbol)
+            if lo == hi or not t[hi] > t[lo]:
+                break
+            fine = np.linspace(t[lo], t[hi], n_points)
+            frac = (fine - t[lo]) / (t[hi] - t[lo])
+            W0 = np.outer(W[:, lo], 1.0 - frac) + np.outer(W[:, hi], frac)
+            t, W = fine, self._solve(fine, max_weight, W0=W0)
+            k = pick(W)
+        return t, W, k
+
+    def min_variance(self, max_weight=1.0):
+        return self._solve([0.0], max_weight)[:, 0]
+
+    def max_sharpe(self, risk_free_rate=0.03, max_weight=1.0, n_points=50):
+        # Sharpe is unimodal along the frontier: zoom in on the best grid point
+        t, W, _, _, _ = self.efficient_frontier(n_points, max_weight, risk_free_rate)
+        pick = lambda W: int(np.nanargmax(self.portfolio_stats(W, risk_free_rate)[2]))
+        t, W, k = self._refine(t, W, pick, max_weight)
+        return W[:, k]
+
+    def target_return_portfolio(self, target_return, max_weight=1.0, n_points=50):
+        """Minimum-variance portfolio with expected return >= target_return."""
+        w_min = self.min_variance(max_weight)
+        if self.mean_returns.to_numpy() @ w_min >= target_return:
+            return w_min
+        if target_return > self.max_return(max_weight) + 1e-12:
+            raise ValueError(f"target_return={target_return} is above the maximum attainable return.")
+
+        # Return rises with t: take the first point that meets the target
+        t, W, _, _, _ = self.efficient_frontier(n_points, max_weight)
+        pick = lambda W: int(np.argmax(self.portfolio_stats(W)[0] >= target_return))
+        t, W, k = self._refine(t, W, pick, max_weight)
+        if k == 0:
+            return W[:, 0]
+
+        # Weights are affine in t between breakpoints: interpolate onto the target
+        ret, _, _ = self.portfolio_stats(W[:, k - 1:k + 1])
+        frac = (target_return - ret[0]) / (ret[1] - ret[0]) if ret[1] > ret[0] else 1.0
+        return (1.0 - frac) * W[:, k - 1] + frac * W[:, k]
+
+    def optimize(self, target_return=None, risk_free_rate=0.03, objective=None, max_weight=1.0):
         """
         Optimize portfolio weights.
-        Placeholder for Scipy Minimize (SLSQP).
+        objective: "min_variance", "max_sharpe" or "target_return"
+        (the default is target_return when a target is given, else max_sharpe).
         """
-        # TODO: Implement Efficient Frontier logic
-        print(f"Optimizing for {len(self.symbols)} stocks...")
-        
-        # Mock result: Equal weights
-        n = len(self.symbols)
+        objective = objective or ("target_return" if target_return is not None else "max_sharpe")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        print(f"Optimizing for {len(self.symbols)} stocks ({objective})...")
+
+        if objective == "min_variance":
+            w = self.min_variance(max_weight)
+        elif objective == "max_sharpe":
+            w = self.max_sharpe(risk_free_rate, max_weight)
+        else:
+            if target_return is None:
+                raise ValueError("target_return is required for the target_return objective.")
+            w = self.target_return_portfolio(target_return, max_weight)
+
+        ret, vol, sharpe = self.portfolio_stats(w[:, None], risk_free_rate)
         return {
-            "weights": {s: 1.0/n for s in self.symbols},
-            "expected_return": 0.15,
-            "expected_volatility": 0.10,
-            "sharpe_ratio": 1.2
+            "weights": {s: float(x) for s, x in zip(self.symbols, w)},
+            "expected_return": float(ret[0]),
+            "expected_volatility": float(vol[0]),
+            "sharpe_ratio": None if np.isnan(sharpe[0]) else float(sharpe[0])
         }
 
 if __name__ == "__main__":
     # Test logic
     from .data_loader import load_market_data
     df = load_market_data()
-    
+
     opt = PortfolioOptimizer()
     opt.load_data(df)
     opt.calculate_metrics()
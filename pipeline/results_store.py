@@ -0,0 +1,215 @@
+"""
+Training results store: walk-forward out-of-fold predictions, true vs
+predicted per (model, symbol, time, fold).
+
+Every row was predicted by a model that did not train on it (the fold
+is its test year), so the table is an honest record that backtests,
+the admin chart and calibration reports read instead of re-predicting.
+Results live in one SQLite table indexed for those access paths
+(model + symbol + time, model + fold + time), so the API can filter,
+aggregate, downsample and paginate server-side instead of shipping
+every row as JSON.
+"""
+import os
+import sqlite3
+import pandas as pd
+from . import config
+
+TABLE = "predictions"
+RESULT_COLS = ["model", "symbol", "fold", "time", "true", "pred", "prob"]
+
+_INDEXES = [
+    ("ix_predictions_model_symbol_time", "model, symbol, time, fold"),
+    ("ix_predictions_model_fold_time", "model, fold, time"),
+    ("ix_predictions_model_time", "model, time"),
+]
+
+
+def _connect(path=None):
+    return sqlite3.connect(path or config.RESULTS_DB_PATH)
+
+
+def exists():
+    return os.path.exists(config.RESULTS_DB_PATH)
+
+
+def write_results(df):
+    """
+    Replaces the stored results with `df` (columns RESULT_COLS).
+    The new database is built next to the old one and swapped in.
+    """
+    table = df[RESULT_COLS].copy()
+    # Dates as ISO strings: compact, and they sort/compare correctly in SQLite
+    table["time"] = pd.to_datetime(table["time"]).dt.strftime("%Y-%m-%d")
+    table["fold"] = table["fold"].astype(int)
+    table["true"] = table["true"].astype("float64")
+    table["pred"] = table["pred"].astype("float64")
+    # Probability of the predicted class (classifiers); NULL for regressors
+    table["prob"] = table["prob"].astype("float64").astype(object).where(table["prob"].notna(), None)
+
+    path = config.RESULTS_DB_PATH
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = _connect(tmp_path)
+    try:
+        conn.execute(
+            f"CREATE TABLE {TABLE} (model TEXT, symbol TEXT, fold INTEGER, time TEXT, actual REAL, predicted REAL, prob REAL)"
+        )
+        conn.executemany(
+            f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)",
+            table.itertuples(index=False, name=None)
+        )
+        for name, cols in _INDEXES:
+            conn.execute(f"CREATE INDEX {name} ON {TABLE} ({cols})")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    print(f"Training results written: {len(table)} rows -> {path}")
+    return len(table)
+
+
+def clear():
+    """
+    Removes the stored results. Training calls this when it produces no
+    out-of-fold predictions, so readers never replay an older model set's.
+    """
+    if exists():
+        os.remove(config.RESULTS_DB_PATH)
+        print(f"Training results removed: {config.RESULTS_DB_PATH}")
+
+
+def facets():
+    """Distinct models, symbols and folds, for the admin selectors."""
+    if not exists():
+        return {"models": [], "symbols": [], "folds": []}
+    conn = _connect()
+    try:
+        models = [r[0] for r in conn.execute(f"SELECT DISTINCT model FROM {TABLE} ORDER BY model")]
+        symbols = [r[0] for r in conn.execute(f"SELECT DISTINCT symbol FROM {TABLE} ORDER BY symbol")]
+        folds = [r[0] for r in conn.execute(f"SELECT DISTINCT fold FROM {TABLE} ORDER BY fold")]
+    finally:
+        conn.close()
+    return {"models": models, "symbols": symbols, "folds": folds}
+
+
+def _filters(model=None, symbol=None, fold=None, start=None, end=None):
+    """WHERE clause and parameters (symbol="ALL" does not filter)."""
+    where, params = [], []
+    if model:
+        where.append("model = ?")
+        params.append(model)
+    if symbol and symbol != "ALL":
+        where.append("symbol = ?")
+        params.append(symbol)
+    if fold is not None:
+        where.append("fold = ?")
+        params.append(int(fold))
+    if start:
+        where.append("time >= ?")
+        params.append(str(pd.Timestamp(start).date()))
+    if end:
+        where.append("time <= ?")
+        params.append(str(pd.Timestamp(end).date()))
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def read_predictions(models=None, start=None, end=None):
+    """
+    Out-of-fold predictions as a DataFrame (RESULT_COLS, time as datetime),
+    for the given model names (all if None), ordered by model, symbol, time.
+    """
+    where_sql, params = _filters(start=start, end=end)
+    if models:
+        clause = f"model IN ({', '.join('?' * len(models))})"
+        where_sql = f"{where_sql} AND {clause}" if where_sql else f"WHERE {clause}"
+        params += list(models)
+
+    conn = _connect()
+    try:
+        df = pd.read_sql_query(
+            f"SELECT model, symbol, fold, time, actual AS true, predicted AS pred, prob FROM {TABLE} {where_sql} "
+            f"ORDER BY model, symbol, time", conn, params=params
+        )
+    finally:
+        conn.close()
+    df["time"] = pd.to_datetime(df["time"])
+    return df
+
+
+def calibration(model, symbol=None, fold=None, start=None, end=None, bins=10):
+    """
+    Reliability table for one model: rows are split into `bins` equal-count
+    buckets by score, and each bucket reports its mean score, mean realized
+    value and row count. A calibrated model has the two means close.
+
+    Regressors are scored by their prediction against the realized target.
+    Classifiers are scored by the probability of the predicted class
+    against the hit rate (predicted class == realized class); their hard
+    labels tie in large blocks and say nothing about calibration.
+    """
+    where_sql, params = _filters(model, symbol, fold, start, end)
+    query = (
+        f"SELECT bucket, AVG(score) AS pred, AVG(outcome) AS true, COUNT(*) AS count FROM ("
+        f"SELECT score, outcome, NTILE(?) OVER (ORDER BY score) AS bucket FROM ("
+        f"SELECT COALESCE(prob, predicted) AS score, "
+        f"CASE WHEN prob IS NULL THEN actual ELSE CAST(actual = predicted AS REAL) END AS outcome "
+        f"FROM {TABLE} {where_sql})) "
+        f"GROUP BY bucket ORDER BY bucket"
+    )
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute(query, [int(bins)] + params)]
+    finally:
+        conn.close()
+
+
+def query_results(model=None, symbol=None, fold=None, start=None, end=None,
+                  max_points=None, page=1, page_size=5000):
+    """
+    Filtered results ordered by time.
+
+    symbol="ALL" averages true/pred across symbols per date. When
+    max_points is set and more rows match, every k-th row is kept so the
+    series spans the full range in at most max_points points. Pagination
+    applies after downsampling. Returns (rows, total) where total is the
+    row count before pagination.
+    """
+    where_sql, params = _filters(model, symbol, fold, start, end)
+
+    if symbol == "ALL":
+        base = (f"SELECT time, AVG(actual) AS actual, AVG(predicted) AS predicted, COUNT(*) AS count "
+                f"FROM {TABLE} {where_sql} GROUP BY time")
+    else:
+        base = f"SELECT model, symbol, fold, time, actual, predicted FROM {TABLE} {where_sql}"
+
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM ({base})", params).fetchone()[0]
+
+        query, query_params = base, list(params)
+        if max_points and total > max_points:
+            step = -(-total // max_points)  # ceil
+            query = (f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER (ORDER BY time) - 1 AS rn FROM ({base})) "
+                     f"WHERE rn % ? = 0")
+            query_params.append(step)
+            total = -(-total // step)
+
+        page = max(1, int(page))
+        query += " ORDER BY time LIMIT ? OFFSET ?"
+        query_params += [page_size, (page - 1) * page_size]
+        rows = [dict(r) for r in conn.execute(query, query_params)]
+    finally:
+        conn.close()
+
+    for row in rows:
+        row.pop("rn", None)
+        # API field names (SQL keeps "true" out of column names)
+        row["true"] = row.pop("actual")
+        row["pred"] = row.pop("predicted")
+    return rows, total
@@ -1,98 +1,137 @@
 import sys
 import os
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
 from sqlalchemy.orm import Session
+from sqlalchemy import select, func, literal, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 # Add project root to path to import backend modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from backend.app.database import SessionLocal, engine, Base
-from backend.app.models.models import StockPrice, Signal
+from backend.app.database import SessionLocal, engine, Base, ensure_indexes
+from backend.app.models.models import StockPrice, Signal, LatestSignal
 from pipeline.mock_model import MockModel
+from pipeline.data_loader import load_market_data
 
-# Banks list
-BANKS = ["VCB", "TCB", "ACB", "BID", "CTG", "MBB", "VPB"]
+# Mock signals are generated for the most recent sessions of each symbol
+SIGNAL_DAYS = 30
 
-def generate_synthetic_data(days=30):
-    """Generate last N days of data for each bank"""
-    data = []
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    
-    for symbol in BANKS:
-        current_price = random.uniform(20000, 90000)
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            change = random.uniform(-0.02, 0.02)
-            open_p = current_price
-            close_p = current_price * (1 + change)
-            high_p = max(open_p, close_p) * (1 + random.uniform(0, 0.01))
-            low_p = min(open_p, close_p) * (1 - random.uniform(0, 0.01))
-            vol = random.randint(100000, 5000000)
-            
-            data.append({
-                "symbol": symbol,
-                "date": date.date(),
-                "open": open_p,
-                "high": high_p,
-                "low": low_p,
-                "close": close_p,
-                "volume": vol
-            })
-            current_price = close_p
-            
-    return pd.DataFrame(data)
+PRICE_COLUMNS = ["symbol", "date", "open", "high", "low", "close", "volume"]
+
+def load_price_history(path=None):
+    """Daily OHLCV bars from the market CSV (config.MARKET_DATA_PATH by default)."""
+    df = load_market_data(path)
+    return df[[c for c in PRICE_COLUMNS if c in df.columns]]
+
+def _to_records(df: pd.DataFrame, columns):
+    """DataFrame -> list of dicts with plain Python values (dates as datetime.date)."""
+    out = df[columns].copy()
+    out["date"] = pd.to_datetime(out["date"]).dt.date
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict(orient="records")
+
+def bulk_insert_ignore(db: Session, model, df: pd.DataFrame, batch_size: int = 5000):
+    """
+    INSERT ... ON CONFLICT (symbol, date) DO NOTHING in executemany batches.
+    Rows already in the table are skipped; the caller commits once.
+    Returns the number of rows inserted.
+    """
+    if df.empty:
+        return 0
+    columns = [c.name for c in model.__table__.columns if c.name != "id" and c.name in df.columns]
+    records = _to_records(df, columns)
+    stmt = sqlite_insert(model).on_conflict_do_nothing(index_elements=["symbol", "date"])
+
+    # Core executemany on the session's connection (same transaction)
+    conn = db.connection()
+    inserted = 0
+    for start in range(0, len(records), batch_size):
+        result = conn.execute(stmt, records[start:start + batch_size])
+        inserted += max(result.rowcount, 0)
+    return inserted
+
+def refresh_latest_signals(db: Session, symbols=None):
+    """
+    Upserts the newest stored signal of each symbol (all if None) into
+    latest_signal, so /signals/latest is a plain table read.
+    """
+    newest = (
+        select(Signal.symbol, func.max(Signal.date).label("max_date"))
+        .group_by(Signal.symbol)
+    )
+    if symbols is not None:
+        newest = newest.where(Signal.symbol.in_(list(symbols)))
+    newest = newest.subquery()
+
+    cols = ["symbol", "signal_id", "date", "signal_1", "signal_2", "signal_3", "signal_4",
+            "prediction", "confidence", "updated_at"]
+    rows = (
+        select(
+            Signal.symbol, Signal.id, Signal.date,
+            Signal.signal_1, Signal.signal_2, Signal.signal_3, Signal.signal_4,
+            Signal.prediction, Signal.confidence, literal(datetime.utcnow())
+        )
+        .join(newest, (Signal.symbol == newest.c.symbol) & (Signal.date == newest.c.max_date))
+        .where(true())  # SQLite needs a WHERE before ON CONFLICT in INSERT ... SELECT
+    )
+    stmt = sqlite_insert(LatestSignal).from_select(cols, rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol"],
+        set_={c: stmt.excluded[c] for c in cols if c != "symbol"}
+    )
+    db.execute(stmt)
 
 def save_to_db(db: Session, df_prices: pd.DataFrame, df_signals: pd.DataFrame):
-    # Save Prices
-    for _, row in df_prices.iterrows():
-        # Check if exists
-        exists = db.query(StockPrice).filter(
-            StockPrice.symbol == row['symbol'],
-            StockPrice.date == row['date']
-        ).first()
-        
-        if not exists:
-            db_price = StockPrice(**row.to_dict())
-            db.add(db_price)
-            
-    # Save Signals
-    for _, row in df_signals.iterrows():
-         # Check if exists
-        exists = db.query(Signal).filter(
-            Signal.symbol == row['symbol'],
-            Signal.date == row['date']
-        ).first()
-        
-        if not exists:
-            db_signal = Signal(**row.to_dict())
-            db.add(db_signal)
-    
-    db.commit()
-    print("Data saved to database.")
+    # Existing (symbol, date) rows are kept; everything runs in one transaction
+    try:
+        n_prices = ingest_market_history(db, df_prices)
+        n_signals = bulk_insert_ignore(db, Signal, df_signals)
+        if db.query(LatestSignal).first() is None:
+            # First run on this database: backfill every symbol
+            refresh_latest_signals(db)
+        elif n_signals:
+            # Only symbols that got new signals can have a newer latest row
+            refresh_latest_signals(db, df_signals["symbol"].unique().tolist())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"Data saved to database ({n_prices} new prices, {n_signals} new signals).")
+
+def ingest_market_history(db: Session, df_prices: pd.DataFrame = None):
+    """
+    Loads the market CSV into stock_prices. Bars already stored are kept,
+    so re-running only adds new sessions. The caller commits.
+    Returns the number of rows inserted.
+    """
+    if df_prices is None:
+        df_prices = load_price_history()
+    return bulk_insert_ignore(db, StockPrice, df_prices)
 
 def run_pipeline():
     print("Running pipeline...")
-    # 1. Generate Data
-    df_prices = generate_synthetic_data(days=30)
-    print(f"Generated {len(df_prices)} price records.")
+    # 1. Load price history
+    df_prices = load_price_history()
+    print(f"Loaded {len(df_prices)} price records.")
     
-    # 2. Mock Inference
+    # 2. Mock Inference on the latest sessions
+    df_recent = df_prices.sort_values("date").groupby("symbol").tail(SIGNAL_DAYS).reset_index(drop=True)
     model = MockModel()
-    predictions = model.predict(df_prices)
+    predictions = model.predict(df_recent)
     
     # Combine predictions with basic info for saving
-    df_signals = df_prices[['symbol', 'date']].copy()
+    df_signals = df_recent[['symbol', 'date']].copy()
     for col in predictions.columns:
         df_signals[col] = predictions[col]
         
     print(f"Generated {len(df_signals)} signal records.")
     
     # 3. Save to DB
-    # Create tables if not exist (just in case)
+    # Create tables if not exist (just in case); duplicate rows from before
+    # the unique indexes are removed here rather than at server startup
     Base.metadata.create_all(bind=engine)
+    ensure_indexes(dedupe=True)
     
     db = SessionLocal()
     try:
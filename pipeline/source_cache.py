@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+import pandas as pd
+from . import config
+
+# Placeholder strings used by the Excel exports for "no value"
+MISSING_MARKERS = {"", "-", "--", "nan", "NaN", "None", "N/A"}
+
+_warned_no_arrow = False
+
+
+def _has_arrow():
+    global _warned_no_arrow
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        if not _warned_no_arrow:
+            print("Warning: pyarrow not installed, source cache disabled.")
+            _warned_no_arrow = True
+        return False
+
+
+# (path, size, mtime_ns) -> sha256, so repeated checks don't re-read files
+_hash_memo = {}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a source file."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key in _hash_memo:
+        return _hash_memo[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    _hash_memo[key] = digest.hexdigest()
+    return _hash_memo[key]
+
+
+def _stat_entry(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _cache_paths(name):
+    base = os.path.join(config.CACHE_DIR, name)
+    return base + ".parquet", base + ".json"
+
+
+def _sources_match(manifest, source_paths):
+    """
+    Checks the manifest against the current sources.
+    Size/mtime are compared first; the content hash is only recomputed
+    when they differ (e.g. after a checkout that touched the file).
+    Returns (match, refreshed_sources).
+    """
+    cached = manifest.get("sources", {})
+    if set(cached) != {os.path.abspath(p) for p in source_paths}:
+        return False, None
+    refreshed = {}
+    for path in source_paths:
+        entry = cached[os.path.abspath(path)]
+        current = _stat_entry(path)
+        if current["size"] == entry["size"] and current["mtime_ns"] == entry["mtime_ns"]:
+            refreshed[os.path.abspath(path)] = entry
+            continue
+        sha = file_sha256(path)
+        if sha != entry["sha256"]:
+            return False, None
+        refreshed[os.path.abspath(path)] = {**current, "sha256": sha}
+    return True, refreshed
+
+
+def source_fingerprint(source_paths):
+    """Combined content hash of several sources (used to tag derived artifacts)."""
+    digest = hashlib.sha256()
+    for path in source_paths:
+        if os.path.exists(path):
+            digest.update(os.path.basename(path).encode())
+            digest.update(file_sha256(path).encode())
+    return digest.hexdigest()
+
+
+def to_columnar(df):
+    """
+    Makes a frame storable as Parquet.
+    Column names become strings, and object columns holding numbers mixed
+    with placeholder strings ('-') are coerced to float; any other mixed
+    column is stored as string.
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+        if inferred in ("string", "empty", "datetime", "date", "boolean"):
+            continue
+        numeric = pd.to_numeric(df[col], errors="coerce")
+        lost = df[col][numeric.isna() & df[col].notna()]
+        if lost.astype(str).str.strip().isin(MISSING_MARKERS).all():
+            df[col] = numeric
+        else:
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    return df
+
+
+def cached_source(name, source_paths, builder):
+    """
+    Returns builder() output, served from a Parquet cache under CACHE_DIR.
+
+    The cache is rebuilt when any of `source_paths` changes content.
+    Empty frames (loader errors, missing files) are never cached.
+    """
+    if not _has_arrow():
+        return builder()
+
+    # Optional sources that are absent simply don't take part in the key
+    source_paths = [p for p in source_paths if os.path.exists(p)]
+    data_path, manifest_path = _cache_paths(name)
+    if os.path.exists(data_path) and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            match, refreshed = _sources_match(manifest, source_paths)
+            if match:
+                df = pd.read_parquet(data_path)
+                if refreshed != manifest["sources"]:
+                    manifest["sources"] = refreshed
+                    _write_manifest(manifest_path, manifest)
+                return df
+        except Exception as e:
+            print(f"Warning: Could not read cache '{name}': {e}")
+
+    df = builder()
+    if df is None or df.empty:
+        return df
+
+    try:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        df = to_columnar(df)
+        tmp_path = data_path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, data_path)
+        _write_manifest(manifest_path, {
+            "name": name,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "sources": {
+                os.path.abspath(p): {**_stat_entry(p), "sha256": file_sha256(p)}
+                for p in source_paths
+            },
+        })
+    except Exception as e:
+        print(f"Warning: Could not write cache '{name}': {e}")
+    return df
+
+
+def _write_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def clear_cache():
+    """Removes every cached source."""
+    if not os.path.isdir(config.CACHE_DIR):
+        return
+    for fname in os.listdir(config.CACHE_DIR):
+        if fname.endswith((".parquet", ".json")):
+            os.remove(os.path.join(config.CACHE_DIR, fname))
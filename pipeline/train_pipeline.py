@@ -1,33 +1,50 @@
 import pandas as pd
 import numpy as np
 import os
-import joblib
 import json
-import math
-from datetime import datetime
-from sklearn.metrics import mean_squared_error, accuracy_score
 
 from . import config
-from .data_loader import gather_data
-from .feature_engineering import (
-    build_market_features,
-    build_technical_features,
-    build_sentiment_features,
-    build_macro_features,
-    build_bank_features,
-    build_target,
-    make_quarter_date
-)
-from .model_factory import (
-    create_return_model,
-    create_risk_model,
-    create_regime_model,
-    create_direction_model
-)
-
-def run_training():
-    print("--- Starting Training Pipeline ---")
+from .data_loader import gather_data, load_fx_data
+from .feature_engineering import build_feature_frame, build_target
+from .feature_store import write_feature_store, current_fingerprint
+from .model_artifacts import publish
+from .model_factory import MODEL_SPECS
+from .results_store import write_results, clear as clear_results
+from .training_scheduler import clean_training_rows, train_models
+from .walk_forward import run_walk_forward, summary_metrics
+
+def add_model_targets(df):
+    """
+    Proxy targets for the 4 models, derived from the 21d forward return:
+    - Return: log_return_21d (Regression)
+    - Risk: future 21d volatility (Regression)
+    - Direction: sign of log_return_21d (Classification)
+    - Regime: 0=Bear, 1=Neutral, 2=Bull by +/-2% thresholds (Classification)
+    """
+    df["target_return"] = df["log_return_21d"]
+    df["target_direction"] = (df["log_return_21d"] > 0).astype(int)
+    
+    # Future Volatility (proxy for Risk)
+    # Calculate future 21d vol: rolling std shifted back
+    df["target_risk"] = df.groupby("symbol")["ret_1d"].transform(
+        lambda x: x.shift(-config.PREDICTION_HORIZON).rolling(config.PREDICTION_HORIZON).std()
+    )
     
+    # Regime (proxy: 0=Bear, 1=Neutral, 2=Bull)
+    # Thresholds: return < -0.02 (Bear), return > 0.02 (Bull), else Neutral
+    def get_regime(r):
+        if r < -0.02: return 0
+        elif r > 0.02: return 2
+        else: return 1
+        
+    df["target_regime"] = df["log_return_21d"].apply(get_regime)
+    return df
+
+def prepare_training_frame(write_store=True):
+    """
+    Loads all sources and builds the merged feature frame with targets.
+    Returns (df, feature_cols), or (None, []) if market data is missing.
+    """
     # 1. Load Data
     print("Loading raw data...")
     # gather_data returns: {"market": df, "micro": df, "sentiment": df}
@@ -39,130 +56,23 @@ def run_training():
     sentiment_df = data_dict.get("sentiment")
     
     # Load FX separately if possible (not in gather_data default)
-    fx_df = None
-    if os.path.exists(config.FX_DATA_PATH):
-        try:
-            print(f"Loading FX data from {config.FX_DATA_PATH}...")
-            fx_df = pd.read_csv(config.FX_DATA_PATH)
-            # Ensure standard columns
-            fx_df.columns = fx_df.columns.str.lower().str.replace(' ', '_')
-            if 'date' in fx_df.columns:
-                fx_df['date'] = pd.to_datetime(fx_df['date'])
-            # Assuming 'close' exists or rename appropriately if needed (Price -> close)
-            if 'price' in fx_df.columns:
-                fx_df = fx_df.rename(columns={'price': 'close'})
-        except Exception as e:
-            print(f"Warning: Failed to load FX data: {e}")
+    print(f"Loading FX data from {config.FX_DATA_PATH}...")
+    fx_df = load_fx_data()
 
     if market_df is None or market_df.empty:
         print("Error: Market data missing. Aborting.")
-        return
+        return None, []
 
-    # 2. Feature Engineering (Per Group)
+    # 2. Feature Engineering (Per Group) & 3. Merge
     print("Building features...")
-    
-    # Group A & B: Market + Technical (on Daily Price)
-    print("  - Market & Technical features...")
-    market_feat = build_market_features(market_df)
-    market_feat = build_technical_features(market_feat)
-    
-    # Group C: Sentiment (on Daily News)
-    sentiment_feat_daily = None
-    if sentiment_df is not None and not sentiment_df.empty:
-        print("  - Sentiment features...")
-        sentiment_feat_daily = build_sentiment_features(sentiment_df)
-    
-    # Group D: Macro & FX
-    # Extract Macro from 'micro_df' if possible, or load separately?
-    # In data_loader, micro already has GDP/INF merged.
-    # We'll calculate lags on micro_df directly or splitting it.
-    # build_macro_features expects (macro_df, fx_df).
-    # We can pass micro_df as macro_df if it contains the columns.
-    
-    fx_feat_daily = None
-    if micro_df is not None and not micro_df.empty:
-        print("  - Macro/FX context features...")
-        # We pass micro_df as the macro source. It has quarter_date.
-        # If fx_df is None, create dummy
-        if fx_df is None:
-             fx_df = pd.DataFrame({"close": [0]*len(market_df), "date": market_df["date"]})
-             
-        macro_feat_quarterly, fx_feat_daily = build_macro_features(micro_df, fx_df)
-        
-    # Group E: Bank Fundamentals
-    bank_feat_quarterly = None
-    if micro_df is not None and not micro_df.empty:
-        print("  - Bank Fundamental features...")
-        bank_feat_quarterly = build_bank_features(micro_df)
-
-    # 3. Merge Consolidated DataFrame (Walk-forward style merge)
-    print("Merging datasets...")
-    
-    # Start with Market (Daily)
-    df = market_feat.copy()
-    if "date" in df.columns:
-        df = df.rename(columns={"date": "time"})
-    df["time"] = pd.to_datetime(df["time"])
-    df = df.sort_values(["symbol", "time"])
-
-    # Merge Sentiment (Daily)
-    if sentiment_feat_daily is not None:
-        if "date" in sentiment_feat_daily.columns:
-            sentiment_feat_daily = sentiment_feat_daily.rename(columns={"date": "time"})
-        sentiment_feat_daily["time"] = pd.to_datetime(sentiment_feat_daily["time"])
-        
-        df = df.merge(sentiment_feat_daily, on=["symbol", "time"], how="left")
-
-    # Merge FX (Daily, broad market)
-    if fx_feat_daily is not None:
-        if "date" in fx_feat_daily.columns:
-            fx_feat_daily = fx_feat_daily.rename(columns={"date": "time"})
-        fx_feat_daily["time"] = pd.to_datetime(fx_feat_daily["time"])
-        
-        # Merge on time only (same for all symbols)
-        df = df.merge(fx_feat_daily, on="time", how="left")
-
-    # Merge Quarterly Data (Macro + Bank)
-    # Use merge_asof or simple join on quarter_date column
-    if bank_feat_quarterly is not None:
-        # Create mapping column in daily
-        df["quarter_date"] = make_quarter_date(df["time"])
-        
-        # Prepare quarterly data
-        q_data = bank_feat_quarterly.copy()
-        # q_data contains bank features AND macro features (since we passed micro_df to both builders and used copy)
-        # Actually, build_bank_features returned a copy of micro_df with extra cols.
-        # And build_macro_features returned (macro, fx). The macro part is just lags.
-        
-        # Let's start with bank_feat_quarterly and add macro lags if they exist
-        if macro_feat_quarterly is not None:
-             # Merge lags into q_data
-             cols_to_use = [c for c in macro_feat_quarterly.columns if c not in q_data.columns and c != "quarter_date"]
-             # If mapping key is quarter_date?
-             # macro_feat_quarterly derived from micro_df, so indexes/dates might match.
-             # Ideally join on quarter_date.
-             # However, macro_feat_quarterly might have duplicated rows if derived from micro (one per bank).
-             # Wait, macro data source is usually one per quarter (unique).
-             # But micro_df is merged (Symbol x Quarter).
-             # So macro lags are just columns in micro_df already?
-             # build_macro_features: `macro = macro_df.copy(); macro["GDP_t_1Q"]...`
-             # If we passed micro_df (Symbol x Quarter), then it calculated lags per row?
-             # Yes, effectively.
-             
-             # So just merge q_data (Bank Features) with macro_feat_quarterly (Macro Lags)?
-             # Or simply: bank_feat_quarterly IS derived from micro_df, check if it has macro cols.
-             # If we ran build_macro first, maybe we should have merged?
-             
-             # Simplification: Merge macro lags into q_data on index or common keys
-             # Since both come from micro_df, they align.
-             # Just combine columns.
-             for c in macro_feat_quarterly.columns:
-                 if c not in q_data.columns:
-                     q_data[c] = macro_feat_quarterly[c]
+    df = build_feature_frame(market_df, micro_df, sentiment_df, fx_df)
 
-        # Merge Q-data to Daily
-        # Left merge on [symbol, quarter_date]
-        df = df.merge(q_data, on=["symbol", "quarter_date"], how="left")
+    # Materialize the feature matrix for inference lookups (a cache: failures don't stop training)
+    if write_store:
+        try:
+            write_feature_store(df, market_df=market_df)
+        except Exception as e:
+            print(f"Warning: Could not write feature store: {e}")
 
     # 4. Filter Timeline & Finalize Features
     if config.START_TRAIN_DATE:
@@ -171,122 +81,66 @@ def run_training():
     # 5. Generate Targets
     print(f"Generating Target: {config.TARGET_COL}")
     df = build_target(df, horizon=config.PREDICTION_HORIZON)
+    df = add_model_targets(df)
     
     # 6. Select Features
     feature_cols = [c for c in config.FEATURE_COLS if c in df.columns]
     print(f"Features available: {len(feature_cols)} / {len(config.FEATURE_COLS)}")
-    
-    # Save feature list used
-    os.makedirs(config.ARTIFACTS_DIR, exist_ok=True)
-    with open(os.path.join(config.ARTIFACTS_DIR, "feature_cols.json"), "w") as f:
-        json.dump(feature_cols, f)
+    return df, feature_cols
 
-    # 7. Training Loop (All Targets)
-    targets = [config.TARGET_COL] # For now focusing on main target
-    # Or map 4 models?
-    # The requirement is 4 models: Return, Risk, Regime, Direction.
-    # Group A-E are INPUT features.
-    # Targets need to be created for Risk/Regime/Direction?
-    # build_target only created log_return_21d.
-    # I should add others or reuse log_return for direction?
-    # The notebook calculated `log_return_21d` and `target_risk`?
-    # Let's stick to the existing `model_factory` usage if possible, 
-    # but model_factory creates models, not targets.
-    # I will construct targets dynamically here or assume simple proxies for MVP:
-    # - Return: log_return_21d (Regression)
-    # - Risk: Volatility 21d future? (Regression)
-    # - Direction: Sign of log_return_21d (Classification)
-    # - Regime: ? (Clustering/Classification) -> Placeholder or simple Quantile?
-    
-    # Constructing these proxy targets on the fly
-    df["target_return"] = df["log_return_21d"]
-    df["target_direction"] = (df["log_return_21d"] > 0).astype(int)
-    
-    # Future Volatility (proxy for Risk)
-    # Calculate future 21d vol: rolling std shifted back
-    df["target_risk"] = df.groupby("symbol")["ret_1d"].transform(
-        lambda x: x.shift(-config.PREDICTION_HORIZON).rolling(config.PREDICTION_HORIZON).std()
-    )
+def run_training():
+    print("--- Starting Training Pipeline ---")
     
-    # Regime (proxy: 0=Bear, 1=Neutral, 2=Bull)
-    # Thresholds: return < -0.02 (Bear), return > 0.02 (Bull), else Neutral
-    def get_regime(r):
-        if r < -0.02: return 0
-        elif r > 0.02: return 2
-        else: return 1
-        
-    df["target_regime"] = df["log_return_21d"].apply(get_regime) 
-
-    models_config = [
-        ("return", create_return_model(), "target_return", False),
-        ("risk", create_risk_model(), "target_risk", False),
-        ("direction", create_direction_model(), "target_direction", True),
-        ("regime", create_regime_model(), "target_regime", True)
-    ]
+    df, feature_cols = prepare_training_frame()
+    if df is None:
+        return
     
-    all_metrics = []
-    comparison_points = []
+    os.makedirs(config.ARTIFACTS_DIR, exist_ok=True)
 
-    for name, model, target, is_class in models_config:
-        print(f"\nTraining {name} model (Target: {target})...")
-        
-        # Prepare Data
-        cols = feature_cols + [target]
-        train_df = df.dropna(subset=cols).replace([np.inf, -np.inf], np.nan).dropna()
-        
-        if train_df.empty:
-            print(f"Skipping {name}: No valid data.")
-            continue
-            
-        X = train_df[feature_cols]
-        y = train_df[target]
-        
-        # Split (Time-based 80/20)
-        split_idx = int(len(X) * 0.8)
-        X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
-        y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
-        
-        # Train
-        model.fit(X_train, y_train)
-        
-        # Evaluate
-        y_pred = model.predict(X_test)
-        
-        # Metrics
-        metric_res = {"model": name}
-        if is_class:
-            acc = accuracy_score(y_test, y_pred)
-            metric_res["accuracy"] = acc
-            print(f"  Accuracy: {acc:.4f}")
-        else:
-            mse = mean_squared_error(y_test, y_pred)
-            rmse = math.sqrt(mse)
-            metric_res["rmse"] = rmse
-            print(f"  RMSE: {rmse:.4f}")
-            
-        all_metrics.append(metric_res)
-        
-        # Save Model
-        joblib.dump(model, os.path.join(config.ARTIFACTS_DIR, f"{name}_model.joblib"))
-        
-        # Save Comparison Data (Sample)
-        # Predict Full
-        y_full = model.predict(X)
-        meta = train_df[["time", "symbol"]].copy()
-        meta["true"] = y
-        meta["pred"] = y_full
-        meta["model"] = name
-        meta["split"] = ["train"]*split_idx + ["test"]*(len(X)-split_idx)
-        meta["time"] = meta["time"].astype(str)
-        
-        comparison_points.extend(meta.to_dict(orient="records"))
+    # 7. Training (4 models: Return, Risk, Regime, Direction; targets from add_model_targets)
+    # Rows are cleaned once; the published models are fitted on all of them
+    train_df = clean_training_rows(df)
+    fitted_models = {}
+
+    if train_df.empty:
+        print("Skipping training: No valid data.")
+    else:
+        for res in train_models(train_df, feature_cols):
+            fitted_models[res["name"]] = res["model"]
+
+    # Yearly walk-forward evaluation. Its test-year predictions are the
+    # stored true-vs-pred results and its pooled scores are the headline
+    # metrics: every row is scored by a model that never trained on it.
+    all_metrics, fold_metrics, oof = [], [], None
+    if config.WALK_FORWARD_ENABLED:
+        fold_metrics, oof = run_walk_forward(df, feature_cols)
+        all_metrics = summary_metrics(oof)
+    for m in all_metrics:
+        score = f"RMSE {m['rmse']:.4f}" if "rmse" in m else f"Accuracy {m['accuracy']:.4f}"
+        print(f"{m['model']} model (walk-forward, {m['folds']} folds): {score}")
+    if not all_metrics:
+        print("No walk-forward folds: models have no out-of-sample metrics.")
 
     # Save Artifacts
     with open(os.path.join(config.ARTIFACTS_DIR, "metrics.json"), "w") as f:
-        json.dump(all_metrics, f)
-        
-    with open(os.path.join(config.ARTIFACTS_DIR, "comparison_data.json"), "w") as f:
-        json.dump(comparison_points, f)
+        json.dump(all_metrics + fold_metrics, f)
+        
+    if oof is not None and not oof.empty:
+        write_results(oof)
+    else:
+        # Results from an earlier run would describe other models
+        clear_results()
+        
+    # Publish all models + feature list as one version; servers switch on the CURRENT pointer
+    if len(fitted_models) == len(MODEL_SPECS):
+        publish(
+            fitted_models,
+            feature_cols,
+            metrics=all_metrics + fold_metrics,
+            data_hash=current_fingerprint()
+        )
+    else:
+        print("Not publishing: some models were not trained.")
         
     print("\nTraining Pipeline Completed Successfully.")
 
@@ -0,0 +1,92 @@
+"""
+Concurrent training of the model set on one shared feature matrix.
+
+The merged frame is cleaned once and converted to a single read-only
+float64 array. The four models are fitted concurrently in a thread pool
+(XGBoost releases the GIL while it trains), each with its own slice of the
+CPU thread budget, so a retrain takes about as long as the slowest model.
+Process pools (walk-forward) get the same array as a memory-mapped .npy
+file instead of a pickled copy per worker.
+"""
+import os
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from . import config
+from .model_factory import MODEL_SPECS
+
+
+def clean_training_rows(df):
+    """
+    Drops rows with NaN/inf in any column, as the per-model loop used to:
+    every model ends up on the same rows, so this runs once.
+    """
+    return df.replace([np.inf, -np.inf], np.nan).dropna()
+
+
+def thread_budget(n_workers):
+    """XGBoost threads per concurrent fit so the pool doesn't oversubscribe the CPU."""
+    return max(1, (os.cpu_count() or 1) // max(1, n_workers))
+
+
+def feature_matrix(df, feature_cols):
+    """Feature columns as one read-only float64 array (shared by all fits)."""
+    X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype="float64"))
+    X.setflags(write=False)
+    return X
+
+
+@contextlib.contextmanager
+def memmap_matrix(X, name="features"):
+    """Writes X to a temporary .npy under CACHE_DIR and yields its path."""
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    path = os.path.join(config.CACHE_DIR, f"{name}-{os.getpid()}.npy")
+    np.save(path, X)
+    try:
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def open_matrix(path):
+    """Read-only memory map of a matrix written by memmap_matrix."""
+    return np.load(path, mmap_mode="r")
+
+
+def _fit_one(spec, X_frame, targets, n_jobs):
+    name, factory, target, is_class = spec
+
+    model = factory()
+    model.set_params(n_jobs=n_jobs)
+    model.fit(X_frame, targets[target])
+
+    return {
+        "name": name,
+        "target": target,
+        "is_class": is_class,
+        "model": model,
+    }
+
+
+def train_models(train_df, feature_cols, specs=None, workers=None):
+    """
+    Fits every model in `specs` (default MODEL_SPECS) on all of train_df
+    concurrently. Returns one result dict per spec, in spec order, with the
+    fitted model. Out-of-sample scores come from the walk-forward folds.
+    """
+    specs = specs or MODEL_SPECS
+    n_workers = max(1, min(workers or len(specs), len(specs)))
+    n_jobs = thread_budget(n_workers)
+
+    X = feature_matrix(train_df, feature_cols)
+    # Column names are kept so inference can pass DataFrames; no copy of X
+    X_frame = pd.DataFrame(X, columns=feature_cols, index=train_df.index, copy=False)
+    targets = {target: train_df[target] for _, _, target, _ in specs}
+
+    print(f"Training {len(specs)} models concurrently: {n_workers} worker(s) x {n_jobs} thread(s)")
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(_fit_one, spec, X_frame, targets, n_jobs) for spec in specs]
+        return [f.result() for f in futures]
@@ -0,0 +1,241 @@
+"""
+Yearly walk-forward (expanding window) evaluation.
+
+For each test year t >= FIRST_TEST_YEAR, every model is trained on all
+rows before year t and scored on year t. Training rows within
+WALK_FORWARD_EMBARGO_DAYS trading days of the test start are dropped,
+since their 21d targets look into the test year.
+
+Each fold's test-year predictions are out-of-fold: together they cover
+every row from FIRST_TEST_YEAR on, and are persisted to the results
+store (results_store) for backtests, the admin chart and calibration.
+
+Folds are independent, so each (year, model) pair runs as one task in a
+process pool. Workers read the cleaned feature matrix from one shared,
+memory-mapped .npy file, and XGBoost threads are split across workers
+to avoid oversubscription.
+
+    python -m pipeline.walk_forward [--workers N]
+"""
+import os
+import json
+import math
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, accuracy_score
+
+from . import config
+from .model_factory import MODEL_SPECS
+from .results_store import RESULT_COLS, write_results, clear as clear_results
+from .training_scheduler import (
+    clean_training_rows,
+    feature_matrix,
+    memmap_matrix,
+    open_matrix,
+    thread_budget
+)
+
+# Per-worker data, set by _init_worker
+_FOLD_DATA = {}
+
+
+def yearly_folds(times, first_test_year=None, min_test_rows=None, embargo_days=None):
+    """
+    Expanding-window folds over a datetime column.
+    Returns [(year, train_idx, test_idx)], skipping years with fewer than
+    min_test_rows test rows or no training rows.
+    """
+    first_test_year = config.FIRST_TEST_YEAR if first_test_year is None else first_test_year
+    min_test_rows = config.MIN_TEST_ROWS if min_test_rows is None else min_test_rows
+    embargo_days = config.WALK_FORWARD_EMBARGO_DAYS if embargo_days is None else embargo_days
+
+    times = pd.to_datetime(pd.Series(times)).to_numpy()
+    years = pd.DatetimeIndex(times).year.to_numpy()
+    trading_days = np.unique(times)
+
+    folds = []
+    for year in sorted(y for y in np.unique(years) if y >= first_test_year):
+        test_idx = np.flatnonzero(years == year)
+        if len(test_idx) < min_test_rows:
+            continue
+        # Last training day: embargo_days trading days before the first test day
+        first_test_pos = np.searchsorted(trading_days, times[test_idx].min())
+        cutoff_pos = first_test_pos - embargo_days
+        if cutoff_pos <= 0:
+            continue
+        train_idx = np.flatnonzero(times < trading_days[cutoff_pos])
+        if len(train_idx) == 0:
+            continue
+        folds.append((int(year), train_idx, test_idx))
+    return folds
+
+
+def _init_worker(X, targets, folds):
+    # X is an array, or the path of a memory-mapped copy in process workers
+    _FOLD_DATA["X"] = open_matrix(X) if isinstance(X, str) else X
+    _FOLD_DATA["targets"] = targets
+    _FOLD_DATA["folds"] = {year: (train_idx, test_idx) for year, train_idx, test_idx in folds}
+
+
+def _run_fold(year, model_name, n_jobs):
+    """
+    Trains one model on one fold. Returns its metric entry, test-year
+    predictions and, for classifiers, the probability of each predicted
+    class (None for regressors).
+    """
+    spec = {name: (factory, target, is_class) for name, factory, target, is_class in MODEL_SPECS}
+    factory, target, is_class = spec[model_name]
+
+    X = _FOLD_DATA["X"]
+    y = _FOLD_DATA["targets"][target]
+    train_idx, test_idx = _FOLD_DATA["folds"][year]
+
+    model = factory()
+    model.set_params(n_jobs=n_jobs)
+    model.fit(X[train_idx], y[train_idx])
+    y_pred = model.predict(X[test_idx])
+    prob = None
+    if is_class:
+        proba = model.predict_proba(X[test_idx])
+        prob = proba[np.arange(len(y_pred)), np.searchsorted(model.classes_, y_pred)]
+
+    entry = {
+        "model": model_name,
+        "fold": year,
+        "n_train": int(len(train_idx)),
+        "n_test": int(len(test_idx)),
+    }
+    if is_class:
+        entry["accuracy"] = float(accuracy_score(y[test_idx], y_pred))
+    else:
+        entry["rmse"] = math.sqrt(mean_squared_error(y[test_idx], y_pred))
+    return entry, y_pred, prob
+
+
+def _worker_count(n_tasks, workers=None):
+    workers = workers or config.WALK_FORWARD_WORKERS or os.cpu_count() or 1
+    return max(1, min(workers, n_tasks))
+
+
+def out_of_fold_frame(clean, folds, tasks, predictions, probabilities):
+    """
+    Long results frame (results_store.RESULT_COLS) from the per-task
+    test-year predictions and predicted-class probabilities (None for
+    regressors): one row per (model, symbol, time, fold).
+    """
+    spec = {name: target for name, _, target, _ in MODEL_SPECS}
+    test_rows = {year: test_idx for year, _, test_idx in folds}
+    symbols, times = clean["symbol"].to_numpy(), clean["time"].to_numpy()
+
+    idx = np.concatenate([test_rows[year] for year, _ in tasks])
+    sizes = [len(test_rows[year]) for year, _ in tasks]
+    return pd.DataFrame({
+        "model": np.repeat([name for _, name in tasks], sizes),
+        "symbol": symbols[idx],
+        "fold": np.repeat([year for year, _ in tasks], sizes),
+        "time": times[idx],
+        "true": np.concatenate([clean[spec[name]].to_numpy(dtype=float)[test_rows[year]] for year, name in tasks]),
+        "pred": np.concatenate([np.asarray(pred, dtype=float) for pred in predictions]),
+        "prob": np.concatenate([
+            np.full(len(pred), np.nan) if prob is None else np.asarray(prob, dtype=float)
+            for pred, prob in zip(predictions, probabilities)
+        ]),
+    })
+
+
+def summary_metrics(oof):
+    """
+    Headline entry per model: RMSE or accuracy pooled over all of its
+    out-of-fold rows, i.e. scored only by models that never saw them.
+    """
+    entries = []
+    for name, _, _, is_class in MODEL_SPECS:
+        rows = oof[oof["model"] == name]
+        if rows.empty:
+            continue
+        entry = {
+            "model": name,
+            "evaluation": "walk_forward",
+            "folds": int(rows["fold"].nunique()),
+            "n_test": int(len(rows)),
+        }
+        if is_class:
+            entry["accuracy"] = float(accuracy_score(rows["true"], rows["pred"]))
+        else:
+            entry["rmse"] = math.sqrt(mean_squared_error(rows["true"], rows["pred"]))
+        entries.append(entry)
+    return entries
+
+
+def run_walk_forward(df, feature_cols, workers=None):
+    """
+    Runs all (year, model) folds. Returns (per-fold metric entries ordered
+    by model then year, out-of-fold predictions frame).
+    """
+    # Same row cleaning as run_training: every model sees the same rows
+    target_cols = [target for _, _, target, _ in MODEL_SPECS]
+    clean = clean_training_rows(df)[["time", "symbol"] + feature_cols + target_cols]
+    clean = clean.sort_values("time", kind="stable").reset_index(drop=True)
+
+    folds = yearly_folds(clean["time"])
+    if not folds:
+        print("Walk-forward: no fold has enough test rows, skipping.")
+        return [], pd.DataFrame(columns=RESULT_COLS)
+
+    X = feature_matrix(clean, feature_cols)
+    targets = {t: clean[t].to_numpy() for t in target_cols}
+    tasks = [(year, name) for name, _, _, _ in MODEL_SPECS for year, _, _ in folds]
+
+    n_workers = _worker_count(len(tasks), workers)
+    n_jobs = thread_budget(n_workers)
+    print(f"Walk-forward: {len(folds)} folds ({folds[0][0]}-{folds[-1][0]}) x {len(MODEL_SPECS)} models, "
+          f"{n_workers} worker(s) x {n_jobs} thread(s)")
+
+    if n_workers == 1:
+        _init_worker(X, targets, folds)
+        results = [_run_fold(year, name, n_jobs) for year, name in tasks]
+    else:
+        # spawn: forking after XGBoost/OpenMP has run in the parent can deadlock
+        ctx = multiprocessing.get_context("spawn")
+        with memmap_matrix(X, "walk_forward") as matrix_path, \
+                ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                                    initializer=_init_worker, initargs=(matrix_path, targets, folds)) as pool:
+            futures = [pool.submit(_run_fold, year, name, n_jobs) for year, name in tasks]
+            results = [f.result() for f in futures]
+
+    entries = [entry for entry, _, _ in results]
+    oof = out_of_fold_frame(clean, folds, tasks, [pred for _, pred, _ in results], [prob for _, _, prob in results])
+
+    for entry in entries:
+        score = f"RMSE {entry['rmse']:.4f}" if "rmse" in entry else f"Accuracy {entry['accuracy']:.4f}"
+        print(f"  {entry['model']:9s} {entry['fold']}: {score} (train {entry['n_train']}, test {entry['n_test']})")
+    return entries, oof
+
+
+def main(workers=None):
+    from .train_pipeline import prepare_training_frame
+
+    df, feature_cols = prepare_training_frame(write_store=False)
+    if df is None:
+        return
+    fold_metrics, oof = run_walk_forward(df, feature_cols, workers)
+    if oof.empty:
+        clear_results()
+    else:
+        write_results(oof)
+
+    # Summary entries first, then one entry per fold
+    metrics_path = os.path.join(config.ARTIFACTS_DIR, "metrics.json")
+    with open(metrics_path, "w") as f:
+        json.dump(summary_metrics(oof) + fold_metrics, f)
+    print(f"Walk-forward metrics written to {metrics_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.workers)